@@ -0,0 +1,75 @@
+"""
+Per-page copy benchmark / ページ単位コピーのベンチマーク
+Compares converting a page through an insert_pdf copy with converting it in place,
+one page or one batch of contiguous pages per call
+insert_pdf でコピーしてから変換する方法と、1回の呼び出しで1ページまたは連続ページの
+バッチをその場で変換する方法を比較する
+
+Usage / 使い方: python benchmarks/bench_page_copy.py [pages]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymupdf
+import pymupdf4llm
+
+import conversion
+from synthetic import make_image_pdf, make_text_pdf
+
+
+def convert_with_copy(doc, page_num):
+    """Previous approach: copy the page into a new document / 従来の方法：ページを新しいドキュメントにコピー"""
+    single_page_doc = pymupdf.open()
+    try:
+        single_page_doc.insert_pdf(doc, from_page=page_num - 1, to_page=page_num - 1)
+        return pymupdf4llm.to_markdown(single_page_doc)
+    finally:
+        single_page_doc.close()
+
+
+def measure(pdf_path, convert):
+    """Convert every page and return elapsed seconds / 全ページを変換して経過秒数を返す"""
+    with pymupdf.open(pdf_path) as doc:
+        start = time.perf_counter()
+        for page_num in range(1, len(doc) + 1):
+            convert(doc, page_num)
+        return time.perf_counter() - start
+
+
+def measure_batched(pdf_path):
+    """Convert all pages in contiguous batches / 全ページを連続したバッチで変換"""
+    with pymupdf.open(pdf_path) as doc:
+        start = time.perf_counter()
+        for _ in conversion.iter_page_chunks(doc, range(1, len(doc) + 1)):
+            pass
+        return time.perf_counter() - start
+
+
+def main():
+    """Main function / メイン関数"""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        samples = [
+            ("text-only", make_text_pdf(os.path.join(tmp_dir, "text.pdf"), pages)),
+            ("image-heavy", make_image_pdf(os.path.join(tmp_dir, "image.pdf"), pages)),
+        ]
+        # Warm up PyMuPDF4LLM once / PyMuPDF4LLMを一度ウォームアップ
+        measure(samples[0][1], conversion.convert_single_page)
+
+        print(f"{'document':<12} {'insert_pdf':>12} {'in place':>12} {'batched':>12}  (per page)")
+        for name, pdf_path in samples:
+            copied = measure(pdf_path, convert_with_copy)
+            in_place = measure(pdf_path, conversion.convert_single_page)
+            batched = measure_batched(pdf_path)
+            print(f"{name:<12} {copied / pages * 1000:>10.1f}ms {in_place / pages * 1000:>10.1f}ms "
+                  f"{batched / pages * 1000:>10.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
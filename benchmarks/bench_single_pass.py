@@ -0,0 +1,60 @@
+"""
+Single-pass conversion benchmark / 1パス変換のベンチマーク
+Verifies the full-document path converts each page at most once
+ドキュメント全体の変換で各ページが高々一度しか変換されないことを検証する
+
+Usage / 使い方: python benchmarks/bench_single_pass.py [pages]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymupdf
+import pymupdf4llm
+
+import conversion
+from synthetic import make_text_pdf
+
+
+def main():
+    """Main function / メイン関数"""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    converted_pages = []
+    original_to_markdown = pymupdf4llm.to_markdown
+
+    def counting_to_markdown(doc, *args, **kwargs):
+        # Count every page handed to PyMuPDF4LLM / PyMuPDF4LLMに渡された全ページを数える
+        selected = kwargs.get('pages')
+        converted_pages.extend(selected if selected is not None else range(len(doc)))
+        return original_to_markdown(doc, *args, **kwargs)
+
+    pymupdf4llm.to_markdown = counting_to_markdown
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = make_text_pdf(os.path.join(tmp_dir, "bench.pdf"), pages)
+            for add_page_headers in (True, False):
+                converted_pages.clear()
+                with pymupdf.open(pdf_path) as doc:
+                    start = time.perf_counter()
+                    results = conversion.convert_document(doc, add_page_headers=add_page_headers).results
+                    elapsed = time.perf_counter() - start
+
+                conversions = len(converted_pages)
+                print(f"headers={add_page_headers}: {len(results)} pages, {conversions} page conversions, "
+                      f"{elapsed:.2f}s ({pages / elapsed:.1f} pages/s)")
+                if conversions > pages:
+                    print(f"FAIL: {conversions} conversions for {pages} pages")
+                    return 1
+    finally:
+        pymupdf4llm.to_markdown = original_to_markdown
+
+    print("OK: at most one conversion per page")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+GUI startup benchmark / GUI起動のベンチマーク
+Measures the import time of the GUI module and of the conversion engine, the time until
+the first window is shown and the time until the engine is ready, each in a fresh
+interpreter
+GUIモジュールと変換エンジンのインポート時間、最初のウィンドウが表示されるまでの時間、
+エンジンの準備ができるまでの時間を、それぞれ新しいインタプリタで計測する
+
+Usage / 使い方:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --max-window 0.5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_RUNS = 5
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+
+# Import of the GUI module only / GUIモジュールのみのインポート
+IMPORT_MAIN = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+# What the GUI imported at startup before the engine was loaded lazily
+# エンジンを遅延読み込みする前にGUIが起動時にインポートしていたもの
+IMPORT_ENGINE = """
+import importlib, time
+start = time.perf_counter()
+import main
+for name in main.ENGINE_MODULES:
+    importlib.import_module(name)
+print(time.perf_counter() - start)
+"""
+
+# Seconds from interpreter start to the first drawn window, and to the engine being ready
+# インタプリタ起動から最初のウィンドウが描画されるまで、およびエンジンの準備完了までの秒数
+FIRST_WINDOW = """
+import time
+import tkinter as tk
+import main
+try:
+    root = main.TkinterDnD.Tk() if main.DRAG_DROP_AVAILABLE else tk.Tk()
+except tk.TclError as e:
+    print("skip", str(e).replace(" ", "_"))
+    raise SystemExit(0)
+app = main.PDFToMarkdownConverter(root)
+root.update()
+window = time.time()
+app.engine_ready.wait(120)
+ready = time.time()
+root.destroy()
+print(window, ready)
+"""
+
+
+def build_parser():
+    """Build command-line parser / コマンドラインパーサーを構築"""
+    parser = argparse.ArgumentParser(description="Benchmark the startup of the GUI.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"fresh interpreters per measurement; the median is reported (default: {DEFAULT_RUNS})")
+    parser.add_argument("--max-window", type=float, metavar="SECONDS",
+                        help="report a regression when the first window (or, without a display, "
+                             "the GUI import) takes longer")
+    return parser
+
+
+def run_script(script, cwd):
+    """Run a script in a fresh interpreter and return its output fields / 新しいインタプリタでスクリプトを実行し出力の項目を返す"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    # cwd is an empty directory so no saved config.json is picked up / 保存された config.json を読まないよう cwd は空のディレクトリ
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=cwd, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                           else f"exit status {completed.returncode}")
+    return completed.stdout.strip().splitlines()[-1].split()
+
+
+def measure_import(script, runs, cwd):
+    """Seconds to run an import script, one per run / インポートスクリプトの実行秒数（実行毎）"""
+    return [float(run_script(script, cwd)[0]) for _ in range(runs)]
+
+
+def measure_window(runs, cwd):
+    """(first window, engine ready) seconds per run, or the reason it was skipped / 実行毎の(最初のウィンドウ, エンジン準備完了)の秒数、またはスキップした理由"""
+    import time
+
+    samples = []
+    for _ in range(runs):
+        start = time.time()
+        fields = run_script(FIRST_WINDOW, cwd)
+        if fields[0] == "skip":
+            return fields[1].replace("_", " ")
+        samples.append((float(fields[0]) - start, float(fields[1]) - start))
+    return samples
+
+
+def format_row(name, samples):
+    """Format a result line / 結果の行を整形"""
+    return (f"{name:<24} {statistics.median(samples) * 1000:>10.0f} {min(samples) * 1000:>10.0f} "
+            f"{max(samples) * 1000:>10.0f}")
+
+
+def main(argv=None):
+    """Main function / メイン関数"""
+    args = build_parser().parse_args(argv)
+    runs = max(1, args.runs)
+
+    with tempfile.TemporaryDirectory() as cwd:
+        print(f"{'measurement':<24} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+        import_main = measure_import(IMPORT_MAIN, runs, cwd)
+        print(format_row("import main", import_main), flush=True)
+        print(format_row("import main + engine", measure_import(IMPORT_ENGINE, runs, cwd)), flush=True)
+        window = measure_window(runs, cwd)
+
+    if isinstance(window, str):
+        print(f"first window: skipped ({window})")
+        startup = statistics.median(import_main)
+    else:
+        print(format_row("first window", [first for first, _ready in window]))
+        print(format_row("engine ready", [ready for _first, ready in window]))
+        startup = statistics.median(first for first, _ready in window)
+
+    if args.max_window is not None:
+        if startup > args.max_window:
+            print(f"REGRESSION startup {startup:.2f}s > {args.max_window:.2f}s")
+            return EXIT_REGRESSION
+        print("OK: within startup budget")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Conversion benchmark suite / 変換ベンチマークスイート
+Runs every conversion mode on synthetic text, table and image PDFs and compares
+the results with a saved baseline
+合成したテキスト・表・画像のPDFで全変換モードを実行し、保存したベースラインと比較する
+
+Usage / 使い方:
+    python benchmarks/bench_suite.py --save-baseline baseline.json
+    python benchmarks/bench_suite.py --baseline baseline.json --sizes 1,100
+    python benchmarks/bench_suite.py --sizes 100 --modes low_memory --ceiling-pages 0
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+KINDS = ("text", "table", "image")
+SIZES = (1, 100, 1000)
+MODES = ("all", "all_no_headers", "range", "parallel", "cached", "full", "fast_text", "low_memory")
+
+# Image size for image-heavy documents (keeps 1000 pages manageable) / 画像PDFの画像サイズ（1000ページでも扱える大きさ）
+IMAGE_SIZE = 400
+
+# Memory ceiling of the low_memory mode in MB. Measured full_fidelity peaks on text PDFs
+# (PyMuPDF4LLM 1.28.2, layout mode): 259 MB at 1 page, 339 MB at 20, 377 MB at 200 and
+# 388 MB at 5000, as the layout model and MuPDF store level off. The ceiling sits just
+# above that plateau, so growth with page count shows up; re-measure after upgrading
+# PyMuPDF4LLM.
+# low_memory モードのメモリ上限（MB）。テキストPDFでの full_fidelity の最大メモリの実測値
+# （PyMuPDF4LLM 1.28.2、レイアウトモード）：1ページで259MB、20ページで339MB、200ページで
+# 377MB、5000ページで388MB。レイアウトモデルとMuPDFのストアで頭打ちになる。上限はその
+# 少し上に置き、ページ数に伴う増加を検出する。PyMuPDF4LLM の更新後は測り直す。
+DEFAULT_MEMORY_CEILING = 400
+
+# Pages of the text PDF converted in low_memory mode against the ceiling on every run
+# 毎回 low_memory モードで上限に対して変換するテキストPDFのページ数
+DEFAULT_CEILING_PAGES = 5000
+
+# Slowdown or memory growth reported as a regression / 回帰として報告する速度低下・メモリ増加の割合
+DEFAULT_THRESHOLD = 0.15
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+
+
+def build_parser():
+    """Build command-line parser / コマンドラインパーサーを構築"""
+    parser = argparse.ArgumentParser(description="Benchmark the conversion modes on synthetic PDFs.")
+    parser.add_argument("--kinds", default=",".join(KINDS),
+                        help=f"document kinds (default: {','.join(KINDS)})")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help=f"page counts (default: {','.join(map(str, SIZES))})")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"conversion modes (default: {','.join(MODES)})")
+    parser.add_argument("-j", "--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="worker processes for the parallel mode (default: min(4, CPUs))")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs per case; the fastest is kept (default: 1)")
+    parser.add_argument("--memory-ceiling", type=int, default=DEFAULT_MEMORY_CEILING, metavar="MB",
+                        help="memory ceiling of the low_memory mode; a higher peak is reported as a "
+                             f"regression (default: {DEFAULT_MEMORY_CEILING})")
+    parser.add_argument("--ceiling-pages", type=int, default=DEFAULT_CEILING_PAGES, metavar="N",
+                        help="also convert an N-page text PDF in low_memory mode and check it against "
+                             f"the ceiling; 0 to skip (default: {DEFAULT_CEILING_PAGES})")
+    parser.add_argument("--work-dir",
+                        help="directory for generated PDFs, reused between runs (default: temporary)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare results with a baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"regression threshold as a fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--run-case", nargs=5, metavar=("KIND", "PAGES", "MODE", "PDF", "WORKERS"),
+                        help=argparse.SUPPRESS)
+    return parser
+
+
+def generate_pdf(work_dir, kind, pages):
+    """Create (or reuse) a synthetic PDF / 合成PDFを作成（既存なら再利用）"""
+    from synthetic import make_image_pdf, make_table_pdf, make_text_pdf
+
+    path = os.path.join(work_dir, f"{kind}_{pages}.pdf")
+    if not os.path.exists(path):
+        if kind == "text":
+            make_text_pdf(path, pages)
+        elif kind == "table":
+            make_table_pdf(path, pages)
+        else:
+            make_image_pdf(path, pages, image_size=IMAGE_SIZE)
+    return path
+
+
+def run_case(kind, pages, mode, pdf_path, workers, repeat, memory_ceiling=DEFAULT_MEMORY_CEILING):
+    """Convert once per repeat in this process and return the result / このプロセスで繰り返し変換して結果を返す"""
+    import conversion
+    import output
+    from cache import PageCache
+    from lowmem import MemoryGovernor
+    from presets import BALANCED, FAST_TEXT, FULL_FIDELITY
+    from profiling import peak_rss
+
+    page_numbers = list(range(1, pages + 1))
+    # "all" and "fast_text" measure the balanced and fast_text presets ("full" is "all"
+    # with full_fidelity). The other modes use full_fidelity, as balanced extracts text
+    # pages lightly and would never reach to_markdown, the worker pool, the cache or the
+    # memory-heavy part on the text documents.
+    # "all" と "fast_text" は balanced と fast_text プリセットを計測する（"full" は
+    # full_fidelity の "all"）。balanced はテキストのページを軽量抽出し、テキストの文書では
+    # to_markdown・ワーカープール・キャッシュ・メモリを多く使う部分に到達しないため、
+    # 他のモードは full_fidelity を使う。
+    preset = {"all": BALANCED, "fast_text": FAST_TEXT}.get(mode, FULL_FIDELITY)
+    options = {'add_page_headers': mode != "all_no_headers", 'workers': 1, 'cache': None,
+               'preset': preset}
+    if mode == "range":
+        page_numbers = page_numbers[:max(1, pages // 2)]
+    elif mode == "parallel":
+        options['workers'] = workers
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if mode == "cached":
+            # Fill the cache with the measured options first; only the warm run is measured
+            # 計測と同じオプションで先にキャッシュを埋め、ウォーム実行のみ計測
+            options['cache'] = PageCache(os.path.join(tmp_dir, "cache"))
+            conversion.convert_file(pdf_path, page_numbers, **options)
+
+        best = None
+        output_bytes = 0
+        for run in range(repeat):
+            output_path = os.path.join(tmp_dir, f"out_{run}.md")
+            writer = output.MarkdownWriter(output_path, page_numbers, kind)
+            if mode == "low_memory":
+                options['memory'] = MemoryGovernor(memory_ceiling)
+            start = time.perf_counter()
+            conversion.convert_file(pdf_path, page_numbers, sink=writer, **options)
+            writer.close()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            output_bytes = os.path.getsize(output_path)
+
+        if options['cache'] is not None:
+            options['cache'].close()
+
+    result = {'kind': kind, 'pages': pages, 'mode': mode, 'converted_pages': len(page_numbers),
+              'seconds': best, 'pages_per_s': len(page_numbers) / best if best else None,
+              'peak_rss': peak_rss(), 'output_bytes': output_bytes}
+    if mode == "low_memory":
+        result['memory_ceiling'] = memory_ceiling * 1024 * 1024
+    return result
+
+
+def run_in_subprocess(kind, pages, mode, pdf_path, workers, repeat, memory_ceiling=DEFAULT_MEMORY_CEILING):
+    """Run a case in a fresh interpreter so peak memory is per case / ケース毎の最大メモリを得るため新しいインタプリタで実行"""
+    command = [sys.executable, os.path.abspath(__file__), "--repeat", str(repeat),
+               "--memory-ceiling", str(memory_ceiling),
+               "--run-case", kind, str(pages), mode, pdf_path, str(workers)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                           else f"exit status {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    """Describe the machine and library versions / マシンとライブラリのバージョンを記述"""
+    import pymupdf
+    import pymupdf4llm
+
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'pymupdf': pymupdf.__version__,
+            'pymupdf4llm': getattr(pymupdf4llm, '__version__', None) or getattr(pymupdf4llm, 'version', '')}
+
+
+def compare(results, baseline, threshold):
+    """Return regressions against a baseline / ベースラインに対する回帰を返す"""
+    previous = {(r['kind'], r['pages'], r['mode']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['kind'], result['pages'], result['mode']))
+        if old is None:
+            continue
+        if old['pages_per_s'] and result['pages_per_s'] < old['pages_per_s'] * (1 - threshold):
+            regressions.append(f"{result['kind']}/{result['pages']}/{result['mode']}: "
+                               f"{old['pages_per_s']:.1f} -> {result['pages_per_s']:.1f} pages/s")
+        if old['peak_rss'] and result['peak_rss'] and result['peak_rss'] > old['peak_rss'] * (1 + threshold):
+            regressions.append(f"{result['kind']}/{result['pages']}/{result['mode']}: peak memory "
+                               f"{old['peak_rss'] / 1048576:.0f} -> {result['peak_rss'] / 1048576:.0f} MB")
+    return regressions
+
+
+def ceiling_violations(results):
+    """Return low_memory cases whose peak memory passed the ceiling / 最大メモリが上限を超えた low_memory のケースを返す"""
+    return [f"{result['kind']}/{result['pages']}/{result['mode']}: peak memory "
+            f"{result['peak_rss'] / 1048576:.0f} MB > ceiling {result['memory_ceiling'] / 1048576:.0f} MB"
+            for result in results
+            if result.get('memory_ceiling') and result['peak_rss'] and result['peak_rss'] > result['memory_ceiling']]
+
+
+def format_row(result, baseline_result=None):
+    """Format a result line / 結果の行を整形"""
+    rss = f"{result['peak_rss'] / 1048576:.0f}" if result['peak_rss'] else "-"
+    line = (f"{result['kind']:<6} {result['pages']:>5} {result['mode']:<15} {result['seconds']:>9.2f} "
+            f"{result['pages_per_s']:>9.1f} {rss:>8} {result['output_bytes'] / 1024:>10.0f}")
+    if baseline_result and baseline_result['pages_per_s']:
+        change = result['pages_per_s'] / baseline_result['pages_per_s'] - 1
+        line += f" {change:>+8.0%}"
+    return line
+
+
+def main(argv=None):
+    """Main function / メイン関数"""
+    args = build_parser().parse_args(argv)
+
+    if args.run_case:
+        kind, pages, mode, pdf_path, workers = args.run_case
+        print(json.dumps(run_case(kind, int(pages), mode, pdf_path, int(workers), args.repeat,
+                                  args.memory_ceiling)))
+        return EXIT_OK
+
+    kinds = [k for k in args.kinds.split(",") if k]
+    sizes = [int(n) for n in args.sizes.split(",") if n]
+    modes = [m for m in args.modes.split(",") if m]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    previous = {(r['kind'], r['pages'], r['mode']): r for r in baseline['results']} if baseline else {}
+
+    cases = [(kind, pages, mode) for kind in kinds for pages in sizes for mode in modes
+             if not (mode in ("range", "parallel") and pages < 2)]
+    ceiling_case = ("text", args.ceiling_pages, "low_memory")
+    if args.ceiling_pages > 0 and ceiling_case not in cases:
+        cases.append(ceiling_case)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+
+        print(f"{'kind':<6} {'pages':>5} {'mode':<15} {'seconds':>9} {'pages/s':>9} {'peak MB':>8} "
+              f"{'output KB':>10}" + (f" {'vs base':>8}" if baseline else ""))
+        results = []
+        failed = []
+        for kind, pages, mode in cases:
+            pdf_path = generate_pdf(work_dir, kind, pages)
+            try:
+                result = run_in_subprocess(kind, pages, mode, pdf_path, args.workers, args.repeat,
+                                           args.memory_ceiling)
+            except RuntimeError as e:
+                # A crash or an out-of-memory kill fails the run / クラッシュやメモリ不足での強制終了は実行を失敗にする
+                print(f"{kind:<6} {pages:>5} {mode:<15} failed: {e}")
+                failed.append(f"{kind}/{pages}/{mode}: {e}")
+                continue
+            results.append(result)
+            print(format_row(result, previous.get((kind, pages, mode))), flush=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'threshold': args.threshold, 'results': results},
+                      f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    # The ceiling holds with or without a baseline / 上限はベースラインの有無にかかわらず確認する
+    over_ceiling = ceiling_violations(results)
+    for violation in over_ceiling:
+        print(f"CEILING {violation}")
+    for failure in failed:
+        print(f"FAILED {failure}")
+
+    if baseline:
+        if baseline.get('environment') != environment():
+            print("note: baseline was recorded in a different environment")
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return EXIT_REGRESSION
+        print("OK: no regressions")
+    return EXIT_REGRESSION if over_ceiling or failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
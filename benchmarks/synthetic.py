@@ -0,0 +1,67 @@
+"""
+Synthetic PDF generator for benchmarks / ベンチマーク用の合成PDF生成
+Page content is identical for the same arguments / 同じ引数からは同一内容のページを生成する
+"""
+
+import random
+
+import pymupdf
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud "
+    "exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat."
+)
+
+
+def make_text_pdf(path, pages):
+    """Create a text-only PDF / テキストのみのPDFを作成"""
+    doc = pymupdf.open()
+    for page_num in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_textbox(pymupdf.Rect(72, 72, 540, 720),
+                            f"Section {page_num}\n\n" + (LOREM + "\n\n") * 6,
+                            fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_table_pdf(path, pages, rows=20, columns=5):
+    """Create a PDF with a ruled table on every page / 全ページに罫線付きの表を持つPDFを作成"""
+    doc = pymupdf.open()
+    left, top, width, row_height = 54, 90, 504, 26
+    col_width = width / columns
+    for page_num in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((left, 72), f"Table {page_num}", fontsize=14)
+        for row in range(rows + 1):
+            y = top + row * row_height
+            page.draw_line((left, y), (left + width, y))
+        for column in range(columns + 1):
+            x = left + column * col_width
+            page.draw_line((x, top), (x, top + rows * row_height))
+        for row in range(rows):
+            for column in range(columns):
+                text = f"Col {column + 1}" if row == 0 else f"{page_num}.{row}.{column + 1}"
+                page.insert_text((left + column * col_width + 4, top + row * row_height + 17),
+                                 text, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_image_pdf(path, pages, image_size=1200, seed=0):
+    """Create a PDF with a distinct full-page image on every page / 全ページに異なる全面画像を持つPDFを作成"""
+    rng = random.Random(seed)
+    doc = pymupdf.open()
+    for page_num in range(1, pages + 1):
+        page = doc.new_page()
+        # Noise does not compress, like a scanned page / スキャンページのように圧縮が効かないノイズ画像
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, image_size, image_size,
+                                rng.randbytes(image_size * image_size * 3), False)
+        page.insert_image(pymupdf.Rect(36, 36, 576, 576), pixmap=pixmap)
+        page.insert_text((72, 620), f"Scanned page {page_num}", fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
@@ -0,0 +1,195 @@
+"""
+Content-addressed page conversion cache / コンテンツアドレス方式のページ変換キャッシュ
+Stores the Markdown of each page keyed by a hash of the page content
+ページ内容のハッシュをキーとして各ページのMarkdownを保存する
+"""
+
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+import pymupdf
+import pymupdf4llm
+
+# Bump when the cached Markdown format changes / キャッシュするMarkdownの形式を変えたら更新
+CACHE_FORMAT_VERSION = 1
+
+# Default size limit of the cache / キャッシュサイズ上限の既定値
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Evict down to this fraction of the limit / 上限のこの割合まで削除する
+EVICT_TARGET = 0.9
+
+CACHE_FILENAME = "pages.sqlite3"
+
+
+def default_cache_dir():
+    """Get per-user cache directory / ユーザー毎のキャッシュディレクトリを取得"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return pathlib.Path(base) / "pdf-markdown"
+
+
+def engine_token(options=None):
+    """Identify the converter and its options / 変換器とオプションを識別する文字列"""
+    version = getattr(pymupdf4llm, '__version__', None) or getattr(pymupdf4llm, 'version', '')
+    return f"v{CACHE_FORMAT_VERSION}|pymupdf4llm={version}|pymupdf={pymupdf.__version__}|{options or ''}"
+
+
+class PageFingerprinter:
+    """
+    Hash page content streams and resources / ページのコンテンツストリームとリソースをハッシュ化
+
+    Digests of shared objects (fonts, images, forms) are computed once per document.
+    共有オブジェクト（フォント・画像・フォーム）のダイジェストは文書毎に一度だけ計算する。
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._xref_digests = {}
+
+    def _xref_digest(self, xref):
+        digest = self._xref_digests.get(xref)
+        if digest is None:
+            h = hashlib.sha256()
+            h.update(self.doc.xref_object(xref, compressed=True).encode('utf-8', 'replace'))
+            if self.doc.xref_is_stream(xref):
+                # Raw stream avoids decoding images / 生ストリームを使い画像のデコードを避ける
+                h.update(self.doc.xref_stream_raw(xref) or b'')
+            digest = h.digest()
+            self._xref_digests[xref] = digest
+        return digest
+
+    def fingerprint(self, page_num):
+        """Get hex fingerprint of a 1-based page / 1始まりのページのフィンガープリントを取得"""
+        page = self.doc[page_num - 1]
+        h = hashlib.sha256()
+        h.update(f"{tuple(page.rect)}|{page.rotation}".encode())
+        for xref in page.get_contents():
+            h.update(self.doc.xref_stream(xref) or b'')
+        resources = sorted({item[0] for item in page.get_fonts(full=True)}
+                           | {item[0] for item in page.get_images(full=True)}
+                           | {item[0] for item in page.get_xobjects()})
+        for xref in resources:
+            if xref > 0:
+                h.update(self._xref_digest(xref))
+        return h.hexdigest()
+
+
+class PageCache:
+    """
+    On-disk page cache with a size limit and LRU eviction
+    サイズ上限とLRU削除を持つディスク上のページキャッシュ
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.cache_dir / CACHE_FILENAME, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pages ("
+                         "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+                         "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages(last_used)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def page_keys(self, doc, page_numbers, options=None):
+        """Compute cache keys for pages / ページのキャッシュキーを計算"""
+        fingerprinter = PageFingerprinter(doc)
+        token = engine_token(options)
+        return {page_num: hashlib.sha256(f"{fingerprinter.fingerprint(page_num)}|{token}".encode()).hexdigest()
+                for page_num in page_numbers}
+
+    def contains(self, keys):
+        """Get the subset of keys present in the cache / キャッシュに存在するキーの集合を取得"""
+        keys = list(keys)
+        found = set()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in self._db.execute(
+                    f"SELECT key FROM pages WHERE key IN ({placeholders})", batch))
+        return found
+
+    def get(self, key):
+        """Get cached Markdown or None / キャッシュされたMarkdownを取得（なければNone）"""
+        with self._lock:
+            row = self._db.execute("SELECT content FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE pages SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key, content):
+        """Store Markdown for a key / キーに対応するMarkdownを保存"""
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO pages (key, content, size, last_used) VALUES (?, ?, ?, ?)",
+                             (key, content, size, time.time()))
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def record_miss(self):
+        """Count a page that had to be converted / 変換が必要だったページを数える"""
+        with self._lock:
+            self.misses += 1
+
+    def _evict(self):
+        """Delete least recently used pages / 最も長く使われていないページを削除"""
+        target = self.max_bytes * EVICT_TARGET
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM pages ORDER BY last_used"):
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM pages WHERE key = ?", evicted)
+
+    def reset_counters(self):
+        """Reset hit/miss counters / ヒット・ミスのカウンターをリセット"""
+        self.hits = 0
+        self.misses = 0
+
+    def merge_counters(self, hits, misses):
+        """Add the counters of another process using the same cache / 同じキャッシュを使う別プロセスのカウンターを加算"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def stats_text(self):
+        """Format counters for the log / ログ用にカウンターを整形"""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}%), {self._total_bytes / 1048576:.1f} MB"
+
+    def clear(self):
+        """Delete all cached pages / キャッシュされた全ページを削除"""
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+            self._db.commit()
+            self._db.execute("VACUUM")
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
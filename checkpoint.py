@@ -0,0 +1,131 @@
+"""
+Resume checkpoints for long conversions / 長い変換を再開するためのチェックポイント
+Records converted pages so an interrupted conversion can continue where it stopped
+変換済みページを記録し、中断した変換を途中から再開できるようにする
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+
+from cache import default_cache_dir, engine_token
+
+CHECKPOINT_DIRNAME = "checkpoints"
+
+# Bytes read at a time when hashing the source / ソースをハッシュ化する際に一度に読むバイト数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_checkpoint_dir():
+    """Get per-user checkpoint directory / ユーザー毎のチェックポイントディレクトリを取得"""
+    return default_cache_dir() / CHECKPOINT_DIRNAME
+
+
+def source_hash(pdf_path):
+    """Hash the source PDF file / ソースPDFファイルをハッシュ化"""
+    h = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Checkpoint:
+    """
+    JSON Lines file of completed pages / 完了したページのJSON Linesファイル
+
+    The first line records the source hash and options; each further line holds one
+    page exactly as it was written to the output. Completed pages are only reused
+    when both match, and a torn last line from a killed process is ignored.
+    1行目にソースのハッシュとオプションを記録し、以降の各行に出力へ書き込んだとおりの
+    ページを1つずつ保持する。両方が一致する場合のみ完了ページを再利用し、強制終了で
+    途中まで書かれた最終行は無視する。
+    """
+
+    def __init__(self, pdf_path, options, checkpoint_dir=None, source=None):
+        self.source = source or source_hash(pdf_path)
+        self.options = dict(options, engine=engine_token())
+        directory = pathlib.Path(checkpoint_dir) if checkpoint_dir else default_checkpoint_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{self.source}.jsonl"
+        self.completed = self._load()
+
+        header = {'source': self.source, 'options': self.options}
+        if self.completed:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write(json.dumps(header) + "\n")
+            self._file.flush()
+
+    def _load(self):
+        """Read completed pages of a matching checkpoint / 一致するチェックポイントの完了ページを読み込む"""
+        completed = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                if header.get('source') != self.source or header.get('options') != self.options:
+                    return {}
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    completed[record['page']] = record['content']
+        except (OSError, ValueError):
+            return {}
+        return completed
+
+    def record(self, page_num, content):
+        """Append a completed page / 完了したページを追記"""
+        self._file.write(json.dumps({'page': page_num, 'content': content}, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def resume(self, page_numbers, sink):
+        """
+        Replay completed pages into sink and return (remaining pages, recording sink)
+        完了ページを sink に再生し、(残りのページ, 記録用 sink) を返す
+        """
+        remaining = []
+        for page_num in page_numbers:
+            if page_num in self.completed:
+                sink.write_page(page_num, self.completed[page_num])
+            else:
+                remaining.append(page_num)
+        return remaining, CheckpointSink(sink, self)
+
+    def close(self):
+        """Close and keep the checkpoint for a later resume / 後で再開できるよう残したまま閉じる"""
+        if not self._file.closed:
+            self._file.close()
+
+    def remove(self):
+        """Close and delete the checkpoint after a finished run / 完了した変換のチェックポイントを閉じて削除"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class CheckpointSink:
+    """Forward pages to a sink and record them in a checkpoint / ページを sink に渡しつつチェックポイントに記録"""
+
+    def __init__(self, sink, checkpoint):
+        self.sink = sink
+        self.checkpoint = checkpoint
+
+    @property
+    def pages_written(self):
+        return self.sink.pages_written
+
+    def write_page(self, page_num, content):
+        self.checkpoint.record(page_num, content)
+        self.sink.write_page(page_num, content)
+
+    def skip_page(self, page_num):
+        self.sink.skip_page(page_num)
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,351 @@
+"""
+PDF to Markdown Converter CLI / PDFからMarkdownへの変換CLI
+Headless batch entry point that shares the conversion engine with the GUI
+GUIと変換エンジンを共有するヘッドレスのバッチ用エントリポイント
+
+Usage / 使い方: python cli.py [options] INPUT [INPUT ...]
+"""
+
+import argparse
+import contextlib
+import glob
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+
+from presets import DEFAULT_PRESET, FULL_FIDELITY, PRESETS
+
+# Exit status codes / 終了ステータスコード
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+GLOB_CHARS = set('*?[')
+
+
+def build_parser():
+    """Build command-line parser / コマンドラインパーサーを構築"""
+    parser = argparse.ArgumentParser(
+        prog="pdf-markdown",
+        description="Convert PDF files to Markdown without the GUI.")
+    parser.add_argument("inputs", nargs="+", metavar="INPUT",
+                        help="PDF file, directory or glob pattern (e.g. 'docs/**/*.pdf')")
+    parser.add_argument("-p", "--pages", default="",
+                        help="page range to convert, e.g. '1-5' or '3,7,10' (default: all pages)")
+    parser.add_argument("--no-page-headers", dest="add_page_headers", action="store_false",
+                        help="do not add '# Page N' headers")
+    parser.add_argument("-o", "--output-dir",
+                        help="directory for Markdown files (default: next to each PDF)")
+    parser.add_argument("--compress", choices=("gzip", "zstd"),
+                        help="write <name>.md.gz or <name>.md.zst (zstd needs the zstandard package)")
+    parser.add_argument("--page-index", action="store_true",
+                        help="write a sidecar index (<output>.md.index.json) of each page's byte range and hash")
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the existing output in place, converting only pages that changed, "
+                             "were added or moved since the previous --incremental run")
+    parser.add_argument("--images", action="store_true",
+                        help="save embedded images once per document into <output>_images/ "
+                             "(images/ inside a shard directory) and link them after each page's text")
+    parser.add_argument("--image-workers", type=int, default=2, metavar="N",
+                        help="processes decoding and writing image files (default: 2)")
+    parser.add_argument("--strip-repeated", action="store_true",
+                        help="remove running headers, footers and page numbers found on most pages")
+    parser.add_argument("--shard-size", type=float, metavar="MB",
+                        help="write a directory of Markdown shards of at most this size with a manifest")
+    parser.add_argument("--shard-pages", type=int, metavar="N",
+                        help="write a directory of Markdown shards of at most N pages with a manifest")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="search directories recursively")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes per document (default: 1)")
+    parser.add_argument("--preset", choices=PRESETS, default=DEFAULT_PRESET,
+                        help="speed/quality trade-off: fast_text extracts text only, balanced sends only "
+                             "complex pages through to_markdown, full_fidelity sends every page "
+                             f"(default: {DEFAULT_PRESET})")
+    parser.add_argument("--full", dest="preset", action="store_const", const=FULL_FIDELITY,
+                        help="same as --preset full_fidelity")
+    parser.add_argument("--page-timeout", type=float, metavar="SECONDS",
+                        help="convert pages in isolated workers and cut off any page that takes longer")
+    parser.add_argument("--page-memory", type=int, metavar="MB",
+                        help="convert pages in isolated workers and cut off any worker that uses more memory")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="convert in one process, reopening the PDF and trimming the MuPDF store "
+                             "periodically to bound memory (ignores --workers)")
+    parser.add_argument("--memory-ceiling", type=int, metavar="MB",
+                        help="low-memory mode with a ceiling: trim and shrink the reopen interval "
+                             "whenever RSS goes above it (implies --low-memory)")
+    parser.add_argument("--reopen-pages", type=int, default=100, metavar="N",
+                        help="pages converted before the PDF is reopened in low-memory mode (default: 100)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="do not read or write the page cache")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="delete all cached pages before converting")
+    parser.add_argument("--cache-dir",
+                        help="page cache directory (default: per-user cache directory)")
+    parser.add_argument("--cache-size", type=int, default=512, metavar="MB",
+                        help="page cache size limit in MB (default: 512)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="do not resume from or write resume checkpoints")
+    parser.add_argument("--mmap", action="store_true",
+                        help="open PDFs from a memory-mapped buffer")
+    parser.add_argument("--timings", metavar="PATH",
+                        help="write per-page and per-document stage timings (.csv, otherwise JSON Lines)")
+    parser.add_argument("--profiler", choices=("cprofile", "pyinstrument"),
+                        help="profile the conversion loop")
+    parser.add_argument("--profiler-output", metavar="PATH",
+                        help="profiler output file (default: pdf-markdown.prof or pdf-markdown.html)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="only print errors")
+    return parser
+
+
+def collect_inputs(inputs, recursive=False):
+    """Expand files, directories and globs into PDF paths / ファイル・ディレクトリ・globをPDFパスに展開"""
+    pdf_paths = []
+    missing = []
+    for item in inputs:
+        if GLOB_CHARS & set(item):
+            matches = [path for path in glob.glob(item, recursive=True)
+                       if path.lower().endswith('.pdf') and os.path.isfile(path)]
+        elif os.path.isdir(item):
+            pattern = '**/*' if recursive else '*'
+            matches = [str(path) for path in pathlib.Path(item).glob(pattern)
+                       if path.suffix.lower() == '.pdf' and path.is_file()]
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = []
+
+        if not matches:
+            missing.append(item)
+        pdf_paths.extend(sorted(matches))
+
+    # Remove duplicates while keeping order / 順序を保ったまま重複を削除
+    unique = list(dict.fromkeys(os.path.abspath(path) for path in pdf_paths))
+    return unique, missing
+
+
+def convert_one(pdf_path, args, log, cache=None, profile=None):
+    """Convert one PDF and return output path / PDFを1つ変換して出力パスを返す"""
+    from session import DocumentSession
+
+    # Open the PDF once for counting, checkpoints and conversion / ページ数・チェックポイント・変換でPDFを一度だけ開く
+    with profile.opening() if profile is not None else contextlib.nullcontext():
+        session = DocumentSession(pdf_path, use_mmap=args.mmap)
+    with session:
+        return _convert_session(session, args, log, cache, profile)
+
+
+def _convert_session(session, args, log, cache=None, profile=None):
+    """Convert an open document and return output path / 開いているドキュメントを変換して出力パスを返す"""
+    import conversion
+    import output
+    from prescan import summary_text
+
+    pdf_path = session.pdf_path
+    total_pages = session.page_count
+    if total_pages == 0:
+        raise ValueError("the PDF contains no pages")
+    page_numbers = conversion.parse_page_range(args.pages, total_pages)
+
+    checkpoint = None
+    if args.resume:
+        from checkpoint import CHECKPOINT_DIRNAME, Checkpoint
+        checkpoint_dir = pathlib.Path(args.cache_dir) / CHECKPOINT_DIRNAME if args.cache_dir else None
+        checkpoint = Checkpoint(pdf_path, {'add_page_headers': args.add_page_headers,
+                                           'page_range': args.pages.strip(),
+                                           'preset': args.preset, 'images': args.images,
+                                           'strip_repeated': args.strip_repeated},
+                                checkpoint_dir,
+                                source=session.source_hash())
+        resumed = sum(1 for page_num in page_numbers if page_num in checkpoint.completed)
+        if resumed:
+            log(f"  resuming: {resumed}/{len(page_numbers)} pages from checkpoint")
+
+    incremental = None
+    memory = None
+    if args.low_memory or args.memory_ceiling:
+        from lowmem import MemoryGovernor
+        memory = MemoryGovernor(args.memory_ceiling, args.reopen_pages)
+
+    watchdog = None
+    if args.page_timeout or args.page_memory:
+        from isolation import REASON_TEXT, PageWatchdog
+        watchdog = PageWatchdog(pdf_path, args.page_timeout, args.page_memory,
+                                on_exceeded=lambda page_num, reason, seconds: log(
+                                    f"  page {page_num}: {REASON_TEXT[reason]} after {seconds:.1f}s, "
+                                    f"wrote plain text"))
+
+    if args.shard_size or args.shard_pages:
+        output_path = output.allocate_output_path(pdf_path, args.pages.strip(), args.output_dir,
+                                                  suffix="_shards")
+        max_bytes = int(args.shard_size * 1024 * 1024) if args.shard_size else None
+        writer = output.ShardedMarkdownWriter(output_path, page_numbers, pathlib.Path(pdf_path).stem,
+                                              args.pages.strip(), max_bytes, args.shard_pages)
+    elif args.incremental:
+        from incremental import IncrementalUpdate
+        # Same name as the previous run, replaced when finished / 前回と同じ名前で、完了時に置き換える
+        output_path = output.allocate_output_path(pdf_path, args.pages.strip(), args.output_dir, unique=False)
+        incremental = IncrementalUpdate(output_path, session.doc, page_numbers,
+                                        {'add_page_headers': args.add_page_headers, 'preset': args.preset,
+                                         'images': args.images, 'strip_repeated': args.strip_repeated})
+        writer = output.MarkdownWriter(output_path, page_numbers, pathlib.Path(pdf_path).stem,
+                                       args.pages.strip(), index=True, fingerprints=incremental.fingerprints,
+                                       source=incremental.source, overwrite=True)
+    else:
+        output_path = output.allocate_output_path(pdf_path, args.pages.strip(), args.output_dir,
+                                                  suffix=output.output_suffix(args.compress))
+        writer = output.MarkdownWriter(output_path, page_numbers, pathlib.Path(pdf_path).stem,
+                                       args.pages.strip(), index=args.page_index, compression=args.compress)
+
+    repeated = None
+    if args.strip_repeated:
+        from repeated import RepeatedRegions
+        repeated = RepeatedRegions()
+
+    images = None
+    if args.images:
+        from images import SHARD_IMAGES_DIRNAME, ImageExtractor, image_dir_for
+        if args.shard_size or args.shard_pages:
+            images = ImageExtractor(output_path / SHARD_IMAGES_DIRNAME, workers=args.image_workers)
+        else:
+            images = ImageExtractor(image_dir_for(output_path), workers=args.image_workers)
+    try:
+        conversion.convert_file(pdf_path, page_numbers, add_page_headers=args.add_page_headers,
+                                workers=args.workers,
+                                on_error=lambda page_num, error: log(f"  page {page_num}: {error}"),
+                                sink=writer, cache=cache, checkpoint=checkpoint, profile=profile,
+                                session=session, preset=args.preset,
+                                on_prescan=lambda plan: log(f"  pages: {summary_text(plan)}"),
+                                watchdog=watchdog, incremental=incremental, memory=memory, images=images,
+                                repeated=repeated)
+        if images is not None:
+            images.close()
+    except BaseException:
+        # Keep the checkpoint so the next run resumes / 次回再開できるようチェックポイントは残す
+        if checkpoint is not None:
+            checkpoint.close()
+        if incremental is not None:
+            incremental.close()
+        if images is not None:
+            # Saved images stay for the pages kept in the checkpoint / チェックポイントに残るページのため保存済みの画像は残す
+            images.close()
+        writer.discard()
+        raise
+
+    if checkpoint is not None:
+        checkpoint.remove()
+    if incremental is not None:
+        log(f"  incremental: {incremental.summary_text()}")
+    if memory is not None:
+        log(f"  memory: {memory.summary_text()}")
+    if images is not None:
+        log(f"  images: {images.summary_text()}")
+    if repeated is not None:
+        log(f"  headers/footers: {repeated.summary_text()}")
+    if not writer.pages_written:
+        writer.discard()
+        raise ValueError("no content could be converted")
+    writer.close()
+    # The name may have moved on if another file took it meanwhile / その間に他のファイルが名前を使った場合は次の名前になる
+    return writer.output_path
+
+
+def main(argv=None):
+    """Main function / メイン関数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if ((args.shard_size is not None and args.shard_size <= 0)
+            or (args.shard_pages is not None and args.shard_pages < 1)):
+        parser.error("--shard-size and --shard-pages must be positive")
+    if args.image_workers < 1:
+        parser.error("--image-workers must be at least 1")
+    if args.reopen_pages < 1 or (args.memory_ceiling is not None and args.memory_ceiling < 1):
+        parser.error("--reopen-pages and --memory-ceiling must be positive")
+    if args.incremental and (args.shard_size or args.shard_pages):
+        parser.error("--incremental cannot be combined with --shard-size or --shard-pages")
+    if args.compress and (args.page_index or args.incremental or args.shard_size or args.shard_pages):
+        parser.error("--compress cannot be combined with --page-index, --incremental or shards")
+    if args.compress == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            parser.error("--compress zstd requires zstandard (pip install zstandard)")
+
+    cache = None
+    if args.use_cache or args.clear_cache:
+        from cache import PageCache
+        cache = PageCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+        if args.clear_cache:
+            cache.clear()
+        if not args.use_cache:
+            cache.close()
+            cache = None
+
+    pdf_paths, missing = collect_inputs(args.inputs, args.recursive)
+    for item in missing:
+        print(f"error: no PDF files found for {item}", file=sys.stderr)
+    if not pdf_paths:
+        print("error: no input PDF files", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    profiler_output = args.profiler_output
+    if args.profiler and not profiler_output:
+        profiler_output = "pdf-markdown.prof" if args.profiler == "cprofile" else "pdf-markdown.html"
+
+    from profiling import DocumentProfile, export_profiles, profiler_hook
+    profiles = []
+    failures = len(missing)
+    try:
+        with profiler_hook(args.profiler, profiler_output):
+            for index, pdf_path in enumerate(pdf_paths, start=1):
+                log(f"[{index}/{len(pdf_paths)}] {pdf_path}")
+                start = time.perf_counter()
+                if cache is not None:
+                    cache.reset_counters()
+                profile = DocumentProfile(pdf_path)
+                try:
+                    output_path = convert_one(pdf_path, args, log, cache, profile)
+                except KeyboardInterrupt:
+                    print("interrupted", file=sys.stderr)
+                    return EXIT_INTERRUPTED
+                except Exception as e:
+                    failures += 1
+                    print(f"error: {pdf_path}: {e}", file=sys.stderr)
+                    continue
+                profiles.append(profile)
+                if cache is not None:
+                    log(f"  cache: {cache.stats_text()}")
+                log(f"  timing: {profile.summary_text()}")
+                log(f"  -> {output_path} ({time.perf_counter() - start:.1f}s)")
+                print(output_path)
+    except ValueError as e:
+        # Unavailable profiler / 利用できないプロファイラー
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    finally:
+        if args.timings and profiles:
+            export_profiles(profiles, args.timings)
+            log(f"timings: {args.timings}")
+        if args.profiler and os.path.exists(profiler_output):
+            log(f"profile: {profiler_output}")
+
+    return EXIT_FAILED if failures else EXIT_OK
+
+
+if __name__ == "__main__":
+    # Required for worker processes in frozen executables / 実行ファイル化した場合のワーカープロセスに必要
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,705 @@
+"""
+PDF to Markdown conversion engine / PDFからMarkdownへの変換エンジン
+Converts PDF pages with PyMuPDF4LLM independently of the GUI
+GUIから独立してPyMuPDF4LLMでPDFページを変換する
+"""
+
+import contextlib
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pymupdf4llm
+import pymupdf
+
+from output import ResultCollector
+from presets import DEFAULT_PRESET, ROUTE_FULL, ROUTE_TEXT, preset_route
+from prescan import COMPLEX, classify_pages, extract_simple
+from session import DocumentSession
+
+# Pages handed to a single to_markdown call / to_markdown 1回の呼び出しに渡すページ数
+DEFAULT_BATCH_SIZE = 16
+
+# Shards queued per worker for load balancing / 負荷分散のためにワーカー毎にキューするシャード数
+SHARDS_PER_WORKER = 4
+
+# Document opened once in each worker process / 各ワーカープロセスで一度だけ開くドキュメント
+_worker_doc = None
+_worker_hdr_info = None
+
+# Interval for checking cancellation while waiting on workers / ワーカー待機中にキャンセルを確認する間隔
+CANCEL_POLL_INTERVAL = 0.2
+
+# Pages the parent may write ahead of an unfinished worker page; they wait in the
+# sink's reorder buffer, so this bounds its memory
+# 未完了のワーカーのページより先に親プロセスが書き込めるページ数。sink の並べ替え
+# バッファで待つため、そのメモリの上限になる
+PARENT_PAGES_AHEAD = 2 * DEFAULT_BATCH_SIZE
+
+
+class ConversionCancelled(Exception):
+    """Raised when a conversion is cancelled / 変換がキャンセルされた時に発生"""
+
+
+def check_cancelled(cancel_event):
+    """Raise if cancellation was requested / キャンセルが要求されていれば例外を発生"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ConversionCancelled()
+
+
+def page_header(page_num, add_page_headers, separator="\n\n"):
+    """Build the text placed before a page / ページの前に置くテキストを生成"""
+    if add_page_headers:
+        return f"\n\n# Page {page_num}\n\n"
+    return separator
+
+
+def page_separator(page_numbers, total_pages):
+    """
+    Text placed before a page without a header / ヘッダーなしでページの前に置くテキスト
+    A whole-document conversion joins pages without separators / 全ページの変換では区切りなしでページを連結する
+    """
+    return "" if list(page_numbers) == list(range(1, total_pages + 1)) else "\n\n"
+
+
+def parse_page_range(page_range_str, total_pages):
+    """
+    Parse page range string and return list of page numbers / ページ範囲文字列を解析してページ番号のリストを返す
+    Raises ValueError for invalid input / 無効な入力には ValueError を発生させる
+    """
+    if not page_range_str.strip():
+        # Return all pages if empty / 空の場合は全ページを返す
+        return list(range(1, total_pages + 1))
+
+    pages = []
+    # Split by comma / カンマで分割
+    for part in page_range_str.split(','):
+        part = part.strip()
+        if '-' in part:
+            # Range specification like "1-5" / "1-5"のような範囲指定
+            start, end = part.split('-', 1)
+            start = int(start.strip())
+            end = int(end.strip())
+
+            if start < 1 or end > total_pages or start > end:
+                raise ValueError(f"Invalid range: {part}")
+
+            pages.extend(range(start, end + 1))
+        else:
+            # Single page number / 単一ページ番号
+            page_num = int(part)
+            if page_num < 1 or page_num > total_pages:
+                raise ValueError(f"Page {page_num} out of range")
+            pages.append(page_num)
+
+    # Remove duplicates and sort / 重複を削除してソート
+    return sorted(set(pages))
+
+
+def _chunk_page_number(chunk, fallback):
+    """Get 1-based page number of a page chunk / ページチャンクの1始まりページ番号を取得"""
+    metadata = chunk.get('metadata') or {}
+    # Newer versions use 'page_number', older ones 'page' / 新しい版は'page_number'、古い版は'page'
+    return metadata.get('page_number') or metadata.get('page') or fallback
+
+
+def _header_info(doc, page_numbers):
+    """Compute heading levels once for the whole selection / 選択範囲全体の見出しレベルを一度だけ計算"""
+    identify_headers = getattr(pymupdf4llm, 'IdentifyHeaders', None)
+    if identify_headers is None:
+        # Not available in layout mode / レイアウトモードでは利用不可
+        return None
+    try:
+        return identify_headers(doc, pages=[n - 1 for n in page_numbers])
+    except Exception:
+        return None
+
+
+def markdown_options(hdr_info=None):
+    """
+    Get to_markdown keyword arguments that shape the page text / ページのテキストを左右する to_markdown のキーワード引数を取得
+    Layout mode removes page headers and footers itself; the other mode takes margins and heading levels.
+    レイアウトモードはページのヘッダー・フッターを自身で除去し、それ以外のモードは余白と見出しレベルを受け付ける。
+    """
+    if getattr(pymupdf4llm, 'IdentifyHeaders', None) is None:
+        return {'header': True, 'footer': True}
+    options = {'margins': 0}
+    if hdr_info is not None:
+        options['hdr_info'] = hdr_info
+    return options
+
+
+def cache_options(hdr_info=None):
+    """Describe the to_markdown options for page cache keys / ページキャッシュのキーに使う to_markdown オプションの文字列"""
+    options = markdown_options(hdr_info)
+    if hdr_info is not None and 'hdr_info' in options:
+        # Heading levels depend on the selected pages / 見出しレベルは選択したページに依存する
+        options['hdr_info'] = (sorted(getattr(hdr_info, 'header_id', {}).items()),
+                               getattr(hdr_info, 'body_limit', None))
+    return repr(sorted(options.items()))
+
+
+def convert_single_page(doc, page_num, hdr_info=None):
+    """Convert one page in place without copying it / ページをコピーせずにその場で1ページを変換"""
+    return pymupdf4llm.to_markdown(doc, pages=[page_num - 1], **markdown_options(hdr_info))
+
+
+def iter_page_chunks(doc, page_numbers, batch_size=DEFAULT_BATCH_SIZE, hdr_info=None, on_batch=None):
+    """
+    Yield (page_num, markdown, error) converting each page exactly once
+    各ページを一度だけ変換して(ページ番号, Markdown, エラー)を返す
+
+    on_batch(page_numbers, seconds) is called after each to_markdown call.
+    to_markdown の各呼び出し後に on_batch(ページ番号のリスト, 秒数) を呼び出す。
+    """
+    page_numbers = list(page_numbers)
+    if hdr_info is None:
+        hdr_info = _header_info(doc, page_numbers)
+    kwargs = markdown_options(hdr_info)
+
+    for start in range(0, len(page_numbers), batch_size):
+        batch = page_numbers[start:start + batch_size]
+        batch_start = time.perf_counter()
+        try:
+            chunks = pymupdf4llm.to_markdown(doc, pages=[n - 1 for n in batch],
+                                             page_chunks=True, **kwargs)
+        except Exception:
+            # Retry the failed batch page by page / 失敗したバッチをページ毎に再試行
+            for page_num in batch:
+                page_start = time.perf_counter()
+                try:
+                    md_text, error = convert_single_page(doc, page_num, hdr_info), None
+                except Exception as e:
+                    md_text, error = None, e
+                if on_batch:
+                    on_batch([page_num], time.perf_counter() - page_start)
+                yield page_num, md_text, error
+            continue
+        if on_batch:
+            on_batch(batch, time.perf_counter() - batch_start)
+
+        for fallback, chunk in zip(batch, chunks):
+            yield _chunk_page_number(chunk, fallback), chunk.get('text', ''), None
+
+
+def _iter_full_chunks(doc, page_numbers, hdr_info=None, on_batch=None, watchdog=None, cancel_event=None):
+    """Yield (page_num, markdown, error) from to_markdown, in process or under watchdog / to_markdown の結果をプロセス内または watchdog の下で返す"""
+    if watchdog is None:
+        return iter_page_chunks(doc, page_numbers, hdr_info=hdr_info, on_batch=on_batch)
+    return watchdog.iter_chunks(page_numbers, hdr_info, on_batch, lambda: check_cancelled(cancel_event))
+
+
+def _iter_cached_chunks(doc, page_numbers, cache, hdr_info=None, on_batch=None, watchdog=None,
+                        cancel_event=None):
+    """
+    Yield (page_num, markdown, error) reusing cached pages / キャッシュ済みページを再利用して(ページ番号, Markdown, エラー)を返す
+    Only pages missing from the cache are converted / キャッシュにないページのみ変換する
+    """
+    keys = cache.page_keys(doc, page_numbers, cache_options(hdr_info))
+    cached = cache.contains(keys.values())
+    converted = _iter_full_chunks(doc, [n for n in page_numbers if keys[n] not in cached],
+                                  hdr_info, on_batch, watchdog, cancel_event)
+
+    for page_num in page_numbers:
+        if keys[page_num] in cached:
+            md_text = cache.get(keys[page_num])
+            if md_text is not None:
+                yield page_num, md_text, None
+                continue
+            # Evicted since the lookup / 確認後に削除された
+            try:
+                md_text = convert_single_page(doc, page_num, hdr_info)
+            except Exception as e:
+                yield page_num, None, e
+                continue
+        else:
+            cache.record_miss()
+            page_num, md_text, error = next(converted)
+            if error is not None:
+                yield page_num, None, error
+                continue
+            if watchdog is not None and page_num in watchdog.exceeded:
+                # Fallback text is not a conversion result / 代替テキストは変換結果ではない
+                yield page_num, md_text, None
+                continue
+        cache.put(keys[page_num], md_text)
+        yield page_num, md_text, None
+
+
+def convert_light_page(doc, page_num, page_class, hdr_info=None, on_batch=None):
+    """
+    Convert a page that the pre-scan found not complex / 事前スキャンで複雑でないと判定されたページを変換
+    Returns (page_num, markdown, error) / (ページ番号, Markdown, エラー) を返す
+    """
+    start = time.perf_counter()
+    try:
+        md_text, error = extract_simple(doc[page_num - 1], page_class, hdr_info), None
+    except Exception as e:
+        md_text, error = None, e
+    if on_batch:
+        on_batch([page_num], time.perf_counter() - start)
+    return page_num, md_text, error
+
+
+def _iter_routed_chunks(doc, page_numbers, plan, full_chunks, hdr_info=None, on_batch=None):
+    """
+    Yield (page_num, markdown, error) in page order, taking complex pages from full_chunks
+    複雑なページは full_chunks から取り出し、ページ順に(ページ番号, Markdown, エラー)を返す
+    """
+    for page_num in page_numbers:
+        if plan[page_num] == COMPLEX:
+            yield next(full_chunks)
+        else:
+            yield convert_light_page(doc, page_num, plan[page_num], hdr_info, on_batch)
+
+
+def convert_document(doc, page_numbers=None, add_page_headers=True, separator="\n\n",
+                     on_page=None, on_error=None, cancel_event=None, sink=None, cache=None,
+                     profile=None, plan=None, watchdog=None):
+    """
+    Convert pages in a single pass into sink and return it
+    ページを1パスで sink に変換して sink を返す
+
+    Pages go to sink.write_page / sink.skip_page as soon as they are converted; by
+    default they are collected in memory (ResultCollector). Pages found in cache
+    (PageCache) are not converted again.
+    ページは変換され次第 sink.write_page / sink.skip_page に渡される。既定では
+    メモリに収集する（ResultCollector）。cache（PageCache）にあるページは再変換しない。
+
+    on_page(page_num, done, total) is called after each page, on_error(page_num, error)
+    for pages that could not be converted. ConversionCancelled is raised once
+    cancel_event is set. Stage timings are recorded in profile (DocumentProfile).
+    各ページ変換後に on_page(ページ番号, 完了数, 総数) を、変換できなかったページには
+    on_error(ページ番号, エラー) を呼び出す。cancel_event がセットされると
+    ConversionCancelled を発生させる。段階別の時間は profile（DocumentProfile）に記録する。
+
+    With a pre-scan plan (page -> class, see prescan.py) only complex pages go through
+    to_markdown; the others use the lightweight extractor and are not cached.
+    事前スキャンの plan（ページ -> 分類、prescan.py参照）がある場合は複雑なページのみ
+    to_markdown を通し、それ以外は軽量抽出を使用してキャッシュしない。
+    With a watchdog (PageWatchdog) to_markdown runs in an isolated worker under its
+    time and memory budget.
+    watchdog（PageWatchdog）がある場合、to_markdown は独立したワーカーで時間とメモリの
+    上限の下で実行する。
+    """
+    if page_numbers is None:
+        page_numbers = range(1, len(doc) + 1)
+    page_numbers = list(page_numbers)
+    total = len(page_numbers)
+    if sink is None:
+        sink = ResultCollector()
+    result = sink
+    on_batch = None
+    if profile is not None:
+        sink = profile.wrap(sink)
+        on_batch = profile.record_batch
+
+    full_pages = page_numbers
+    if plan is not None:
+        full_pages = [page_num for page_num in page_numbers if plan[page_num] == COMPLEX]
+    hdr_info = _header_info(doc, full_pages) if full_pages else None
+    if cache is not None:
+        chunks = _iter_cached_chunks(doc, full_pages, cache, hdr_info, on_batch, watchdog, cancel_event)
+    else:
+        chunks = _iter_full_chunks(doc, full_pages, hdr_info, on_batch, watchdog, cancel_event)
+    if plan is not None:
+        chunks = _iter_routed_chunks(doc, page_numbers, plan, chunks, hdr_info, on_batch)
+
+    for done, (page_num, md_text, error) in enumerate(chunks, start=1):
+        check_cancelled(cancel_event)
+        if error is not None:
+            sink.skip_page(page_num)
+            if on_error:
+                on_error(page_num, error)
+            continue
+
+        sink.write_page(page_num, page_header(page_num, add_page_headers, separator) + md_text)
+        if on_page:
+            on_page(page_num, done, total)
+
+    return result
+
+
+def convert_document_bounded(pdf_path, page_numbers, memory, add_page_headers=True, separator="\n\n",
+                             on_page=None, on_error=None, cancel_event=None, sink=None, cache=None,
+                             profile=None, plan=None, watchdog=None):
+    """
+    Convert pages into sink under a memory ceiling and return it / メモリ上限の下でページを sink に変換して返す
+
+    memory (MemoryGovernor, see lowmem.py) splits the pages into windows; each window
+    is converted by convert_document on a freshly opened document.
+    memory（MemoryGovernor、lowmem.py参照）がページをウィンドウに分け、各ウィンドウを
+    新たに開いた文書上で convert_document により変換する。
+    """
+    page_numbers = list(page_numbers)
+    total = len(page_numbers)
+    if sink is None:
+        sink = ResultCollector()
+    result = sink
+    sink = memory.wrap(sink)
+
+    done = 0
+    for window in memory.windows(page_numbers):
+        report = None
+        if on_page:
+            # Progress against all pages / 全ページに対する進捗
+            report = lambda page_num, count, _total, offset=done: on_page(page_num, offset + count, total)
+        with memory.open(pdf_path) as doc:
+            convert_document(doc, window, add_page_headers=add_page_headers, separator=separator,
+                             on_page=report, on_error=on_error, cancel_event=cancel_event, sink=sink,
+                             cache=cache, profile=profile, plan=plan, watchdog=watchdog)
+        done += len(window)
+    return result
+
+
+def default_worker_count():
+    """Get default number of worker processes / ワーカープロセス数の既定値を取得"""
+    return os.cpu_count() or 1
+
+
+def _init_worker(pdf_path, hdr_info):
+    """Open the PDF once per worker process / ワーカープロセス毎にPDFを一度だけ開く"""
+    global _worker_doc, _worker_hdr_info
+    _worker_doc = pymupdf.open(pdf_path)
+    _worker_hdr_info = hdr_info
+
+
+def _convert_shard(page_numbers):
+    """
+    Convert a shard of pages in a worker / ワーカーでページのシャードを変換
+    Returns (page_num, markdown, error, to_markdown seconds) / (ページ番号, Markdown, エラー, to_markdown の秒数) を返す
+    """
+    seconds = {}
+
+    def on_batch(batch, elapsed):
+        for page_num in batch:
+            seconds[page_num] = elapsed / len(batch)
+
+    results = []
+    for page_num, md_text, error in iter_page_chunks(_worker_doc, page_numbers,
+                                                     hdr_info=_worker_hdr_info, on_batch=on_batch):
+        # Errors are sent back as text so they always pickle / エラーは確実にpickleできるよう文字列で返す
+        results.append((page_num, md_text, None if error is None else str(error), seconds.get(page_num)))
+    return results
+
+
+def _split_shards(page_numbers, workers):
+    """Split pages into contiguous shards / ページを連続したシャードに分割"""
+    shard_size = -(-len(page_numbers) // (workers * SHARDS_PER_WORKER))
+    shard_size = max(1, min(DEFAULT_BATCH_SIZE, shard_size))
+    return [page_numbers[i:i + shard_size] for i in range(0, len(page_numbers), shard_size)]
+
+
+def _run_shards(pdf_path, shards, workers, hdr_info, on_shard, cancel_event=None, on_wait=None):
+    """
+    Run shards on a process pool and return shards lost to a crashed worker
+    プロセスプールでシャードを実行し、ワーカーのクラッシュで失われたシャードを返す
+    on_wait() does a little work of the caller's while the workers run and returns
+    whether it has more; otherwise the loop sleeps until a shard finishes.
+    on_wait() はワーカーの実行中に呼び出し側の処理を少し行い、まだ残っているかを返す。
+    なければシャードが完了するまで待機する。
+    """
+    # Spawn keeps workers independent of the GUI process / spawnでワーカーをGUIプロセスから独立させる
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context,
+                                   initializer=_init_worker, initargs=(pdf_path, hdr_info))
+    lost_shards = []
+    try:
+        futures = {executor.submit(_convert_shard, shard): shard for shard in shards}
+        pending = set(futures)
+        while pending:
+            check_cancelled(cancel_event)
+            busy = on_wait() if on_wait is not None else False
+            finished, pending = wait(pending, timeout=0 if busy else CANCEL_POLL_INTERVAL,
+                                     return_when=FIRST_COMPLETED)
+            for future in sorted(finished, key=lambda f: futures[f][0]):
+                try:
+                    shard_results = future.result()
+                except BrokenProcessPool:
+                    lost_shards.append(futures[future])
+                    continue
+                except Exception as e:
+                    shard_results = [(page_num, None, str(e), None) for page_num in futures[future]]
+                on_shard(shard_results)
+    except ConversionCancelled:
+        # Drop queued shards without waiting for running ones / 実行中のシャードを待たずにキュー済みを破棄
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+    return lost_shards
+
+
+def convert_document_parallel(pdf_path, page_numbers, workers=None, add_page_headers=True,
+                              separator="\n\n", on_page=None, on_error=None, cancel_event=None,
+                              sink=None, cache=None, profile=None, doc=None, plan=None,
+                              watchdog=None):
+    """
+    Convert pages on a process pool into sink and return it
+    プロセスプールでページを sink に変換して sink を返す
+
+    Each worker opens the PDF once by path and converts shards of pages. A page that
+    fails, or that crashes its worker, is reported through on_error and skipped.
+    各ワーカーはパスからPDFを一度だけ開き、ページのシャードを変換する。失敗したページや
+    ワーカーをクラッシュさせたページは on_error で通知してスキップする。
+    Shards finish out of order, so sink must restore page order (see MarkdownWriter).
+    シャードは順不同で完了するため、sink がページ順を復元する必要がある（MarkdownWriter参照）。
+    An already open doc is used for cache keys and heading levels instead of reopening the file.
+    開いている doc があれば、キャッシュキーと見出しレベルの計算にファイルを開き直さずに使用する。
+    With a pre-scan plan, pages that are not complex are extracted here and only complex
+    pages are sent to the workers. Those and cached pages are written in page order
+    while the workers run, at most PARENT_PAGES_AHEAD ahead of the first unfinished
+    worker page, so the sink's reorder buffer stays bounded.
+    事前スキャンの plan がある場合、複雑でないページはここで抽出し、複雑なページのみ
+    ワーカーに送る。それらとキャッシュ済みのページはワーカーの実行中にページ順に書き込み、
+    未完了の最初のワーカーのページより最大 PARENT_PAGES_AHEAD ページ先までとするため、
+    sink の並べ替えバッファは上限を超えない。
+    With a watchdog (PageWatchdog) its isolated workers are used instead of the pool,
+    so a page over budget is cut off without losing the others.
+    watchdog（PageWatchdog）がある場合はプールの代わりにその独立したワーカーを使用し、
+    上限を超えたページを他のページに影響させずに打ち切る。
+    """
+    page_numbers = list(page_numbers)
+    total = len(page_numbers)
+    workers = max(1, workers or default_worker_count())
+    if sink is None:
+        sink = ResultCollector()
+    result = sink
+    if profile is not None:
+        sink = profile.wrap(sink)
+
+    done = 0
+    keys = {}
+    on_batch = profile.record_batch if profile is not None else None
+    # Worker pages not yet written, and parent pages written ahead of them
+    # まだ書き込んでいないワーカーのページと、それより先に書き込んだ親プロセスのページ
+    outstanding = deque()
+    finished = set()
+    ahead = deque()
+
+    def emit(page_num, md_text, error):
+        nonlocal done
+        done += 1
+        if error is not None:
+            sink.skip_page(page_num)
+            if on_error:
+                on_error(page_num, error)
+            return
+        sink.write_page(page_num, page_header(page_num, add_page_headers, separator) + md_text)
+        if on_page:
+            on_page(page_num, done, total)
+
+    def on_shard(shard_results):
+        for page_num, md_text, error, seconds in shard_results:
+            if profile is not None and seconds is not None:
+                profile.record_batch([page_num], seconds)
+            if error is None and page_num in keys and not (watchdog and page_num in watchdog.exceeded):
+                cache.put(keys[page_num], md_text)
+            finished.add(page_num)
+            emit(page_num, md_text, error)
+
+    def first_outstanding():
+        """First worker page not yet written, or None / まだ書き込んでいない最初のワーカーのページ（なければ None）"""
+        while outstanding and outstanding[0] in finished:
+            finished.discard(outstanding.popleft())
+        first = outstanding[0] if outstanding else None
+        while ahead and (first is None or ahead[0] < first):
+            ahead.popleft()
+        return first
+
+    def convert_parent_page(page_num):
+        """Extract a light page or serve a cached one / 軽量なページを抽出、またはキャッシュ済みのページを返す"""
+        if plan is not None and plan[page_num] != COMPLEX:
+            return convert_light_page(doc, page_num, plan[page_num], hdr_info, on_batch)
+        md_text = cache.get(keys[page_num])
+        if md_text is None:
+            # Evicted since the lookup / 確認後に削除された
+            try:
+                md_text = convert_single_page(doc, page_num, hdr_info)
+            except Exception as e:
+                return page_num, None, e
+            cache.put(keys[page_num], md_text)
+        return page_num, md_text, None
+
+    def write_parent_page(drain=False):
+        """Write the next parent page unless too far ahead; returns whether one was written / 先行しすぎていなければ次の親プロセスのページを書き込み、書き込んだかを返す"""
+        if not parent_pages:
+            return False
+        page_num = parent_pages[0]
+        first = first_outstanding()
+        if first is not None and first < page_num:
+            if len(ahead) >= PARENT_PAGES_AHEAD and not drain:
+                return False
+            ahead.append(page_num)
+        parent_pages.popleft()
+        check_cancelled(cancel_event)
+        emit(*convert_parent_page(page_num))
+        return True
+
+    with contextlib.nullcontext(doc) if doc is not None else pymupdf.open(pdf_path) as doc:
+        full_pages = page_numbers
+        if plan is not None:
+            full_pages = [page_num for page_num in page_numbers if plan[page_num] == COMPLEX]
+        hdr_info = _header_info(doc, full_pages) if full_pages else None
+        worker_pages = full_pages
+        if cache is not None:
+            keys = cache.page_keys(doc, full_pages, cache_options(hdr_info))
+            cached = cache.contains(keys.values())
+            worker_pages = [page_num for page_num in full_pages if keys[page_num] not in cached]
+            for _ in worker_pages:
+                cache.record_miss()
+        outstanding.extend(worker_pages)
+        worker_set = set(worker_pages)
+        parent_pages = deque(page_num for page_num in page_numbers if page_num not in worker_set)
+
+        if watchdog is not None and worker_pages:
+            for shard_result in watchdog.convert(worker_pages, workers, hdr_info,
+                                                 lambda: check_cancelled(cancel_event)):
+                on_shard([shard_result])
+                while write_parent_page():
+                    pass
+        elif worker_pages:
+            # Workers start first; the parent writes its pages while they run
+            # 先にワーカーを開始し、その実行中に親プロセスがページを書き込む
+            lost_shards = _run_shards(pdf_path, _split_shards(worker_pages, workers),
+                                      workers, hdr_info, on_shard, cancel_event, write_parent_page)
+            if lost_shards:
+                # Retry lost pages one per shard / 失われたページを1ページずつ再試行
+                single_pages = [[page_num] for shard in lost_shards for page_num in shard]
+                lost_shards = _run_shards(pdf_path, single_pages, workers, hdr_info, on_shard,
+                                          cancel_event, write_parent_page)
+
+            remaining = sorted(page_num for shard in lost_shards for page_num in shard)
+            while remaining:
+                # With one worker the first lost page is the one that crashed it
+                # ワーカー1つの場合、最初に失われたページがクラッシュの原因
+                lost_shards = _run_shards(pdf_path, [[page_num] for page_num in remaining], 1,
+                                          hdr_info, on_shard, cancel_event, write_parent_page)
+                remaining = sorted(page_num for shard in lost_shards for page_num in shard)
+                if remaining:
+                    on_shard([(remaining.pop(0), None, "worker process terminated unexpectedly", None)])
+
+        while write_parent_page(drain=True):
+            pass
+
+    return result
+
+
+def convert_file(pdf_path, page_numbers=None, add_page_headers=True, workers=1,
+                 on_page=None, on_error=None, cancel_event=None, sink=None, cache=None,
+                 checkpoint=None, profile=None, session=None, preset=DEFAULT_PRESET, on_prescan=None,
+                 watchdog=None, incremental=None, memory=None, images=None, repeated=None):
+    """
+    Convert a PDF file into sink, choosing the sequential or parallel path
+    PDFファイルを sink に変換する（順次または並列の経路を選択）
+
+    Without headers, a whole-document conversion joins pages without separators.
+    Pages already in checkpoint (Checkpoint) are replayed instead of converted, and
+    newly converted pages are recorded in it.
+    ヘッダーなしで全ページを変換する場合は区切りなしでページを連結する。
+    checkpoint（Checkpoint）にあるページは変換せずに再生し、新たに変換したページを記録する。
+    Stage timings are recorded in profile (DocumentProfile) / 段階別の時間は profile（DocumentProfile）に記録する。
+    An open session (DocumentSession) is used instead of opening the file.
+    開いている session（DocumentSession）があればファイルを開かずに使用する。
+    preset (see presets.py) chooses how pages are routed: balanced classifies pages
+    first and sends only complex ones through to_markdown, fast_text extracts every
+    page with the lightweight extractor and full_fidelity converts every page fully.
+    on_prescan(plan) receives the classification.
+    preset（presets.py参照）でページの振り分け方を選ぶ。balanced はページを先に分類して
+    複雑なページのみ to_markdown を通し、fast_text は全ページを軽量抽出で、full_fidelity は
+    全ページを完全に変換する。on_prescan(plan) に分類結果を渡す。
+    A watchdog (PageWatchdog) limits the time and memory of each page conversion.
+    watchdog（PageWatchdog）で各ページの変換時間とメモリを制限する。
+    With incremental (IncrementalUpdate), unchanged pages of the previous output are
+    reused and only the others are converted.
+    incremental（IncrementalUpdate）を指定すると前回出力の変更のないページを再利用し、
+    それ以外のページのみを変換する。
+    With memory (MemoryGovernor) pages are converted in one process under its memory
+    ceiling, reopening the document periodically; workers is then ignored.
+    memory（MemoryGovernor）を指定すると、文書を定期的に開き直しながらメモリ上限の下で
+    1プロセスで変換する。この場合 workers は無視する。
+    With images (ImageExtractor) the embedded images of each converted page are saved
+    once per document and linked after the page's text.
+    images（ImageExtractor）を指定すると、変換した各ページの埋め込み画像を文書毎に一度だけ
+    保存し、ページのテキストの後にリンクする。
+    With repeated (RepeatedRegions) running headers and footers are found once from a
+    sample of pages and removed from each converted page.
+    repeated（RepeatedRegions）を指定すると、ページのサンプルから柱・フッターを一度だけ
+    見つけ、変換した各ページから除去する。
+    """
+    if session is None:
+        with profile.opening() if profile else contextlib.nullcontext():
+            session = DocumentSession(pdf_path)
+        with session:
+            return convert_file(pdf_path, page_numbers, add_page_headers=add_page_headers,
+                                workers=workers, on_page=on_page, on_error=on_error,
+                                cancel_event=cancel_event, sink=sink, cache=cache,
+                                checkpoint=checkpoint, profile=profile, session=session,
+                                preset=preset, on_prescan=on_prescan, watchdog=watchdog,
+                                incremental=incremental, memory=memory, images=images,
+                                repeated=repeated)
+
+    route = preset_route(preset)
+    doc = session.doc
+    total_pages = len(doc)
+    if page_numbers is None:
+        page_numbers = range(1, total_pages + 1)
+    page_numbers = list(page_numbers)
+    separator = page_separator(page_numbers, total_pages)
+    if sink is None:
+        sink = ResultCollector()
+    result = sink
+
+    total = len(page_numbers)
+    if checkpoint is not None:
+        page_numbers, sink = checkpoint.resume(page_numbers, sink)
+    if incremental is not None:
+        page_numbers = incremental.resume(page_numbers, sink, add_page_headers, separator)
+    resumed = total - len(page_numbers)
+    if on_page and resumed:
+        # Report progress against the whole selection / 選択範囲全体に対する進捗を通知
+        report = on_page
+        on_page = lambda page_num, done, _total: report(page_num, resumed + done, total)
+    if not page_numbers:
+        return result
+
+    # Replayed and reused pages are already finished / 再生・再利用したページは処理済み
+    if images is not None:
+        sink = images.wrap(sink, doc)
+    if repeated is not None:
+        # Outermost, so footers are stripped before image links are appended / 画像リンクの追加前にフッターを除去するよう最も外側に置く
+        repeated.detect(doc)
+        sink = repeated.wrap(sink, doc, add_page_headers, separator)
+
+    plan = None
+    if route != ROUTE_FULL:
+        plan = classify_pages(doc, page_numbers, text_only=route == ROUTE_TEXT)
+        if on_prescan:
+            on_prescan(plan)
+
+    if memory is not None:
+        # Release what the pre-scan and resume loaded / 事前スキャンと再開で読み込んだものを解放
+        memory.trim()
+        convert_document_bounded(pdf_path, page_numbers, memory, add_page_headers=add_page_headers,
+                                 separator=separator, on_page=on_page, on_error=on_error,
+                                 cancel_event=cancel_event, sink=sink, cache=cache, profile=profile,
+                                 plan=plan, watchdog=watchdog)
+    elif workers > 1 and len(page_numbers) > 1:
+        convert_document_parallel(pdf_path, page_numbers, workers=workers,
+                                  add_page_headers=add_page_headers, separator=separator,
+                                  on_page=on_page, on_error=on_error,
+                                  cancel_event=cancel_event, sink=sink, cache=cache,
+                                  profile=profile, doc=doc, plan=plan, watchdog=watchdog)
+    else:
+        convert_document(doc, page_numbers, add_page_headers=add_page_headers,
+                         separator=separator, on_page=on_page, on_error=on_error,
+                         cancel_event=cancel_event, sink=sink, cache=cache, profile=profile,
+                         plan=plan, watchdog=watchdog)
+    if incremental is not None and watchdog is not None:
+        # Plain-text fallbacks are converted again next time / プレーンテキストの代替は次回再変換する
+        incremental.forget(watchdog.exceeded)
+    if profile is not None:
+        profile.finish()
+    return result
@@ -0,0 +1,252 @@
+"""
+Embedded image extraction / 埋め込み画像の抽出
+Saves each unique image embedded in a document once, however many pages show it, and
+links every page to the shared files
+文書に埋め込まれた各画像を、表示するページ数にかかわらず一度だけ保存し、各ページから
+共有のファイルにリンクする
+"""
+
+import hashlib
+import multiprocessing
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
+
+from output import COMPRESSION_SUFFIXES
+
+# Suffix of the image directory next to a Markdown file / Markdownファイルの隣の画像ディレクトリの接尾辞
+IMAGES_SUFFIX = "_images"
+
+# Image directory inside a shard directory / シャードディレクトリ内の画像ディレクトリ
+SHARD_IMAGES_DIRNAME = "images"
+
+# Processes decoding, encoding and writing images / 画像のデコード・エンコード・書き込みを行うプロセス数
+DEFAULT_IMAGE_WORKERS = 2
+
+# Images smaller than this many pixels on a side are spacers or rules, not pictures
+# 一辺がこのピクセル数より小さい画像は画像ではなくスペーサーや罫線
+MIN_IMAGE_SIDE = 8
+
+# Document opened once in each image worker process / 各画像ワーカープロセスで一度だけ開くドキュメント
+_worker_doc = None
+
+
+def image_dir_for(output_path):
+    """Image directory of a Markdown file / Markdownファイルの画像ディレクトリ"""
+    output_path = pathlib.Path(output_path)
+    name = output_path.name
+    for suffix in COMPRESSION_SUFFIXES.values():
+        name = name.removesuffix(suffix)
+    return output_path.with_name(pathlib.Path(name).stem + IMAGES_SUFFIX)
+
+
+def _write_file(path, data):
+    # Written under a temporary name so an interrupted write never looks complete
+    # 中断した書き込みが完成して見えないよう一時的な名前で書き込む
+    partial_path = path.with_name(path.name + ".partial")
+    with open(partial_path, 'wb') as f:
+        f.write(data)
+    os.replace(partial_path, path)
+
+
+def _image_ext(doc, xref, smask):
+    """Extension of the saved file, known before decoding / 保存するファイルの拡張子（デコード前に決まる）"""
+    if smask:
+        return "png"
+    kind, value = doc.xref_get_key(xref, "Filter")
+    # JPEG streams are saved as they are; everything else becomes PNG
+    # JPEGのストリームはそのまま保存し、それ以外はPNGにする
+    if kind in ("name", "array") and value.strip("[] ") == "/DCTDecode":
+        return "jpeg"
+    return "png"
+
+
+def _encode_image(doc, xref, smask, ext):
+    """Image bytes in the format of ext / ext の形式の画像バイト列"""
+    if not smask:
+        image = doc.extract_image(xref)
+        if image['ext'] == ext:
+            return image['image']
+    pix = pymupdf.Pixmap(doc, xref)
+    if pix.colorspace and pix.colorspace.n > 3:
+        pix = pymupdf.Pixmap(pymupdf.csRGB, pix)
+    if smask:
+        pix = pymupdf.Pixmap(pix, pymupdf.Pixmap(doc, smask))
+    return pix.tobytes("jpg" if ext == "jpeg" else "png")
+
+
+def _save_image(doc, path, xref, smask, ext):
+    """Decode, encode and write one image; returns False if it cannot be read / 1つの画像をデコード・エンコードして書き込む（読めなければ False）"""
+    try:
+        data = _encode_image(doc, xref, smask, ext)
+    except (RuntimeError, ValueError):
+        # Unreadable or unsupported image / 読めない、または未対応の画像
+        return False
+    _write_file(path, data)
+    return True
+
+
+def _init_worker(pdf_path):
+    """Open the document once per worker process / ワーカープロセス毎にドキュメントを一度だけ開く"""
+    global _worker_doc
+    _worker_doc = pymupdf.open(pdf_path)
+
+
+def _save_worker_image(path, xref, smask, ext):
+    """_save_image on the worker's own document / ワーカー自身のドキュメントで _save_image を実行"""
+    return _save_image(_worker_doc, path, xref, smask, ext)
+
+
+class ImageExtractor:
+    """
+    Save the embedded images of pages once per document / ページの埋め込み画像を文書毎に一度だけ保存
+
+    Images are deduplicated by xref and then by a hash of their raw stream (and soft
+    mask), so a logo stored once per page is still extracted and written once. Files
+    are named by that hash and the extension its filter implies, so the link is known
+    at once; decoding, encoding and writing run in worker processes with their own
+    copy of the document (PyMuPDF is not thread-safe), or in process for a document
+    that cannot be reopened from its file. A file left by an earlier run is kept.
+    Links are link_prefix/<name>, relative to the Markdown file.
+    画像は xref、次に生のストリーム（とソフトマスク）のハッシュで重複を除くため、ページ毎に
+    格納されたロゴも一度だけ抽出・書き込みする。ファイル名はそのハッシュとフィルターから
+    決まる拡張子なのでリンクはすぐに決まる。デコード・エンコード・書き込みは文書を自身で
+    開いたワーカープロセスで行う（PyMuPDF はスレッドセーフではない）。ファイルから開き直せない
+    文書の場合はプロセス内で行う。前回の実行で残ったファイルはそのまま使う。リンクは
+    Markdown ファイルからの相対パス link_prefix/<名前>。
+    """
+
+    def __init__(self, image_dir, link_prefix=None, workers=DEFAULT_IMAGE_WORKERS):
+        self.image_dir = pathlib.Path(image_dir)
+        self.link_prefix = link_prefix if link_prefix is not None else self.image_dir.name
+        self.workers = max(1, workers)
+        self.placements = 0
+        self.pages = 0
+        self.written = 0
+        self.unreadable = 0
+        self._by_xref = {}
+        self._by_hash = {}
+        self._futures = []
+        # Started on the first new image / 最初の新しい画像で開始する
+        self._executor = None
+
+    @property
+    def unique(self):
+        return len(self._by_hash)
+
+    def page_links(self, doc, page_num):
+        """Markdown image links of a 1-based page, saving new images / 1始まりのページの画像リンク（新しい画像は保存）"""
+        page = doc[page_num - 1]
+        if not page.get_images():
+            return ""
+        names = []
+        # Reading order of the placements / 配置の読み順
+        infos = sorted(page.get_image_info(xrefs=True), key=lambda info: (info['bbox'][1], info['bbox'][0]))
+        for info in infos:
+            # Inline images have no xref to share / インライン画像には共有できる xref がない
+            if not info['xref'] or min(info['width'], info['height']) < MIN_IMAGE_SIDE:
+                continue
+            name = self._image_name(doc, info['xref'])
+            if name is not None and name not in names:
+                names.append(name)
+        if names:
+            self.pages += 1
+            self.placements += len(names)
+        return "".join(f"![]({self.link_prefix}/{name})\n\n" for name in names)
+
+    def _image_name(self, doc, xref):
+        """File name of an image, saving it on first sight / 画像のファイル名（初出時に保存）"""
+        if xref in self._by_xref:
+            return self._by_xref[xref]
+        name = None
+        try:
+            kind, value = doc.xref_get_key(xref, "SMask")
+            smask = int(value.split()[0]) if kind == "xref" else 0
+            # Raw (still encoded) streams, so nothing is decoded to compare images
+            # 生の（エンコードされたままの）ストリームを使い、比較のために画像をデコードしない
+            digest = hashlib.sha256(doc.xref_stream_raw(xref))
+            if smask:
+                digest.update(doc.xref_stream_raw(smask))
+            digest = digest.hexdigest()[:32]
+            name = self._by_hash.get(digest)
+            if name is None:
+                name = f"{digest}.{_image_ext(doc, xref, smask)}"
+                self._by_hash[digest] = name
+                self._save(doc, name, xref, smask)
+        except (RuntimeError, ValueError):
+            # Unreadable or unsupported image / 読めない、または未対応の画像
+            name = None
+        self._by_xref[xref] = name
+        return name
+
+    def _save(self, doc, name, xref, smask):
+        path = self.image_dir / name
+        if path.exists():
+            return
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self.written += 1
+        ext = name.rsplit(".", 1)[1]
+        if self._executor is None:
+            if not doc.name or doc.needs_pass or not os.path.isfile(doc.name):
+                # In-memory or password-protected document / メモリ上またはパスワード付きの文書
+                if not _save_image(doc, path, xref, smask, ext):
+                    self._unreadable()
+                return
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker, initargs=(doc.name,))
+        self._futures.append(self._executor.submit(_save_worker_image, path, xref, smask, ext))
+
+    def wrap(self, sink, doc):
+        """Wrap a sink to append image links to each page / 各ページに画像リンクを追加するよう sink をラップ"""
+        return ImageSink(sink, self, doc)
+
+    def close(self):
+        """Wait for the image files; raises the first write error / 画像ファイルの書き込みを待つ（最初の書き込みエラーを発生させる）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        futures, self._futures = self._futures, []
+        for future in futures:
+            if not future.result():
+                self._unreadable()
+
+    def _unreadable(self):
+        """Count an image that could not be decoded / デコードできなかった画像を数える"""
+        self.unreadable += 1
+        self.written -= 1
+
+    def summary_text(self):
+        """Format the image counts for the log / ログ用に画像の数を整形"""
+        text = (f"{self.placements} images on {self.pages} pages, {self.unique} unique, "
+                f"{self.written} files written")
+        if self.unreadable:
+            text += f", {self.unreadable} unreadable"
+        return text
+
+
+class ImageSink:
+    """Forward pages to a sink with their image links appended / 画像リンクを追加してページを sink に渡す"""
+
+    def __init__(self, sink, extractor, doc):
+        self.sink = sink
+        self.extractor = extractor
+        self.doc = doc
+
+    @property
+    def pages_written(self):
+        return self.sink.pages_written
+
+    def write_page(self, page_num, content):
+        links = self.extractor.page_links(self.doc, page_num)
+        if links:
+            content = content.rstrip("\n") + "\n\n" + links if content.strip() else links
+        self.sink.write_page(page_num, content)
+
+    def skip_page(self, page_num):
+        self.sink.skip_page(page_num)
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,124 @@
+"""
+Incremental re-conversion of revised PDFs / 改訂されたPDFの差分再変換
+Reuses pages of the previous output whose source page is unchanged, so only changed,
+added or moved pages go through the converter again
+元のページが変わっていない前回出力のページを再利用し、変更・追加・移動したページのみを
+再び変換する
+"""
+
+from cache import PageFingerprinter, engine_token
+from conversion import page_header, page_separator
+from pageindex import PageReader
+
+# Source details that must match for previous pages to be reused / 前回のページを再利用するために一致が必要な生成情報
+COMPATIBLE_KEYS = ('preset', 'images', 'strip_repeated', 'engine')
+
+
+def page_fingerprints(doc, page_numbers):
+    """Source fingerprints of 1-based pages / 1始まりのページの元ページのフィンガープリント"""
+    fingerprinter = PageFingerprinter(doc)
+    return {page_num: fingerprinter.fingerprint(page_num) for page_num in page_numbers}
+
+
+class IncrementalUpdate:
+    """
+    Splice unchanged pages of the previous output into a new one / 前回出力の変更のないページを新しい出力に組み込む
+
+    The previous output is read through its page index (pageindex.py), whose rows carry
+    the fingerprint of each source page. A page is reused when a previous page had the
+    same fingerprint, even under another page number (a moved page); its page header
+    is rewritten. fingerprints and source go into the index of the new output.
+    前回の出力はページインデックス（pageindex.py）から読み込み、その各行には元ページの
+    フィンガープリントが含まれる。同じフィンガープリントのページが前回あれば、ページ番号が
+    異なっていても（移動したページ）再利用し、ページヘッダーを書き換える。fingerprints と
+    source は新しい出力のインデックスに書き込む。
+    """
+
+    def __init__(self, output_path, doc, page_numbers, options):
+        page_numbers = list(page_numbers)
+        self.output_path = output_path
+        self.fingerprints = page_fingerprints(doc, page_numbers)
+        self.source = dict(options, separator=page_separator(page_numbers, len(doc)), engine=engine_token())
+        self.reused = 0
+        self.moved = 0
+        self.regenerated = 0
+        # First previous page of each fingerprint, for moved pages / 移動したページ用に、各フィンガープリントを持つ最初の前回のページ
+        self._previous_pages = {}
+        self._reader = self._open_previous()
+
+    def _open_previous(self):
+        """Open the previous output if it can be reused / 再利用できる前回の出力を開く"""
+        try:
+            reader = PageReader(self.output_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if any(reader.source.get(key) != self.source[key] for key in COMPATIBLE_KEYS):
+            reader.close()
+            return None
+        for old_page, old_fingerprint in reader.fingerprints.items():
+            self._previous_pages.setdefault(old_fingerprint, old_page)
+        return reader
+
+    @property
+    def available(self):
+        """Whether a previous output is being reused / 前回の出力を再利用しているか"""
+        return self._reader is not None
+
+    def _previous_page(self, page_num):
+        """Previous page with the same source, preferring the same number / 同じ元ページを持つ前回のページ（同じ番号を優先）"""
+        fingerprint = self.fingerprints[page_num]
+        previous = self._reader.fingerprints
+        if previous.get(page_num) == fingerprint:
+            return page_num
+        return self._previous_pages.get(fingerprint)
+
+    def _reuse(self, page_num, old_page, add_page_headers, separator):
+        """Previous content of old_page under the header of page_num, or None / page_num のヘッダーを付けた old_page の前回の内容（なければ None）"""
+        content = self._reader.read_page(old_page, verify=True)
+        old_header = page_header(old_page, self._reader.source.get('add_page_headers'),
+                                 self._reader.source.get('separator', "\n\n"))
+        if not content.startswith(old_header):
+            return None
+        return page_header(page_num, add_page_headers, separator) + content[len(old_header):]
+
+    def resume(self, page_numbers, sink, add_page_headers=True, separator="\n\n"):
+        """
+        Write reusable pages into sink and return the pages left to convert
+        再利用できるページを sink に書き込み、変換が必要な残りのページを返す
+        """
+        remaining = []
+        try:
+            for page_num in page_numbers:
+                content = None
+                old_page = self._previous_page(page_num) if self._reader is not None else None
+                if old_page is not None:
+                    try:
+                        content = self._reuse(page_num, old_page, add_page_headers, separator)
+                    except ValueError:
+                        content = None
+                if content is None:
+                    remaining.append(page_num)
+                    continue
+                sink.write_page(page_num, content)
+                self.reused += 1
+                if old_page != page_num:
+                    self.moved += 1
+        finally:
+            # The previous output is about to be replaced / 前回の出力はこの後置き換えられる
+            self.close()
+        self.regenerated = len(remaining)
+        return remaining
+
+    def forget(self, page_numbers):
+        """Keep pages out of later reuse (e.g. plain-text fallbacks) / ページを次回以降の再利用から除外（プレーンテキストの代替など）"""
+        for page_num in page_numbers:
+            self.fingerprints.pop(page_num, None)
+
+    def summary_text(self):
+        """Format the reuse counts for the log / ログ用に再利用数を整形"""
+        return f"{self.reused} reused ({self.moved} moved), {self.regenerated} regenerated"
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
@@ -0,0 +1,217 @@
+"""
+Per-page watchdog / ページ毎のウォッチドッグ
+Converts pages in isolated worker processes under a time and memory budget
+時間とメモリの上限の下、独立したワーカープロセスでページを変換する
+"""
+
+import collections
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+
+import pymupdf
+import pymupdf4llm
+
+from prescan import SIMPLE, extract_simple
+
+# Interval for checking deadlines, memory and cancellation / 期限・メモリ・キャンセルを確認する間隔
+POLL_INTERVAL = 0.2
+
+# Seconds an idle worker is given to exit / アイドル状態のワーカーが終了するまで待つ秒数
+SHUTDOWN_TIMEOUT = 5
+
+# Reasons a page is cut off / ページを打ち切る理由
+TIME_EXCEEDED = "time"
+MEMORY_EXCEEDED = "memory"
+CRASHED = "crashed"
+
+REASON_TEXT = {
+    TIME_EXCEEDED: "exceeded the time budget",
+    MEMORY_EXCEEDED: "exceeded the memory budget",
+    CRASHED: "crashed the worker process",
+}
+
+
+def process_rss(pid):
+    """Resident memory of a process in bytes, or None / プロセスの常駐メモリ（バイト、取得できなければNone）"""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        # Linux without psutil / psutil のないLinux
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _worker_main(conn, pdf_path, hdr_info):
+    """Convert pages sent over conn, one at a time / conn で送られたページを1つずつ変換"""
+    doc = pymupdf.open(pdf_path)
+    from conversion import markdown_options
+    kwargs = markdown_options(hdr_info)
+    conn.send(None)
+    while True:
+        page_num = conn.recv()
+        if page_num is None:
+            break
+        start = time.perf_counter()
+        exceeded = None
+        try:
+            md_text, error = pymupdf4llm.to_markdown(doc, pages=[page_num - 1], **kwargs), None
+        except MemoryError:
+            md_text, error, exceeded = None, None, MEMORY_EXCEEDED
+        except Exception as e:
+            # Errors are sent back as text so they always pickle / エラーは確実にpickleできるよう文字列で返す
+            md_text, error = None, str(e)
+        conn.send((page_num, md_text, error, time.perf_counter() - start, exceeded))
+    doc.close()
+
+
+class _Worker:
+    """One isolated worker process and the page it is converting / 独立したワーカープロセスと変換中のページ"""
+
+    def __init__(self, context, pdf_path, hdr_info):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, pdf_path, hdr_info),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.page_num = None
+        self.started = None
+
+    def assign(self, page_num):
+        self.conn.send(page_num)
+        self.page_num = page_num
+        self.started = time.perf_counter()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        if self.page_num is not None:
+            self.kill()
+            return
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(SHUTDOWN_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class PageWatchdog:
+    """
+    Time and memory budget for the full conversion of each page
+    各ページの完全変換に対する時間とメモリの上限
+
+    Pages are converted one at a time in spawned worker processes. A worker whose
+    page runs past timeout seconds, whose resident memory grows past memory_mb, or
+    that dies is killed and replaced; the page is recorded in exceeded,
+    on_exceeded(page_num, reason, seconds) is called, and its plain text (or a
+    placeholder when it has none) is returned in place of the Markdown. The memory
+    budget covers the whole worker and needs psutil or /proc to be enforced.
+    ページは spawn したワーカープロセスで1つずつ変換する。ページが timeout 秒を超えた、
+    常駐メモリが memory_mb を超えた、または終了したワーカーは強制終了して置き換える。
+    そのページは exceeded に記録して on_exceeded(ページ番号, 理由, 秒数) を呼び出し、
+    Markdownの代わりにプレーンテキスト（テキストがなければプレースホルダー）を返す。
+    メモリの上限はワーカー全体が対象で、適用には psutil または /proc が必要。
+    """
+
+    def __init__(self, pdf_path, timeout=None, memory_mb=None, on_exceeded=None):
+        self.pdf_path = str(pdf_path)
+        self.timeout = timeout or None
+        self.memory_limit = memory_mb * 1024 * 1024 if memory_mb else None
+        self.on_exceeded = on_exceeded
+        self.exceeded = {}
+
+    def convert(self, page_numbers, workers=1, hdr_info=None, on_poll=None):
+        """
+        Yield (page_num, markdown, error, seconds) as pages finish; in page order with one worker
+        ページの完了順に(ページ番号, Markdown, エラー, 秒数)を返す（ワーカー1つではページ順）
+
+        on_poll() is called while waiting and may raise to stop the conversion.
+        待機中に on_poll() を呼び出す。例外を発生させると変換を中止する。
+        """
+        pending = collections.deque(page_numbers)
+        if not pending:
+            return
+        # Spawn keeps workers independent of the GUI process / spawnでワーカーをGUIプロセスから独立させる
+        context = multiprocessing.get_context("spawn")
+        workers = [_Worker(context, self.pdf_path, hdr_info) for _ in range(min(max(1, workers), len(pending)))]
+        try:
+            while pending or any(worker.page_num is not None for worker in workers):
+                if on_poll:
+                    on_poll()
+                for worker in workers:
+                    if worker.ready and worker.page_num is None and pending:
+                        worker.assign(pending.popleft())
+                ready = wait([worker.conn for worker in workers], timeout=POLL_INTERVAL)
+
+                for index, worker in enumerate(workers):
+                    reason = None
+                    if worker.conn in ready:
+                        try:
+                            message = worker.conn.recv()
+                        except (EOFError, OSError):
+                            if worker.page_num is None:
+                                raise RuntimeError("watchdog worker process failed to start")
+                            reason = CRASHED
+                        else:
+                            if message is None:
+                                worker.ready = True
+                                continue
+                            page_num, md_text, error, seconds, reason = message
+                            if reason is None:
+                                worker.page_num = None
+                                yield page_num, md_text, error, seconds
+                                continue
+                    elif worker.page_num is not None:
+                        if self.timeout and time.perf_counter() - worker.started > self.timeout:
+                            reason = TIME_EXCEEDED
+                        elif self.memory_limit and (process_rss(worker.process.pid) or 0) > self.memory_limit:
+                            reason = MEMORY_EXCEEDED
+                    if reason is None:
+                        continue
+
+                    page_num, seconds = worker.page_num, time.perf_counter() - worker.started
+                    worker.kill()
+                    workers[index] = _Worker(context, self.pdf_path, hdr_info)
+                    yield page_num, self._fallback(page_num, reason, seconds), None, seconds
+        finally:
+            for worker in workers:
+                worker.stop()
+
+    def iter_chunks(self, page_numbers, hdr_info=None, on_batch=None, on_poll=None):
+        """Yield (page_num, markdown, error) in page order on one worker / ワーカー1つでページ順に(ページ番号, Markdown, エラー)を返す"""
+        for page_num, md_text, error, seconds in self.convert(page_numbers, 1, hdr_info, on_poll):
+            if on_batch:
+                on_batch([page_num], seconds)
+            yield page_num, md_text, error
+
+    def _fallback(self, page_num, reason, seconds):
+        """Record a page cut off and return its replacement / 打ち切ったページを記録して代替テキストを返す"""
+        self.exceeded[page_num] = reason
+        if self.on_exceeded:
+            self.on_exceeded(page_num, reason, seconds)
+        try:
+            with pymupdf.open(self.pdf_path) as doc:
+                text = extract_simple(doc[page_num - 1], SIMPLE)
+        except Exception:
+            text = ""
+        if text:
+            return f"<!-- page {page_num} {REASON_TEXT[reason]}; plain text only -->\n\n{text}"
+        return f"<!-- page {page_num} {REASON_TEXT[reason]}; no text extracted -->\n\n"
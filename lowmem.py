@@ -0,0 +1,125 @@
+"""
+Bounded-memory conversion / メモリ上限付きの変換
+Converts a document in windows of pages, reopening it and trimming the MuPDF store
+between windows so a long conversion stays under a memory ceiling
+ページのウィンドウ単位で文書を変換し、ウィンドウ間で文書を開き直して MuPDF のストアを
+縮小することで、長い変換をメモリ上限内に収める
+"""
+
+import contextlib
+import gc
+import os
+
+import pymupdf
+
+from isolation import process_rss
+from profiling import peak_rss
+
+# Pages converted before the document is reopened / 文書を開き直すまでに変換するページ数
+DEFAULT_REOPEN_PAGES = 100
+
+# Share of the MuPDF store freed when trimming / 縮小時に解放する MuPDF ストアの割合（%）
+SHRINK_PERCENT = 100
+
+MB = 1024 * 1024
+
+
+class MemoryGovernor:
+    """
+    Keep one process's conversion under a memory ceiling / 1プロセスの変換をメモリ上限内に保つ
+
+    Pages are converted in windows of reopen_pages, each on a freshly opened document;
+    the MuPDF store is trimmed after every window and whenever RSS passes ceiling_mb
+    after a page. A window that still ends above the ceiling halves the next one.
+    ページは reopen_pages 毎のウィンドウで、それぞれ新たに開いた文書上で変換する。
+    MuPDF のストアは各ウィンドウの後と、ページ変換後に RSS が ceiling_mb を超えた時に
+    縮小する。縮小後も上限を超えているウィンドウの後は次のウィンドウを半分にする。
+    """
+
+    def __init__(self, ceiling_mb=None, reopen_pages=DEFAULT_REOPEN_PAGES):
+        self.ceiling = ceiling_mb * MB if ceiling_mb else None
+        self.window = max(1, reopen_pages or DEFAULT_REOPEN_PAGES)
+        self.peak_rss = 0
+        self.reopens = 0
+        self.trims = 0
+
+    def rss(self):
+        """Current RSS in bytes, tracking the peak / 現在の RSS（バイト）、最大値も記録"""
+        rss = process_rss(os.getpid())
+        if rss:
+            self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def over_ceiling(self):
+        rss = self.rss()
+        return bool(self.ceiling and rss and rss > self.ceiling)
+
+    def trim(self):
+        """Free cached MuPDF resources and Python garbage / MuPDF のキャッシュと Python のガベージを解放"""
+        pymupdf.TOOLS.store_shrink(SHRINK_PERCENT)
+        gc.collect()
+        self.trims += 1
+
+    def check(self):
+        """Trim if above the ceiling; called after each page / 上限を超えていれば縮小（各ページの後に呼び出す）"""
+        if self.over_ceiling():
+            self.trim()
+
+    def windows(self, page_numbers):
+        """Yield successive windows of page_numbers / page_numbers を順にウィンドウに分けて返す"""
+        page_numbers = list(page_numbers)
+        start = 0
+        while start < len(page_numbers):
+            window = page_numbers[start:start + self.window]
+            yield window
+            start += len(window)
+            self.trim()
+            if self.over_ceiling() and self.window > 1:
+                self.window //= 2
+
+    @contextlib.contextmanager
+    def open(self, pdf_path):
+        """Open the document for one window / 1ウィンドウ分の文書を開く"""
+        doc = pymupdf.open(pdf_path)
+        self.reopens += 1
+        try:
+            yield doc
+        finally:
+            doc.close()
+
+    def wrap(self, sink):
+        """Wrap a sink to check memory after each page / 各ページの後にメモリを確認するよう sink をラップ"""
+        return MemorySink(sink, self)
+
+    def summary_text(self):
+        """Format peak memory and trimming for the log / ログ用に最大メモリと縮小の回数を整形"""
+        # The sampled maximum misses peaks inside a page conversion / 標本の最大値はページ変換中のピークを含まない
+        peak = peak_rss()
+        text = f"peak RSS {peak / MB:.0f} MB, " if peak else ""
+        text += f"max RSS sampled between pages {self.peak_rss / MB:.0f} MB"
+        if self.ceiling:
+            text += f" (ceiling {self.ceiling / MB:.0f} MB)"
+        return text + f", document opened {self.reopens} times, store trimmed {self.trims} times"
+
+
+class MemorySink:
+    """Forward pages to a sink and check memory after each / ページを sink に渡し、毎回メモリを確認"""
+
+    def __init__(self, sink, governor):
+        self.sink = sink
+        self.governor = governor
+
+    @property
+    def pages_written(self):
+        return self.sink.pages_written
+
+    def write_page(self, page_num, content):
+        self.sink.write_page(page_num, content)
+        self.governor.check()
+
+    def skip_page(self, page_num):
+        self.sink.skip_page(page_num)
+        self.governor.check()
+
+    def close(self):
+        self.sink.close()
@@ -12,12 +12,15 @@ import time
 import sys
 import json
 import locale
+import importlib
+import importlib.util
+import multiprocessing
+import queue
+import threading
 
-# Try to import required libraries / 必要なライブラリのインポートを試行
-try:
-    import pymupdf4llm
-    import pymupdf
-except ImportError:
+# Check required libraries without importing them; they are loaded after the window is shown
+# 必要なライブラリをインポートせずに確認（ウィンドウ表示後に読み込む）
+if importlib.util.find_spec("pymupdf4llm") is None or importlib.util.find_spec("pymupdf") is None:
     # Language detection for error messages / エラーメッセージのための言語検出
     lang = "en"
     try:
@@ -51,6 +54,227 @@ except ImportError:
     
     DND_FILES = None
 
+# Lightweight modules shared with non-GUI entry points; the conversion engine itself is
+# imported where it is used and preloaded in the background (see preload_engine)
+# GUI以外のエントリポイントと共有する軽量モジュール。変換エンジン自体は使用箇所で
+# インポートし、バックグラウンドで事前に読み込む（preload_engine参照）
+from presets import DEFAULT_PRESET, PRESETS
+from scheduler import (JobScheduler, POLICIES, POLICY_FIFO, RUNNING, DONE, FAILED, CANCELLED)
+
+# Engine modules preloaded once the window is shown / ウィンドウ表示後に事前に読み込むエンジンモジュール
+ENGINE_MODULES = ("pymupdf", "pymupdf4llm", "conversion", "output", "prescan", "cache",
+                  "checkpoint", "incremental", "lowmem", "isolation", "profiling", "session")
+
+# Interval for draining conversion events and repainting (10 Hz) / 変換イベントを処理して再描画する間隔（10 Hz）
+EVENT_POLL_INTERVAL_MS = 100
+
+# Lines kept in the log widget / ログ表示に保持する行数
+MAX_LOG_LINES = 2000
+
+# Seconds between checks for events and cancellation of a job process / ジョブプロセスのイベントとキャンセルを確認する間隔（秒）
+JOB_POLL_INTERVAL = 0.2
+
+
+# UI text by language, built once at import / 言語別のUIテキスト（インポート時に一度だけ構築）
+TRANSLATIONS = {
+    "ja": {
+        "title": "PDF to Markdown Converter",
+        "file_selection": "PDFファイル選択",
+        "browse": "参照",
+        "drag_drop_hint": "または、PDFファイルをこのウィンドウにドラッグ＆ドロップしてください",
+        "conversion_options": "変換オプション",                "add_page_headers": "ページ番号を見出しとして追加",
+        "page_range": "ページ範囲",
+        "page_range_hint": "変換するページ範囲を指定 (例: 1-5, 3,7,10, または空白で全ページ)",
+        "worker_processes": "ワーカープロセス数",
+        "worker_processes_hint": "2以上でページを複数プロセスで並列変換します",
+        "language_selection": "言語選択",
+        "start_conversion": "変換開始",
+        "ready": "準備完了",
+        "log": "ログ",
+        "converting": "変換中...",
+        "error": "エラー",
+        "warning": "警告",
+        "completed": "完了",
+        "file_selected": "ファイルが選択されました",
+        "file_dropped": "ファイルがドロップされました",
+        "select_pdf_file": "PDFファイルを選択してください。",
+        "file_not_found": "選択されたファイルが存在しません。",
+        "not_pdf_file": "PDFファイルを選択してください。",
+        "conversion_in_progress": "変換が既に実行中です。",
+        "conversion_starting": "変換を開始します...",
+        "total_pages": "総ページ数",
+        "page_completed": "完了",
+        "conversion_completed": "変換完了",
+        "conversion_success": "変換が完了しました。\n保存先:",
+        "no_content": "変換できるコンテンツがありませんでした。",
+        "conversion_failed": "変換失敗",
+        "conversion_cancelled": "変換をキャンセルしました",
+        "drop_pdf_only": "PDFファイルをドロップしてください。",
+        "drag_drop_unavailable": "ドラッグアンドドロップ機能が利用できません",
+        "drop_error": "ドロップエラー",
+        "no_pages": "PDFにページが含まれていません。",
+        "page_conversion_error": "の変換でエラー",
+        "pdf_read_error": "PDFファイルの読み込みエラー",
+        "conversion_error": "変換エラー",                "file_save_error": "ファイル保存エラー",
+        "invalid_page_range": "無効なページ範囲です",
+        "page_range_error": "ページ範囲の指定に誤りがあります",
+        "page_out_of_range": "指定されたページが範囲外です",
+        "use_page_cache": "変換済みページのキャッシュを使用",
+        "clear_cache": "キャッシュを削除",
+        "page_cache": "ページキャッシュ",
+        "cache_cleared": "キャッシュを削除しました",
+        "cache_unavailable": "ページキャッシュを利用できません",
+        "column_file": "ファイル",
+        "column_pages": "ページ数",
+        "column_state": "状態",
+        "state_queued": "待機中",
+        "state_running": "変換中",
+        "state_done": "完了",
+        "state_failed": "失敗",
+        "state_cancelled": "キャンセル",
+        "clear_list": "完了分をクリア",
+        "concurrent_documents": "同時変換数",
+        "schedule_order": "変換順序",
+        "policy_fifo": "追加順",
+        "policy_largest_first": "ページ数の多い順",
+        "policy_shortest_first": "ページ数の少ない順",
+        "timing": "処理時間",
+        "save_log_file": "ログ全体をファイルに保存",
+        "log_file": "ログファイル",
+        "cancel": "キャンセル",
+        "cancelling": "キャンセル中...",
+        "conversion_preset": "変換プリセット",
+        "preset_fast_text": "高速テキスト（テキストのみ）",
+        "preset_balanced": "バランス（複雑なページのみ完全変換）",
+        "preset_full_fidelity": "高忠実度（全ページを完全変換）",
+        "write_page_index": "ページインデックスを書き出す",
+        "incremental_update": "既存の出力を差分更新（変更されたページのみ変換）",
+        "incremental_reuse": "差分更新",
+        "extract_images": "埋め込み画像を抽出（同じ画像は一度だけ保存）",
+        "image_extraction": "画像",
+        "strip_repeated": "繰り返されるヘッダー・フッター・ページ番号を除去",
+        "repeated_removed": "ヘッダー・フッター",
+        "incremental_unavailable": "差分更新を利用できません",
+        "engine_unavailable": "変換エンジンを読み込めません",
+        "job_process_failed": "変換プロセスが予期せず終了しました",
+        "page_time_limit": "ページの時間上限（秒、0 = なし）",
+        "page_memory_limit": "ページのメモリ上限（MB、0 = なし）",
+        "low_memory_mode": "省メモリモード（1プロセスで変換）",
+        "memory_ceiling": "メモリ上限（MB、0 = なし）",
+        "memory_usage": "メモリ",
+        "page_budget_exceeded": "ページ {page} は上限を超えたため打ち切りました（{reason}、{seconds:.1f}秒）。プレーンテキストを出力しました",
+        "budget_time": "時間",
+        "budget_memory": "メモリ",
+        "budget_crashed": "ワーカーの異常終了",
+        "prescan_split": "事前スキャン",
+        "resuming_from_checkpoint": "チェックポイントから再開します（変換済みページ）",
+        "checkpoint_unavailable": "チェックポイントを利用できません",
+        "batch_summary": "一括変換が完了しました。\n成功: {done}  失敗: {failed}  キャンセル: {cancelled}",
+        "pymupdf_not_installed": "PyMuPDF4LLMまたはPyMuPDFがインストールされていません。",
+        "install_pymupdf": "pip install pymupdf4llm でインストールしてください。",
+        "tkinterdnd2_not_installed": "tkinterdnd2がインストールされていません。",
+        "install_tkinterdnd2": "pip install tkinterdnd2 でインストールしてください。"
+    },
+    "en": {
+        "title": "PDF to Markdown Converter",
+        "file_selection": "PDF File Selection",
+        "browse": "Browse",
+        "drag_drop_hint": "Or drag and drop a PDF file into this window",
+        "conversion_options": "Conversion Options",                "add_page_headers": "Add page numbers as headers",
+        "page_range": "Page Range",
+        "page_range_hint": "Specify page range to convert (e.g., 1-5, 3,7,10, or leave empty for all pages)",
+        "worker_processes": "Worker processes",
+        "worker_processes_hint": "2 or more converts pages in parallel processes",
+        "language_selection": "Language",
+        "start_conversion": "Start Conversion",
+        "ready": "Ready",
+        "log": "Log",
+        "converting": "Converting...",
+        "error": "Error",
+        "warning": "Warning",
+        "completed": "Completed",
+        "file_selected": "File selected",
+        "file_dropped": "File dropped",
+        "select_pdf_file": "Please select a PDF file.",
+        "file_not_found": "Selected file does not exist.",
+        "not_pdf_file": "Please select a PDF file.",
+        "conversion_in_progress": "Conversion is already in progress.",
+        "conversion_starting": "Starting conversion...",
+        "total_pages": "Total pages",
+        "page_completed": "completed",
+        "conversion_completed": "Conversion completed",
+        "conversion_success": "Conversion completed successfully.\nSaved to:",
+        "no_content": "No content could be converted.",
+        "conversion_failed": "Conversion failed",
+        "conversion_cancelled": "Conversion cancelled",
+        "drop_pdf_only": "Please drop a PDF file.",
+        "drag_drop_unavailable": "Drag and drop feature is not available",
+        "drop_error": "Drop error",
+        "no_pages": "The PDF contains no pages.",
+        "page_conversion_error": "Error converting page",
+        "pdf_read_error": "PDF file reading error",
+        "conversion_error": "Conversion error",                "file_save_error": "File save error",
+        "invalid_page_range": "Invalid page range",
+        "page_range_error": "Error in page range specification", 
+        "page_out_of_range": "Specified page is out of range",
+        "use_page_cache": "Use cache of converted pages",
+        "clear_cache": "Clear cache",
+        "page_cache": "Page cache",
+        "cache_cleared": "Cache cleared",
+        "cache_unavailable": "Page cache is not available",
+        "column_file": "File",
+        "column_pages": "Pages",
+        "column_state": "State",
+        "state_queued": "Queued",
+        "state_running": "Converting",
+        "state_done": "Done",
+        "state_failed": "Failed",
+        "state_cancelled": "Cancelled",
+        "clear_list": "Clear finished",
+        "concurrent_documents": "Concurrent documents",
+        "schedule_order": "Order",
+        "policy_fifo": "As added",
+        "policy_largest_first": "Largest first",
+        "policy_shortest_first": "Shortest first",
+        "timing": "Timing",
+        "save_log_file": "Save full log to file",
+        "log_file": "Log file",
+        "cancel": "Cancel",
+        "cancelling": "Cancelling...",
+        "conversion_preset": "Conversion preset",
+        "preset_fast_text": "Fast text (text only)",
+        "preset_balanced": "Balanced (full conversion of complex pages)",
+        "preset_full_fidelity": "Full fidelity (full conversion of every page)",
+        "write_page_index": "Write page index",
+        "incremental_update": "Update existing output incrementally (convert changed pages only)",
+        "incremental_reuse": "Incremental update",
+        "extract_images": "Extract embedded images (each unique image saved once)",
+        "image_extraction": "Images",
+        "strip_repeated": "Remove repeated headers, footers and page numbers",
+        "repeated_removed": "Headers/footers",
+        "incremental_unavailable": "Incremental update is not available",
+        "engine_unavailable": "Could not load the conversion engine",
+        "job_process_failed": "The conversion process terminated unexpectedly",
+        "page_time_limit": "Page time limit (s, 0 = none)",
+        "page_memory_limit": "Page memory limit (MB, 0 = none)",
+        "low_memory_mode": "Low-memory mode (single process)",
+        "memory_ceiling": "Memory ceiling (MB, 0 = none)",
+        "memory_usage": "Memory",
+        "page_budget_exceeded": "Page {page} was cut off after exceeding its budget ({reason}, {seconds:.1f}s); plain text written",
+        "budget_time": "time",
+        "budget_memory": "memory",
+        "budget_crashed": "worker crashed",
+        "prescan_split": "Pre-scan",
+        "resuming_from_checkpoint": "Resuming from checkpoint (pages already converted)",
+        "checkpoint_unavailable": "Checkpoint is not available",
+        "batch_summary": "Batch conversion finished.\nSucceeded: {done}  Failed: {failed}  Cancelled: {cancelled}",
+        "pymupdf_not_installed": "PyMuPDF4LLM or PyMuPDF is not installed.",
+        "install_pymupdf": "Please install with: pip install pymupdf4llm",
+        "tkinterdnd2_not_installed": "tkinterdnd2 is not installed.",
+        "install_tkinterdnd2": "Please install with: pip install tkinterdnd2"
+    }
+}
+
 
 class LanguageManager:
     """Language management class / 言語管理クラス"""
@@ -58,96 +282,7 @@ class LanguageManager:
     def __init__(self):
         self.config_file = "config.json"  # Configuration file / 設定ファイル
         self.current_language = self.load_language_setting()  # Load saved language / 保存された言語を読み込み
-        self.translations = {
-            "ja": {
-                "title": "PDF to Markdown Converter",
-                "file_selection": "PDFファイル選択",
-                "browse": "参照",
-                "drag_drop_hint": "または、PDFファイルをこのウィンドウにドラッグ＆ドロップしてください",
-                "conversion_options": "変換オプション",                "add_page_headers": "ページ番号を見出しとして追加",
-                "page_range": "ページ範囲",
-                "page_range_hint": "変換するページ範囲を指定 (例: 1-5, 3,7,10, または空白で全ページ)",
-                "language_selection": "言語選択",
-                "start_conversion": "変換開始",
-                "ready": "準備完了",
-                "log": "ログ",
-                "converting": "変換中...",
-                "error": "エラー",
-                "warning": "警告",
-                "completed": "完了",
-                "file_selected": "ファイルが選択されました",
-                "file_dropped": "ファイルがドロップされました",
-                "select_pdf_file": "PDFファイルを選択してください。",
-                "file_not_found": "選択されたファイルが存在しません。",
-                "not_pdf_file": "PDFファイルを選択してください。",
-                "conversion_in_progress": "変換が既に実行中です。",
-                "conversion_starting": "変換を開始します...",
-                "total_pages": "総ページ数",
-                "page_completed": "完了",
-                "conversion_completed": "変換完了",
-                "conversion_success": "変換が完了しました。\n保存先:",
-                "no_content": "変換できるコンテンツがありませんでした。",
-                "conversion_failed": "変換失敗",
-                "drop_pdf_only": "PDFファイルをドロップしてください。",
-                "drag_drop_unavailable": "ドラッグアンドドロップ機能が利用できません",
-                "drop_error": "ドロップエラー",
-                "no_pages": "PDFにページが含まれていません。",
-                "page_conversion_error": "の変換でエラー",
-                "pdf_read_error": "PDFファイルの読み込みエラー",
-                "conversion_error": "変換エラー",                "file_save_error": "ファイル保存エラー",
-                "invalid_page_range": "無効なページ範囲です",
-                "page_range_error": "ページ範囲の指定に誤りがあります",
-                "page_out_of_range": "指定されたページが範囲外です",
-                "pymupdf_not_installed": "PyMuPDF4LLMまたはPyMuPDFがインストールされていません。",
-                "install_pymupdf": "pip install pymupdf4llm でインストールしてください。",
-                "tkinterdnd2_not_installed": "tkinterdnd2がインストールされていません。",
-                "install_tkinterdnd2": "pip install tkinterdnd2 でインストールしてください。"
-            },
-            "en": {
-                "title": "PDF to Markdown Converter",
-                "file_selection": "PDF File Selection",
-                "browse": "Browse",
-                "drag_drop_hint": "Or drag and drop a PDF file into this window",
-                "conversion_options": "Conversion Options",                "add_page_headers": "Add page numbers as headers",
-                "page_range": "Page Range",
-                "page_range_hint": "Specify page range to convert (e.g., 1-5, 3,7,10, or leave empty for all pages)",
-                "language_selection": "Language",
-                "start_conversion": "Start Conversion",
-                "ready": "Ready",
-                "log": "Log",
-                "converting": "Converting...",
-                "error": "Error",
-                "warning": "Warning",
-                "completed": "Completed",
-                "file_selected": "File selected",
-                "file_dropped": "File dropped",
-                "select_pdf_file": "Please select a PDF file.",
-                "file_not_found": "Selected file does not exist.",
-                "not_pdf_file": "Please select a PDF file.",
-                "conversion_in_progress": "Conversion is already in progress.",
-                "conversion_starting": "Starting conversion...",
-                "total_pages": "Total pages",
-                "page_completed": "completed",
-                "conversion_completed": "Conversion completed",
-                "conversion_success": "Conversion completed successfully.\nSaved to:",
-                "no_content": "No content could be converted.",
-                "conversion_failed": "Conversion failed",
-                "drop_pdf_only": "Please drop a PDF file.",
-                "drag_drop_unavailable": "Drag and drop feature is not available",
-                "drop_error": "Drop error",
-                "no_pages": "The PDF contains no pages.",
-                "page_conversion_error": "Error converting page",
-                "pdf_read_error": "PDF file reading error",
-                "conversion_error": "Conversion error",                "file_save_error": "File save error",
-                "invalid_page_range": "Invalid page range",
-                "page_range_error": "Error in page range specification", 
-                "page_out_of_range": "Specified page is out of range",
-                "pymupdf_not_installed": "PyMuPDF4LLM or PyMuPDF is not installed.",
-                "install_pymupdf": "Please install with: pip install pymupdf4llm",
-                "tkinterdnd2_not_installed": "tkinterdnd2 is not installed.",
-                "install_tkinterdnd2": "Please install with: pip install tkinterdnd2"
-            }
-        }
+        self.translations = TRANSLATIONS
     
     def load_language_setting(self):
         """Load language setting from config file / 設定ファイルから言語設定を読み込み"""
@@ -189,6 +324,61 @@ class LanguageManager:
         return display_names.get(lang_code, lang_code)
 
 
+class LogSink:
+    """
+    Coalesce log lines into one widget update per repaint / ログ行をまとめて再描画毎に1回だけ表示を更新
+
+    Only the last max_lines lines stay in the widget; the full log can be spilled to a file.
+    表示には最新の max_lines 行のみを残し、ログ全体はファイルに書き出せる。
+    """
+    
+    def __init__(self, widget, max_lines=MAX_LOG_LINES):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.log_path = None
+        self._pending = []
+        self._file = None
+    
+    def write(self, text):
+        """Queue text for the next repaint / 次の再描画に向けてテキストを追加"""
+        self._pending.append(text)
+    
+    def flush(self):
+        """Write queued text in one insert and trim old lines / 追加されたテキストを一度に挿入して古い行を削除"""
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        if self._file is not None:
+            self._file.write(text)
+            self._file.flush()
+        
+        self.widget.insert(tk.END, text)
+        # Every line ends with a newline, so the last line is empty / 各行は改行で終わるため最終行は空
+        lines = int(self.widget.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            self.widget.delete("1.0", f"{lines - self.max_lines + 1}.0")
+        self.widget.see(tk.END)
+    
+    def clear(self):
+        """Clear the widget / 表示をクリア"""
+        self._pending.clear()
+        self.widget.delete("1.0", tk.END)
+    
+    def open_log_file(self, path):
+        """Spill the full log to a file from now on / 以降のログ全体をファイルに書き出す"""
+        self.close_log_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, 'w', encoding='utf-8')
+        self.log_path = path
+    
+    def close_log_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.log_path = None
+
+
 class PDFToMarkdownConverter:
     def __init__(self, root):
         self.root = root
@@ -197,16 +387,89 @@ class PDFToMarkdownConverter:
         self.lang_manager = LanguageManager()
         
         self.root.title(self.lang_manager.get_text("title"))
-        self.root.geometry("800x600")
+        self.root.geometry("800x760")
         
         # Conversion state management / 変換状態管理
         self.is_converting = False
+        self.conversion_options = {}
+        self.cancel_event = threading.Event()
+        self.page_cache = None
+        
+        # Job queue for dropped and selected files / ドロップ・選択されたファイルのジョブキュー
+        self.scheduler = JobScheduler(self.run_conversion,
+                                      on_change=lambda job: self.post_event('job', job),
+                                      on_idle=lambda: self.post_event('finished'),
+                                      count_job=self.count_job)
+        self.batch_jobs = {}
+        self.job_context = threading.local()
+        
+        # Open documents reused by repeated conversions, created on first use
+        # 再変換で再利用する開いたドキュメント（初回使用時に作成）
+        self.document_pool = None
+        self.document_pool_lock = threading.Lock()
+        
+        # Set once the conversion engine has been imported; conversions wait for it
+        # 変換エンジンのインポート完了時にセット。変換はこれを待つ
+        self.engine_ready = threading.Event()
+        
+        # Events posted by the conversion thread / 変換スレッドから送られるイベント
+        self.event_queue = queue.Queue()
         
         # Create UI / UI作成
         self.create_widgets()
         
         # Setup drag and drop / ドラッグアンドドロップの設定
         self.setup_drag_and_drop()
+        
+        # Start draining events and handle window close / イベント処理の開始とウィンドウクローズの処理
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.process_events()
+        
+        # Load the conversion engine once the window is up / ウィンドウ表示後に変換エンジンを読み込む
+        self.root.after_idle(self.preload_engine)
+    
+    @classmethod
+    def headless(cls, conversion_options, language, event_queue, cancel_event):
+        """
+        Instance without a window that only converts (see _run_job_process)
+        変換のみを行うウィンドウのないインスタンス（_run_job_process参照）
+        The conversion methods never touch Tk, so no widgets are created.
+        変換のメソッドはTkに触れないため、ウィジェットは作成しない。
+        """
+        self = cls.__new__(cls)
+        self.lang_manager = LanguageManager()
+        self.lang_manager.current_language = language
+        self.conversion_options = conversion_options
+        self.cancel_event = cancel_event
+        self.event_queue = event_queue
+        self.page_cache = None
+        self.job_context = threading.local()
+        self.document_pool = None
+        self.document_pool_lock = threading.Lock()
+        self.engine_ready = threading.Event()
+        self.engine_ready.set()
+        return self
+    
+    def preload_engine(self):
+        """Import the conversion engine on a background thread / 変換エンジンをバックグラウンドスレッドでインポート"""
+        threading.Thread(target=self._load_engine, daemon=True).start()
+    
+    def _load_engine(self):
+        try:
+            for name in ENGINE_MODULES:
+                importlib.import_module(name)
+        except Exception as e:
+            self.log_message(f"{self.lang_manager.get_text('engine_unavailable')}: {str(e)}")
+        finally:
+            self.engine_ready.set()
+    
+    def get_document_pool(self):
+        """Get the document pool, creating it on first use / ドキュメントプールを取得（初回使用時に作成）"""
+        with self.document_pool_lock:
+            if self.document_pool is None:
+                from session import DocumentPool
+                self.document_pool = DocumentPool()
+            return self.document_pool
     
     def create_widgets(self):
         # Main frame / メインフレーム
@@ -253,6 +516,27 @@ class PDFToMarkdownConverter:
                                        foreground="gray")
         self.drag_drop_label.grid(row=1, column=0, columnspan=2, pady=(5, 0))
         
+        # Job list / ジョブ一覧
+        job_list_frame = ttk.Frame(self.file_frame)
+        job_list_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        
+        self.job_tree = ttk.Treeview(job_list_frame, columns=("file", "pages", "state"),
+                                     show="headings", height=4)
+        self.job_tree.column("file", width=420)
+        self.job_tree.column("pages", width=80, anchor=tk.E)
+        self.job_tree.column("state", width=120)
+        self.job_tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        job_scrollbar = ttk.Scrollbar(job_list_frame, orient=tk.VERTICAL, command=self.job_tree.yview)
+        job_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.job_tree.configure(yscrollcommand=job_scrollbar.set)
+        job_list_frame.columnconfigure(0, weight=1)
+        
+        self.clear_list_button = ttk.Button(self.file_frame, text=self.lang_manager.get_text("clear_list"), 
+                                            command=self.clear_finished_jobs)
+        self.clear_list_button.grid(row=3, column=0, columnspan=2, sticky=tk.E, pady=(5, 0))
+        self.update_job_tree_headings()
+        
         # Options frame / オプションフレーム
         self.options_frame = ttk.LabelFrame(main_frame, text=self.lang_manager.get_text("conversion_options"), padding="10")
         self.options_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -274,6 +558,126 @@ class PDFToMarkdownConverter:
                                   foreground="gray", font=("TkDefaultFont", 8))
         page_range_hint.grid(row=3, column=0, sticky=tk.W, pady=(2, 0))
         
+        # Worker process count / ワーカープロセス数
+        self.workers_label = ttk.Label(self.options_frame, text=self.lang_manager.get_text("worker_processes"))
+        self.workers_label.grid(row=4, column=0, sticky=tk.W, pady=(10, 0))
+        
+        self.workers_var = tk.IntVar(value=1)
+        self.workers_spinbox = ttk.Spinbox(self.options_frame, from_=1, to=os.cpu_count() or 1,
+                                           textvariable=self.workers_var, width=5)
+        self.workers_spinbox.grid(row=5, column=0, sticky=tk.W, pady=(5, 0))
+        
+        self.workers_hint = ttk.Label(self.options_frame, text=self.lang_manager.get_text("worker_processes_hint"), 
+                                    foreground="gray", font=("TkDefaultFont", 8))
+        self.workers_hint.grid(row=6, column=0, sticky=tk.W, pady=(2, 0))
+        
+        # Page cache option / ページキャッシュオプション
+        cache_frame = ttk.Frame(self.options_frame)
+        cache_frame.grid(row=7, column=0, sticky=tk.W, pady=(10, 0))
+        
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.use_cache_checkbox = ttk.Checkbutton(cache_frame, text=self.lang_manager.get_text("use_page_cache"), 
+                                                  variable=self.use_cache_var)
+        self.use_cache_checkbox.grid(row=0, column=0, sticky=tk.W)
+        
+        self.clear_cache_button = ttk.Button(cache_frame, text=self.lang_manager.get_text("clear_cache"), 
+                                             command=self.clear_page_cache)
+        self.clear_cache_button.grid(row=0, column=1, padx=(10, 0))
+        
+        # Full log file option / ログ全体のファイル保存オプション
+        self.save_log_var = tk.BooleanVar(value=False)
+        self.save_log_checkbox = ttk.Checkbutton(cache_frame, text=self.lang_manager.get_text("save_log_file"), 
+                                                 variable=self.save_log_var)
+        self.save_log_checkbox.grid(row=0, column=2, sticky=tk.W, padx=(20, 0))
+        
+        # Conversion preset / 変換プリセット
+        preset_frame = ttk.Frame(cache_frame)
+        preset_frame.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        self.preset_label = ttk.Label(preset_frame, text=self.lang_manager.get_text("conversion_preset"))
+        self.preset_label.grid(row=0, column=0, sticky=tk.W)
+        
+        self.preset_combo = ttk.Combobox(preset_frame, state="readonly", width=36)
+        self.preset_combo.grid(row=0, column=1, padx=(5, 0))
+        self.update_preset_combo(DEFAULT_PRESET)
+        
+        # Page index option / ページインデックスオプション
+        self.page_index_var = tk.BooleanVar(value=False)
+        self.page_index_checkbox = ttk.Checkbutton(cache_frame, text=self.lang_manager.get_text("write_page_index"), 
+                                                   variable=self.page_index_var)
+        self.page_index_checkbox.grid(row=1, column=2, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+        
+        # Incremental update option / 差分更新オプション
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.incremental_checkbox = ttk.Checkbutton(cache_frame, text=self.lang_manager.get_text("incremental_update"), 
+                                                    variable=self.incremental_var)
+        self.incremental_checkbox.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        # Image extraction option / 画像抽出オプション
+        self.images_var = tk.BooleanVar(value=False)
+        self.images_checkbox = ttk.Checkbutton(cache_frame, text=self.lang_manager.get_text("extract_images"), 
+                                               variable=self.images_var)
+        self.images_checkbox.grid(row=2, column=2, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+        
+        # Repeated header and footer option / 繰り返されるヘッダー・フッターのオプション
+        self.strip_repeated_var = tk.BooleanVar(value=False)
+        self.strip_repeated_checkbox = ttk.Checkbutton(cache_frame, text=self.lang_manager.get_text("strip_repeated"), 
+                                                       variable=self.strip_repeated_var)
+        self.strip_repeated_checkbox.grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        # Batch scheduling options / 一括変換のスケジューリングオプション
+        batch_frame = ttk.Frame(self.options_frame)
+        batch_frame.grid(row=8, column=0, sticky=tk.W, pady=(10, 0))
+        
+        self.concurrent_label = ttk.Label(batch_frame, text=self.lang_manager.get_text("concurrent_documents"))
+        self.concurrent_label.grid(row=0, column=0, sticky=tk.W)
+        
+        self.concurrent_var = tk.IntVar(value=1)
+        self.concurrent_spinbox = ttk.Spinbox(batch_frame, from_=1, to=os.cpu_count() or 1,
+                                              textvariable=self.concurrent_var, width=5)
+        self.concurrent_spinbox.grid(row=0, column=1, padx=(5, 20))
+        
+        self.order_label = ttk.Label(batch_frame, text=self.lang_manager.get_text("schedule_order"))
+        self.order_label.grid(row=0, column=2, sticky=tk.W)
+        
+        self.order_combo = ttk.Combobox(batch_frame, state="readonly", width=20)
+        self.order_combo.grid(row=0, column=3, padx=(5, 0))
+        self.update_order_combo(POLICY_FIFO)
+        
+        # Per-page budget options / ページ毎の上限オプション
+        budget_frame = ttk.Frame(self.options_frame)
+        budget_frame.grid(row=9, column=0, sticky=tk.W, pady=(10, 0))
+        
+        self.page_timeout_label = ttk.Label(budget_frame, text=self.lang_manager.get_text("page_time_limit"))
+        self.page_timeout_label.grid(row=0, column=0, sticky=tk.W)
+        
+        self.page_timeout_var = tk.IntVar(value=0)
+        self.page_timeout_spinbox = ttk.Spinbox(budget_frame, from_=0, to=3600, increment=10,
+                                                textvariable=self.page_timeout_var, width=6)
+        self.page_timeout_spinbox.grid(row=0, column=1, padx=(5, 20))
+        
+        self.page_memory_label = ttk.Label(budget_frame, text=self.lang_manager.get_text("page_memory_limit"))
+        self.page_memory_label.grid(row=0, column=2, sticky=tk.W)
+        
+        self.page_memory_var = tk.IntVar(value=0)
+        self.page_memory_spinbox = ttk.Spinbox(budget_frame, from_=0, to=65536, increment=256,
+                                               textvariable=self.page_memory_var, width=7)
+        self.page_memory_spinbox.grid(row=0, column=3, padx=(5, 0))
+        
+        # Low-memory mode / 省メモリモード
+        self.low_memory_var = tk.BooleanVar(value=False)
+        self.low_memory_checkbox = ttk.Checkbutton(budget_frame, text=self.lang_manager.get_text("low_memory_mode"), 
+                                                   variable=self.low_memory_var)
+        self.low_memory_checkbox.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        self.memory_ceiling_label = ttk.Label(budget_frame, text=self.lang_manager.get_text("memory_ceiling"))
+        self.memory_ceiling_label.grid(row=1, column=2, sticky=tk.W, pady=(5, 0))
+        
+        self.memory_ceiling_var = tk.IntVar(value=0)
+        self.memory_ceiling_spinbox = ttk.Spinbox(budget_frame, from_=0, to=65536, increment=256,
+                                                  textvariable=self.memory_ceiling_var, width=7)
+        self.memory_ceiling_spinbox.grid(row=1, column=3, padx=(5, 0), pady=(5, 0))
+        
         # Conversion button frame / 変換ボタンフレーム
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=3, column=0, columnspan=2, pady=(0, 10))        
@@ -281,6 +685,10 @@ class PDFToMarkdownConverter:
         self.convert_button = ttk.Button(button_frame, text=self.lang_manager.get_text("start_conversion"), command=self.start_conversion)
         self.convert_button.grid(row=0, column=0)
         
+        self.cancel_button = ttk.Button(button_frame, text=self.lang_manager.get_text("cancel"), 
+                                        command=self.cancel_conversion, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=1, padx=(10, 0))
+        
         # Progress bar / プログレスバー
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, 
@@ -298,6 +706,7 @@ class PDFToMarkdownConverter:
         
         self.log_text = scrolledtext.ScrolledText(self.log_frame, height=15, width=70)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.log_sink = LogSink(self.log_text)
         
         # Grid weight settings / グリッドの重み設定
         self.root.columnconfigure(0, weight=1)
@@ -336,34 +745,179 @@ class PDFToMarkdownConverter:
             page_range_hint.config(text=self.lang_manager.get_text("page_range_hint"))
         except IndexError:
             pass  # UI not fully initialized yet / UIがまだ完全に初期化されていない
+        self.workers_label.config(text=self.lang_manager.get_text("worker_processes"))
+        self.workers_hint.config(text=self.lang_manager.get_text("worker_processes_hint"))
+        self.use_cache_checkbox.config(text=self.lang_manager.get_text("use_page_cache"))
+        self.save_log_checkbox.config(text=self.lang_manager.get_text("save_log_file"))
+        self.preset_label.config(text=self.lang_manager.get_text("conversion_preset"))
+        self.update_preset_combo(self.get_preset())
+        self.page_index_checkbox.config(text=self.lang_manager.get_text("write_page_index"))
+        self.incremental_checkbox.config(text=self.lang_manager.get_text("incremental_update"))
+        self.images_checkbox.config(text=self.lang_manager.get_text("extract_images"))
+        self.strip_repeated_checkbox.config(text=self.lang_manager.get_text("strip_repeated"))
+        self.clear_cache_button.config(text=self.lang_manager.get_text("clear_cache"))
+        self.concurrent_label.config(text=self.lang_manager.get_text("concurrent_documents"))
+        self.order_label.config(text=self.lang_manager.get_text("schedule_order"))
+        self.page_timeout_label.config(text=self.lang_manager.get_text("page_time_limit"))
+        self.page_memory_label.config(text=self.lang_manager.get_text("page_memory_limit"))
+        self.low_memory_checkbox.config(text=self.lang_manager.get_text("low_memory_mode"))
+        self.memory_ceiling_label.config(text=self.lang_manager.get_text("memory_ceiling"))
+        self.update_order_combo(self.get_schedule_policy())
+        self.clear_list_button.config(text=self.lang_manager.get_text("clear_list"))
+        self.update_job_tree_headings()
+        for job in self.scheduler.jobs:
+            self.update_job_row(job)
         
         self.convert_button.config(text=self.lang_manager.get_text("start_conversion"))
+        self.cancel_button.config(text=self.lang_manager.get_text("cancel"))
         self.log_frame.config(text=self.lang_manager.get_text("log"))
         
         # Update status if it's "Ready" / ステータスが"準備完了"の場合は更新
         if self.status_var.get() in ["準備完了", "Ready"]:
             self.status_var.set(self.lang_manager.get_text("ready"))
     
+    def update_job_tree_headings(self):
+        """Update job list headings / ジョブ一覧の見出しを更新"""
+        for column in ("file", "pages", "state"):
+            self.job_tree.heading(column, text=self.lang_manager.get_text(f"column_{column}"))
+    
+    def update_order_combo(self, policy):
+        """Fill the order combobox in the current language / 現在の言語で変換順序の選択肢を設定"""
+        self.order_combo.config(values=[self.lang_manager.get_text(f"policy_{p}") for p in POLICIES])
+        self.order_combo.set(self.lang_manager.get_text(f"policy_{policy}"))
+    
+    def update_preset_combo(self, preset):
+        """Fill the preset combobox in the current language / 現在の言語で変換プリセットの選択肢を設定"""
+        self.preset_combo.config(values=[self.lang_manager.get_text(f"preset_{p}") for p in PRESETS])
+        self.preset_combo.current(PRESETS.index(preset))
+    
+    def get_preset(self):
+        """Get selected conversion preset / 選択された変換プリセットを取得"""
+        index = self.preset_combo.current()
+        return PRESETS[index] if index >= 0 else DEFAULT_PRESET
+    
+    def get_schedule_policy(self):
+        """Get selected scheduling policy / 選択されたスケジューリングポリシーを取得"""
+        selected = self.order_combo.get()
+        for policy in POLICIES:
+            if self.lang_manager.get_text(f"policy_{policy}") == selected:
+                return policy
+        return POLICY_FIFO
+    
+    def update_job_row(self, job):
+        """Insert or refresh a job row / ジョブの行を追加または更新"""
+        state_text = self.lang_manager.get_text(f"state_{job.state}")
+        if job.state == RUNNING:
+            state_text = f"{state_text} {job.progress:.0f}%"
+        values = (os.path.basename(job.pdf_path),
+                  job.page_count if job.page_count is not None else "?", state_text)
+        item = str(job.job_id)
+        if self.job_tree.exists(item):
+            self.job_tree.item(item, values=values)
+        else:
+            self.job_tree.insert("", tk.END, iid=item, values=values)
+    
+    def clear_finished_jobs(self):
+        """Remove finished jobs from the list / 完了したジョブを一覧から削除"""
+        for job in self.scheduler.remove_finished():
+            if self.job_tree.exists(str(job.job_id)):
+                self.job_tree.delete(str(job.job_id))
+    
+    def enqueue_files(self, file_paths):
+        """
+        Queue PDF files for conversion without opening them
+        PDFファイルを開かずに変換キューに追加
+        Pages are counted on a scheduler thread: by the conversion, or beforehand when
+        the order depends on page counts (see count_job).
+        ページ数はスケジューラーのスレッドで数える：変換時、または順序がページ数に依存する
+        場合はその前に数える（count_job参照）。
+        """
+        queued = self.scheduler.queued_paths()
+        for path in file_paths:
+            if path not in queued:
+                self.scheduler.add(path)
+                queued.add(path)
+    
+    def count_job(self, job):
+        """
+        Count the pages of a queued job, or None (runs on a scheduler thread)
+        待機中のジョブのページ数を数える（開けない場合はNone、スケジューラーのスレッドで実行）
+        The scheduler calls this only while no job is running; the pooled document
+        stays open for the conversion.
+        スケジューラーは実行中のジョブがない時にのみ呼び出す。プールしたドキュメントは
+        変換のために開いたままにする。
+        """
+        try:
+            session = self.get_document_pool().acquire(job.pdf_path)
+        except Exception:
+            return None
+        page_count = session.page_count
+        self.get_document_pool().release(session)
+        return page_count
+    
     def select_file(self):
         """File selection dialog / ファイル選択ダイアログ"""
         title_text = "PDFファイルを選択" if self.lang_manager.current_language == "ja" else "Select PDF File"
-        file_path = filedialog.askopenfilename(
+        file_paths = filedialog.askopenfilenames(
             title=title_text,
             filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
         )
-        if file_path:
-            self.file_path_var.set(file_path)
-            message = f"{self.lang_manager.get_text('file_selected')}: {os.path.basename(file_path)}"
-            self.log_message(message)
+        if file_paths:
+            self.file_path_var.set(file_paths[0])
+            for file_path in file_paths:
+                message = f"{self.lang_manager.get_text('file_selected')}: {os.path.basename(file_path)}"
+                self.log_message(message)
+            self.enqueue_files(list(file_paths))
     
     def log_message(self, message):
-        """Add log message / ログメッセージの追加"""
+        """Add log message (thread-safe) / ログメッセージの追加（スレッドセーフ）"""
         timestamp = time.strftime("%H:%M:%S")
-        log_line = f"[{timestamp}] {message}\n"
+        # Tell interleaved documents apart / 並行して変換中の文書を区別する
+        job = getattr(self.job_context, 'job', None)
+        if job is not None and self.conversion_options.get('concurrent', 1) > 1:
+            message = f"{os.path.basename(job.pdf_path)}: {message}"
+        self.post_event('log', f"[{timestamp}] {message}\n")
+    
+    def post_event(self, kind, *args):
+        """Post an event for the UI thread / UIスレッド向けにイベントを送信"""
+        self.event_queue.put((kind, args))
+    
+    def process_events(self):
+        """Drain queued events on the UI thread / UIスレッドでキュー内のイベントを処理"""
+        progressed = {}
+        try:
+            while True:
+                kind, args = self.event_queue.get_nowait()
+                if kind == 'log':
+                    self.log_sink.write(args[0])
+                elif kind == 'job':
+                    self.on_job_changed(args[0])
+                elif kind == 'job_progress':
+                    # Keep only the latest progress of each job / 各ジョブの最新の進捗のみ保持
+                    progressed[args[0].job_id] = args[0]
+                elif kind == 'finished':
+                    self.log_sink.flush()
+                    self.handle_batch_finished()
+        except queue.Empty:
+            pass
         
-        self.log_text.insert(tk.END, log_line)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        # Repaint once per interval / 一定間隔毎に一度だけ再描画
+        for job in progressed.values():
+            self.update_job_row(job)
+        if progressed:
+            self.update_batch_progress()
+        self.log_sink.flush()
+        self.root.after(EVENT_POLL_INTERVAL_MS, self.process_events)
+    
+    def on_close(self):
+        """Cancel running conversion and close window / 実行中の変換をキャンセルしてウィンドウを閉じる"""
+        self.scheduler.cancel()
+        self.cancel_event.set()
+        if self.document_pool is not None:
+            self.document_pool.close()
+        self.log_sink.close_log_file()
+        self.root.destroy()
+    
     def setup_drag_and_drop(self):
         """Setup drag and drop functionality / ドラッグアンドドロップ機能の設定"""
         if not DRAG_DROP_AVAILABLE:
@@ -396,16 +950,17 @@ class PDFToMarkdownConverter:
     def on_drop(self, event):
         """Processing when file is dropped / ファイルがドロップされた時の処理"""
         try:
-            # Get path of dropped file / ドロップされたファイルのパスを取得
-            files = event.data.split()
+            # Get paths of dropped files (Tcl list, braces for spaces) / ドロップされたファイルのパスを取得（Tclリスト形式）
+            files = self.root.tk.splitlist(event.data)
             if files:
-                file_path = files[0].strip('{}')  # Remove braces / 波括弧を除去
-                
-                # Check if it's a PDF file / PDFファイルかチェック
-                if file_path.lower().endswith('.pdf'):
-                    self.file_path_var.set(file_path)
-                    message = f"{self.lang_manager.get_text('file_dropped')}: {os.path.basename(file_path)}"
-                    self.log_message(message)
+                # Check for PDF files / PDFファイルかチェック
+                pdf_paths = [file_path for file_path in files if file_path.lower().endswith('.pdf')]
+                if pdf_paths:
+                    self.file_path_var.set(pdf_paths[0])
+                    for file_path in pdf_paths:
+                        message = f"{self.lang_manager.get_text('file_dropped')}: {os.path.basename(file_path)}"
+                        self.log_message(message)
+                    self.enqueue_files(pdf_paths)
                 else:
                     messagebox.showerror(self.lang_manager.get_text("error"), 
                                        self.lang_manager.get_text("drop_pdf_only"))
@@ -415,294 +970,506 @@ class PDFToMarkdownConverter:
             self.log_message(error_msg)
         
         return event.action
-    def convert_pages(self, pdf_path):
-        """Convert all pages sequentially / 全ページを順次変換"""
-        doc = None
+    
+    def convert_selected_pages(self, session, page_numbers, writer, checkpoint, profile=None, incremental=None,
+                               memory=None, images=None, repeated=None):
+        """Convert selected pages into writer, resuming from checkpoint / 選択ページを writer に変換（チェックポイントから再開）"""
+        import conversion
+        
+        workers = self.conversion_options['workers']
+        if workers > 1 and memory is None:
+            self.log_message(f"{self.lang_manager.get_text('worker_processes')}: {workers}")
+        
         try:
-            # Open document / ドキュメントを開く
-            doc = pymupdf.open(pdf_path)
-            total_pages = len(doc)
-            
-            if total_pages == 0:
-                return {'error': self.lang_manager.get_text("no_pages")}
-            
-            # For better performance with large PDFs, convert entire document at once
-            # 大きなPDFでのパフォーマンス向上のため、ドキュメント全体を一度に変換
-            try:
-                # Convert entire document with PyMuPDF4LLM / PyMuPDF4LLMでドキュメント全体を変換
-                md_text = pymupdf4llm.to_markdown(doc)
-                
-                # If page headers are requested, we'll process page by page / ページヘッダーが要求された場合はページ毎に処理
-                if self.add_page_headers_var.get():
-                    return self._convert_pages_with_headers(doc, total_pages)
-                else:
-                    # Return as single result / 単一結果として返す
-                    self.progress_var.set(100)
-                    self.log_message(f"{self.lang_manager.get_text('page_completed')} {total_pages}/{total_pages}")
-                    self.root.update()
-                    
-                    return [{
-                        'page_num': 1,
-                        'content': md_text
-                    }]
-                    
-            except Exception as e:
-                # Fall back to page-by-page conversion / ページ毎の変換にフォールバック
-                self.log_message(f"Falling back to page-by-page conversion: {str(e)}")
-                return self._convert_pages_with_headers(doc, total_pages)
-            
+            # Each page is converted at most once, sequentially or on worker processes
+            # 各ページは順次またはワーカープロセスで高々一度だけ変換される
+            return conversion.convert_file(session.pdf_path, page_numbers,
+                                           add_page_headers=self.conversion_options['add_page_headers'],
+                                           workers=workers,
+                                           on_page=self._on_page_converted,
+                                           on_error=self._on_page_error,
+                                           cancel_event=self.cancel_event,
+                                           sink=writer,
+                                           cache=self.conversion_options['cache'],
+                                           checkpoint=checkpoint,
+                                           profile=profile,
+                                           session=session,
+                                           preset=self.conversion_options['preset'],
+                                           on_prescan=self._on_prescan,
+                                           watchdog=self.create_watchdog(session.pdf_path),
+                                           incremental=incremental,
+                                           memory=memory,
+                                           images=images,
+                                           repeated=repeated)
+        
+        except conversion.ConversionCancelled:
+            raise
         except Exception as e:
             return {'error': f"{self.lang_manager.get_text('pdf_read_error')}: {str(e)}"}
-        
-        finally:
-            if doc:
-                doc.close()
     
-    def _convert_pages_with_headers(self, doc, total_pages):
-        """Convert pages individually with headers / ヘッダー付きでページを個別変換"""
-        all_results = []
-        
-        for page_num in range(total_pages):
-            single_page_doc = None
+    def create_watchdog(self, pdf_path):
+        """Create the per-page budget watchdog, if a budget is set / 上限が設定されていればページ毎のウォッチドッグを作成"""
+        timeout = self.conversion_options['page_timeout']
+        memory_mb = self.conversion_options['page_memory']
+        if not timeout and not memory_mb:
+            return None
+        from isolation import PageWatchdog
+        return PageWatchdog(pdf_path, timeout, memory_mb, on_exceeded=self._on_page_budget_exceeded)
+    
+    def create_memory_governor(self):
+        """Create the low-memory governor, if enabled / 有効であれば省メモリモードの管理を作成"""
+        ceiling = self.conversion_options['memory_ceiling']
+        if not self.conversion_options['low_memory'] and not ceiling:
+            return None
+        from lowmem import MemoryGovernor
+        return MemoryGovernor(ceiling)
+    
+    def create_image_extractor(self, writer):
+        """Create the image extractor for an output, if enabled / 有効であれば出力の画像抽出を作成"""
+        if not self.conversion_options['images']:
+            return None
+        from images import ImageExtractor, image_dir_for
+        return ImageExtractor(image_dir_for(writer.output_path))
+    
+    def create_repeated_regions(self):
+        """Create the repeated header and footer index, if enabled / 有効であれば繰り返されるヘッダー・フッターの索引を作成"""
+        if not self.conversion_options['strip_repeated']:
+            return None
+        from repeated import RepeatedRegions
+        return RepeatedRegions()
+    
+    def _on_page_budget_exceeded(self, page_num, reason, seconds):
+        """Report a page cut off by the watchdog / ウォッチドッグが打ち切ったページを通知"""
+        self.log_message(self.lang_manager.get_text('page_budget_exceeded').format(
+            page=page_num, reason=self.lang_manager.get_text(f"budget_{reason}"), seconds=seconds))
+    
+    def _on_prescan(self, plan):
+        """Report how pages were routed / ページの振り分けを通知"""
+        import prescan
+        self.log_message(f"{self.lang_manager.get_text('prescan_split')}: {prescan.summary_text(plan)}")
+    
+    def _on_page_converted(self, page_num, done, total):
+        """Report a converted page / 変換済みページを通知"""
+        # Update progress / プログレス更新
+        self._report_progress(done, total)
+        message = f"{self.lang_manager.get_text('page_completed')} {page_num} ({done}/{total})"
+        self.log_message(message)
+    
+    def _report_progress(self, done, total):
+        """Update progress of the current job / 現在のジョブの進捗を更新"""
+        job = self.job_context.job
+        job.progress = (done / total) * 100
+        self.post_event('job_progress', job)
+    
+    def _on_page_error(self, page_num, error):
+        """Report a page that failed to convert / 変換に失敗したページを通知"""
+        # Continue on individual page errors / 個別ページのエラーは継続する
+        error_msg = f"{self.lang_manager.get_text('page_conversion_error')} {page_num}: {str(error)}"
+        self.log_message(error_msg)
+    
+    def get_page_cache(self):
+        """Get the page cache, opening it on first use / ページキャッシュを取得（初回使用時に開く）"""
+        if self.page_cache is None:
             try:
-                # Add page number as header / ページ番号を見出しとして追加
-                if self.add_page_headers_var.get():
-                    header = f"\n\n# Page {page_num + 1}\n\n"
-                else:
-                    header = "\n\n"
-                
-                # Convert single page to Markdown / 単一ページをMarkdownに変換
-                single_page_doc = pymupdf.open()
-                single_page_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-                
-                # Convert with PyMuPDF4LLM / PyMuPDF4LLMで変換
-                md_text = pymupdf4llm.to_markdown(single_page_doc)
-                
-                all_results.append({
-                    'page_num': page_num + 1,
-                    'content': header + md_text
-                })
-                
-                # Update progress / プログレス更新
-                progress = ((page_num + 1) / total_pages) * 100
-                self.progress_var.set(progress)
-                message = f"{self.lang_manager.get_text('page_completed')} {page_num + 1}/{total_pages}"
-                self.log_message(message)
-                self.root.update()  # Update UI / UI更新
-                
+                from cache import PageCache
+                self.page_cache = PageCache()
             except Exception as e:
-                error_msg = f"{self.lang_manager.get_text('page_conversion_error')} {page_num + 1}: {str(e)}"
-                self.log_message(error_msg)
-                # Continue on individual page errors / 個別ページのエラーは継続する
-                
-            finally:
-                if single_page_doc:
-                    single_page_doc.close()
-        
-        return all_results
+                self.log_message(f"{self.lang_manager.get_text('cache_unavailable')}: {str(e)}")
+                return None
+        self.page_cache.reset_counters()
+        return self.page_cache
     
-    def convert_specific_pages(self, pdf_path, page_numbers):
-        """Convert specific pages only / 指定したページのみを変換"""
-        doc = None
+    def clear_page_cache(self):
+        """Delete all cached pages / キャッシュされた全ページを削除"""
+        if self.is_converting:
+            messagebox.showwarning(self.lang_manager.get_text("warning"), 
+                                 self.lang_manager.get_text("conversion_in_progress"))
+            return
+        cache = self.get_page_cache()
+        if cache is not None:
+            cache.clear()
+            self.log_message(self.lang_manager.get_text("cache_cleared"))
+    
+    def get_worker_count(self):
+        """Get requested number of worker processes / 指定されたワーカープロセス数を取得"""
         try:
-            # Open document / ドキュメントを開く
-            doc = pymupdf.open(pdf_path)
-            total_pages = len(doc)
-            
-            if total_pages == 0:
-                return {'error': self.lang_manager.get_text("no_pages")}
-            
-            all_results = []
-            
-            for i, page_num in enumerate(page_numbers):
-                single_page_doc = None
-                try:
-                    # Add page number as header / ページ番号を見出しとして追加
-                    if self.add_page_headers_var.get():
-                        header = f"\n\n# Page {page_num}\n\n"
-                    else:
-                        header = "\n\n"
-                    
-                    # Convert single page to Markdown / 単一ページをMarkdownに変換
-                    single_page_doc = pymupdf.open()
-                    single_page_doc.insert_pdf(doc, from_page=page_num-1, to_page=page_num-1)
-                    
-                    # Convert with PyMuPDF4LLM / PyMuPDF4LLMで変換
-                    md_text = pymupdf4llm.to_markdown(single_page_doc)
-                    
-                    all_results.append({
-                        'page_num': page_num,
-                        'content': header + md_text
-                    })
-                    
-                    # Update progress / プログレス更新
-                    progress = ((i + 1) / len(page_numbers)) * 100
-                    self.progress_var.set(progress)
-                    message = f"{self.lang_manager.get_text('page_completed')} {page_num} ({i + 1}/{len(page_numbers)})"
-                    self.log_message(message)
-                    self.root.update()  # Update UI / UI更新
-                    
-                except Exception as e:
-                    error_msg = f"{self.lang_manager.get_text('page_conversion_error')} {page_num}: {str(e)}"
-                    self.log_message(error_msg)
-                    # Continue on individual page errors / 個別ページのエラーは継続する
-                    
-                finally:
-                    if single_page_doc:
-                        single_page_doc.close()
-            
-            return all_results
-            
-        except Exception as e:
-            return {'error': f"{self.lang_manager.get_text('pdf_read_error')}: {str(e)}"}
-        
-        finally:
-            if doc:
-                doc.close()
-
+            workers = int(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = 1
+        return max(1, min(workers, os.cpu_count() or 1))
+    
     def start_conversion(self):
-        """Start conversion / 変換開始"""
-        pdf_path = self.file_path_var.get().strip()
-        
-        if not pdf_path:
-            messagebox.showerror(self.lang_manager.get_text("error"), 
-                               self.lang_manager.get_text("select_pdf_file"))
-            return
-            
-        if not os.path.exists(pdf_path):
-            messagebox.showerror(self.lang_manager.get_text("error"), 
-                               self.lang_manager.get_text("file_not_found"))
-            return
-        
-        if not pdf_path.lower().endswith('.pdf'):
-            messagebox.showerror(self.lang_manager.get_text("error"), 
-                               self.lang_manager.get_text("not_pdf_file"))
-            return
-        
+        """Start converting queued files / キュー内のファイルの変換開始"""
         if self.is_converting:
             messagebox.showwarning(self.lang_manager.get_text("warning"), 
                                  self.lang_manager.get_text("conversion_in_progress"))
             return
         
+        # Without queued files, convert the file in the entry / キューが空なら入力欄のファイルを変換
+        if not self.scheduler.has_queued():
+            pdf_path = self.file_path_var.get().strip()
+            
+            if not pdf_path:
+                messagebox.showerror(self.lang_manager.get_text("error"), 
+                                   self.lang_manager.get_text("select_pdf_file"))
+                return
+                
+            if not os.path.exists(pdf_path):
+                messagebox.showerror(self.lang_manager.get_text("error"), 
+                                   self.lang_manager.get_text("file_not_found"))
+                return
+            
+            if not pdf_path.lower().endswith('.pdf'):
+                messagebox.showerror(self.lang_manager.get_text("error"), 
+                                   self.lang_manager.get_text("not_pdf_file"))
+                return
+            
+            self.enqueue_files([pdf_path])
+        
         # Update UI state / UI状態の更新
         self.is_converting = True
         self.convert_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
         self.progress_var.set(0)
         self.status_var.set(self.lang_manager.get_text("converting"))
         
+        # Snapshot options so the worker never touches Tk variables / ワーカーがTk変数に触れないようオプションを確定
+        self.conversion_options = {
+            'add_page_headers': self.add_page_headers_var.get(),
+            'page_range': self.page_range_var.get().strip(),
+            'workers': self.get_worker_count(),
+            'concurrent': self.get_concurrent_count(),
+            'cache': self.get_page_cache() if self.use_cache_var.get() else None,
+            'preset': self.get_preset(),
+            'page_index': self.page_index_var.get(),
+            'incremental': self.incremental_var.get(),
+            'images': self.images_var.get(),
+            'strip_repeated': self.strip_repeated_var.get(),
+            'page_timeout': self.get_budget_value(self.page_timeout_var),
+            'page_memory': self.get_budget_value(self.page_memory_var),
+            'low_memory': self.low_memory_var.get(),
+            'memory_ceiling': self.get_budget_value(self.memory_ceiling_var),
+        }
+        self.cancel_event = threading.Event()
+        self.batch_jobs = {}
+        # Files may have been moved or deleted since the last batch / 前回の一括変換以降にファイルが移動・削除されている可能性がある
+        import output
+        output.reset_output_names()
+        
         # Clear log / ログクリア
-        self.log_text.delete(1.0, tk.END)
+        self.log_sink.clear()
+        self.log_sink.close_log_file()
+        if self.save_log_var.get():
+            from cache import default_cache_dir
+            log_path = default_cache_dir() / "logs" / time.strftime("conversion-%Y%m%d-%H%M%S.log")
+            try:
+                self.log_sink.open_log_file(log_path)
+                self.log_message(f"{self.lang_manager.get_text('log_file')}: {log_path}")
+            except OSError as e:
+                self.log_message(f"{self.lang_manager.get_text('file_save_error')}: {str(e)}")
         self.log_message(self.lang_manager.get_text("conversion_starting"))
-          # Execute conversion / 変換実行
-        self.run_conversion(pdf_path)
+        
+        # Jobs run on scheduler threads, each in its own process when concurrent / ジョブはスケジューラーのスレッドで実行（同時変換時は各ジョブを専用プロセスで実行）
+        self.scheduler.start(self.conversion_options['concurrent'], self.get_schedule_policy())
     
-    def run_conversion(self, pdf_path):
-        """Execute conversion / 変換実行"""
+    def cancel_conversion(self):
+        """Cancel running and queued conversions / 実行中と待機中の変換をキャンセル"""
+        if not self.is_converting:
+            return
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_var.set(self.lang_manager.get_text("cancelling"))
+        self.scheduler.cancel()
+        self.cancel_event.set()
+    
+    def get_budget_value(self, variable):
+        """Get a per-page budget, 0 meaning none / ページ毎の上限を取得（0 は上限なし）"""
         try:
-            # Get total pages of PDF / PDFの総ページ数を取得
-            with pymupdf.open(pdf_path) as doc:
-                total_pages = len(doc)
-            
-            message = f"{self.lang_manager.get_text('total_pages')}: {total_pages}"
-            self.log_message(message)
-            
-            # Parse page range / ページ範囲を解析
-            try:
-                page_range_str = self.page_range_var.get().strip()
-                page_numbers = self.parse_page_range(page_range_str, total_pages)
-                
-                if page_numbers != list(range(1, total_pages + 1)):
-                    # Convert specific pages / 指定ページを変換
-                    self.log_message(f"Converting pages: {', '.join(map(str, page_numbers))}")
-                    all_results = self.convert_specific_pages(pdf_path, page_numbers)
-                else:
-                    # Convert all pages / 全ページを変換
-                    all_results = self.convert_pages(pdf_path)
-                
-            except Exception as e:
-                # Show error for invalid page range / 無効なページ範囲のエラーを表示
-                error_msg = str(e)
-                self.log_message(error_msg)
-                messagebox.showerror(self.lang_manager.get_text("error"), error_msg)
-                self.reset_ui_state()
-                return
-            
-            # Process results / 結果処理
-            self.handle_conversion_result(pdf_path, all_results)
+            return max(0, int(variable.get()))
+        except (tk.TclError, ValueError):
+            return 0
+    
+    def get_concurrent_count(self):
+        """Get requested number of concurrent documents / 指定された同時変換数を取得"""
+        try:
+            concurrent = int(self.concurrent_var.get())
+        except (tk.TclError, ValueError):
+            concurrent = 1
+        return max(1, min(concurrent, os.cpu_count() or 1))
+    
+    def run_conversion(self, job):
+        """
+        Convert one queued file and return output path (runs on a scheduler thread)
+        キュー内のファイルを1つ変換して出力パスを返す（スケジューラーのスレッドで実行）
+        With several concurrent documents each runs in its own process, as PyMuPDF
+        cannot convert on several threads at once.
+        複数の文書を同時に変換する場合、PyMuPDFは複数スレッドで同時に変換できないため、
+        それぞれ専用のプロセスで実行する。
+        """
+        if self.conversion_options['concurrent'] > 1:
+            return self.run_conversion_process(job)
+        return self.convert_job(job)
+    
+    def run_conversion_process(self, job):
+        """Convert one queued file in a spawned process and relay its events / キュー内のファイルを1つ起動したプロセスで変換し、そのイベントを中継"""
+        from conversion import ConversionCancelled
         
+        # Spawn keeps the process independent of the GUI / spawnでプロセスをGUIから独立させる
+        context = multiprocessing.get_context("spawn")
+        conn, child_conn = context.Pipe()
+        cancel_event = context.Event()
+        cache = self.conversion_options['cache']
+        # The page cache is reopened in the process / ページキャッシュはプロセス内で開き直す
+        options = dict(self.conversion_options, cache=cache is not None)
+        # Not a daemon, so it can start its own page workers; cancelling stops it
+        # デーモンにしないことで独自のページワーカーを起動できる。キャンセルで停止する
+        process = context.Process(target=_run_job_process,
+                                  args=(child_conn, job, options, self.lang_manager.current_language, cancel_event))
+        process.start()
+        child_conn.close()
+        try:
+            while True:
+                if self.cancel_event.is_set():
+                    cancel_event.set()
+                if not conn.poll(JOB_POLL_INTERVAL):
+                    continue
+                try:
+                    kind, args = conn.recv()
+                except (EOFError, OSError):
+                    raise Exception(self.lang_manager.get_text("job_process_failed"))
+                if kind == 'log':
+                    self.post_event('log', *args)
+                elif kind == 'job_progress':
+                    job.progress = args[0].progress
+                    job.page_count = args[0].page_count
+                    self.post_event('job_progress', job)
+                elif kind == 'cache':
+                    if cache is not None:
+                        cache.merge_counters(*args)
+                elif kind == 'done':
+                    return args[0]
+                elif kind == 'cancelled':
+                    raise ConversionCancelled()
+                elif kind == 'failed':
+                    raise Exception(args[0])
+        finally:
+            process.join()
+            conn.close()
+    
+    def convert_job(self, job):
+        """Convert one queued file in this process and return output path / キュー内のファイルを1つこのプロセスで変換して出力パスを返す"""
+        # Let the background import finish so the engine is imported on one thread only
+        # バックグラウンドのインポートの完了を待ち、エンジンを1つのスレッドでのみインポートする
+        self.engine_ready.wait()
+        from profiling import DocumentProfile
+        
+        self.job_context.job = job
+        profile = DocumentProfile(job.pdf_path)
+        
+        # Open the PDF once for the whole job / ジョブ全体でPDFを一度だけ開く
+        try:
+            with profile.opening():
+                session = self.get_document_pool().acquire(job.pdf_path)
         except Exception as e:
-            error_msg = f"{self.lang_manager.get_text('conversion_error')}: {str(e)}"
-            self.handle_conversion_error(error_msg)
+            raise Exception(f"{self.lang_manager.get_text('pdf_read_error')}: {str(e)}")
+        # Counted from the document the conversion uses / 変換に使うドキュメントから数える
+        job.page_count = session.page_count
+        job.counted = True
+        self.post_event('job_progress', job)
+        
+        try:
+            return self.convert_session(session, profile)
+        finally:
+            self.get_document_pool().release(session)
     
-    def handle_conversion_result(self, pdf_path, all_results):
-        """Process conversion results / 変換結果の処理"""
+    def convert_session(self, session, profile):
+        """Convert an open document and return output path / 開いているドキュメントを変換して出力パスを返す"""
+        pdf_path = session.pdf_path
+        total_pages = session.page_count
+        message = f"{self.lang_manager.get_text('total_pages')}: {total_pages}"
+        self.log_message(message)
+        
+        if total_pages == 0:
+            raise Exception(self.lang_manager.get_text("no_pages"))
+        
+        # Parse page range / ページ範囲を解析
+        page_range_str = self.conversion_options['page_range']
+        page_numbers = self.parse_page_range(page_range_str, total_pages)
+        if page_numbers != list(range(1, total_pages + 1)):
+            self.log_message(f"Converting pages: {', '.join(map(str, page_numbers))}")
+        
+        checkpoint = self.open_checkpoint(session, page_numbers)
+        incremental = None
+        memory = self.create_memory_governor()
+        repeated = self.create_repeated_regions()
+        images = None
+        writer = None
         try:
-            if isinstance(all_results, dict) and 'error' in all_results:
-                self.log_message(all_results['error'])
-                self.status_var.set(self.lang_manager.get_text("error"))
-                messagebox.showerror(self.lang_manager.get_text("error"), all_results['error'])
-            elif all_results:
-                output_path = self.save_markdown(pdf_path, all_results)
-                message = f"{self.lang_manager.get_text('conversion_completed')}: {output_path}"
-                self.log_message(message)
+            if self.conversion_options['incremental']:
+                incremental = self.open_incremental(session, page_numbers)
+            # Open the output up front and stream pages into it / 出力を先に開いてページをストリーミング書き込み
+            writer = self.open_markdown_writer(pdf_path, page_numbers, incremental)
+            images = self.create_image_extractor(writer)
+            result = self.convert_selected_pages(session, page_numbers, writer, checkpoint, profile, incremental,
+                                                 memory, images, repeated)
+            if images:
+                images.close()
+        
+        except BaseException:
+            # Keep the checkpoint so the next run resumes / 次回再開できるようチェックポイントは残す
+            if checkpoint:
+                checkpoint.close()
+            if incremental:
+                incremental.close()
+            if images:
+                images.close()
+            if writer:
+                writer.discard()
+            raise
+        
+        # Process results / 結果処理
+        if isinstance(result, dict) and 'error' in result:
+            if checkpoint:
+                checkpoint.close()
+            writer.discard()
+            raise Exception(result['error'])
+        if checkpoint:
+            checkpoint.remove()
+        if incremental:
+            self.log_message(f"{self.lang_manager.get_text('incremental_reuse')}: {incremental.summary_text()}")
+        if memory:
+            self.log_message(f"{self.lang_manager.get_text('memory_usage')}: {memory.summary_text()}")
+        if images:
+            self.log_message(f"{self.lang_manager.get_text('image_extraction')}: {images.summary_text()}")
+        if repeated:
+            self.log_message(f"{self.lang_manager.get_text('repeated_removed')}: {repeated.summary_text()}")
+        self.log_message(f"{self.lang_manager.get_text('timing')}: {profile.summary_text()}")
+        if not writer.pages_written:
+            writer.discard()
+            raise Exception(self.lang_manager.get_text("no_content"))
+        return self.close_markdown_writer(writer)
+    
+    def open_checkpoint(self, session, page_numbers):
+        """Open the resume checkpoint for a file / ファイルの再開用チェックポイントを開く"""
+        options = {'add_page_headers': self.conversion_options['add_page_headers'],
+                   'page_range': self.conversion_options['page_range'],
+                   'preset': self.conversion_options['preset'],
+                   'images': self.conversion_options['images'],
+                   'strip_repeated': self.conversion_options['strip_repeated']}
+        try:
+            from checkpoint import Checkpoint
+            checkpoint = Checkpoint(session.pdf_path, options, source=session.source_hash())
+        except Exception as e:
+            self.log_message(f"{self.lang_manager.get_text('checkpoint_unavailable')}: {str(e)}")
+            return None
+        resumed = sum(1 for page_num in page_numbers if page_num in checkpoint.completed)
+        if resumed:
+            self.log_message(f"{self.lang_manager.get_text('resuming_from_checkpoint')}: "
+                             f"{resumed}/{len(page_numbers)}")
+        return checkpoint
+    
+    def open_incremental(self, session, page_numbers):
+        """Prepare reuse of the previous output of a file / ファイルの前回の出力の再利用を準備"""
+        import output
+        from incremental import IncrementalUpdate
+        
+        options = {'add_page_headers': self.conversion_options['add_page_headers'],
+                   'preset': self.conversion_options['preset'],
+                   'images': self.conversion_options['images'],
+                   'strip_repeated': self.conversion_options['strip_repeated']}
+        output_path = output.allocate_output_path(session.pdf_path, self.conversion_options['page_range'],
+                                                  unique=False)
+        try:
+            return IncrementalUpdate(output_path, session.doc, page_numbers, options)
+        except Exception as e:
+            self.log_message(f"{self.lang_manager.get_text('incremental_unavailable')}: {str(e)}")
+            return None
+    
+    def on_job_changed(self, job):
+        """Reflect a job state change in the UI / ジョブの状態変化をUIに反映"""
+        self.update_job_row(job)
+        name = os.path.basename(job.pdf_path)
+        if job.state == RUNNING:
+            self.batch_jobs[job.job_id] = job
+        elif job.job_id in self.batch_jobs:
+            if job.state == DONE:
+                self.log_message(f"{self.lang_manager.get_text('conversion_completed')}: {job.output_path}")
+            elif job.state == FAILED:
+                self.log_message(f"{self.lang_manager.get_text('conversion_error')}: {name}: {job.error}")
+            elif job.state == CANCELLED:
+                self.log_message(f"{self.lang_manager.get_text('conversion_cancelled')}: {name}")
+        self.update_batch_progress()
+    
+    def update_batch_progress(self):
+        """Show mean progress of the running batch / 実行中の一括変換の平均進捗を表示"""
+        if not self.batch_jobs:
+            return
+        total = sum(job.progress if job.state == RUNNING else 100.0 for job in self.batch_jobs.values())
+        self.progress_var.set(total / len(self.batch_jobs))
+    
+    def handle_batch_finished(self):
+        """Report results once the queue has drained / キューが空になったら結果を通知"""
+        import output
+        # All writers are closed; do not keep listings between batches / すべてのライターは閉じている。一括変換の間で一覧を保持しない
+        output.reset_output_names()
+        jobs = list(self.batch_jobs.values())
+        cache = self.conversion_options.get('cache')
+        if cache is not None and jobs:
+            self.log_message(f"{self.lang_manager.get_text('page_cache')}: {cache.stats_text()}")
+        
+        done = sum(1 for job in jobs if job.state == DONE)
+        failed = sum(1 for job in jobs if job.state == FAILED)
+        cancelled = sum(1 for job in jobs if job.state == CANCELLED)
+        
+        if len(jobs) == 1:
+            # A single file keeps the familiar dialogs / 単一ファイルの場合は従来のダイアログ
+            job = jobs[0]
+            if job.state == DONE:
                 self.status_var.set(self.lang_manager.get_text("conversion_completed"))
-                success_msg = f"{self.lang_manager.get_text('conversion_success')} {output_path}"
+                success_msg = f"{self.lang_manager.get_text('conversion_success')} {job.output_path}"
                 messagebox.showinfo(self.lang_manager.get_text("completed"), success_msg)
-            else:
-                self.log_message(self.lang_manager.get_text("no_content"))
+            elif job.state == CANCELLED:
+                self.status_var.set(self.lang_manager.get_text("conversion_cancelled"))
+            elif job.error == self.lang_manager.get_text("no_content"):
                 self.status_var.set(self.lang_manager.get_text("conversion_failed"))
-                messagebox.showwarning(self.lang_manager.get_text("warning"), 
-                                     self.lang_manager.get_text("no_content"))
+                messagebox.showwarning(self.lang_manager.get_text("warning"), job.error)
+            else:
+                self.status_var.set(self.lang_manager.get_text("error"))
+                messagebox.showerror(self.lang_manager.get_text("error"), job.error)
+        elif jobs:
+            summary = self.lang_manager.get_text("batch_summary").format(
+                done=done, failed=failed, cancelled=cancelled)
+            self.status_var.set(self.lang_manager.get_text("conversion_completed" if not failed else "conversion_failed"))
+            if failed:
+                messagebox.showwarning(self.lang_manager.get_text("warning"), summary)
+            else:
+                messagebox.showinfo(self.lang_manager.get_text("completed"), summary)
         
-        finally:
-            self.reset_ui_state()
-    
-    def handle_conversion_error(self, error_msg):
-        """Process conversion errors / 変換エラーの処理"""
-        self.log_message(error_msg)
-        self.status_var.set(self.lang_manager.get_text("error"))
-        messagebox.showerror(self.lang_manager.get_text("error"), error_msg)
         self.reset_ui_state()
     
-    def save_markdown(self, pdf_path, results):
-        """Save as Markdown file / Markdownファイルとして保存"""
+    def open_markdown_writer(self, pdf_path, page_numbers, incremental=None):
+        """
+        Open the Markdown output file for streaming / ストリーミング用にMarkdown出力ファイルを開く
+        With incremental, the previous output is replaced when finished / incremental があれば完了時に前回の出力を置き換える
+        """
+        import output
+        
         try:
-            # Determine output filename (safe filename generation) / 出力ファイル名を決定（安全なファイル名生成）
-            pdf_name = pathlib.Path(pdf_path).stem
-            parent_dir = pathlib.Path(pdf_path).parent
-            
-            # Add page range info to filename if specific pages were converted / 特定ページが変換された場合はページ範囲情報をファイル名に追加
-            page_range_str = self.page_range_var.get().strip()
-            if page_range_str:
-                # Sanitize page range string for filename / ファイル名用にページ範囲文字列をサニタイズ
-                safe_range = page_range_str.replace(',', '_').replace('-', 'to').replace(' ', '')
-                output_path = parent_dir / f"{pdf_name}_pages_{safe_range}.md"
-            else:
-                output_path = parent_dir / f"{pdf_name}.md"
-            
-            # Add number if existing file exists / 既存ファイルがある場合は番号を付ける
-            counter = 1
-            original_output_path = output_path
-            while output_path.exists():
-                if page_range_str:
-                    safe_range = page_range_str.replace(',', '_').replace('-', 'to').replace(' ', '')
-                    output_path = parent_dir / f"{pdf_name}_pages_{safe_range}_{counter}.md"
-                else:
-                    output_path = parent_dir / f"{pdf_name}_{counter}.md"
-                counter += 1
-            
-            # Combine content and save / 内容を結合して保存
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(f"# {pdf_name}\n\n")
-                f.write(f"*PDF to Markdown converted file*\n\n")
-                if page_range_str:
-                    f.write(f"*Converted pages: {page_range_str}*\n\n")
-                f.write("---\n\n")
-                
-                for result in results:
-                    f.write(result['content'])
-            return str(output_path)
-            
+            page_range_str = self.conversion_options['page_range']
+            if incremental:
+                return output.MarkdownWriter(incremental.output_path, page_numbers, pathlib.Path(pdf_path).stem,
+                                             page_range_str, index=True, fingerprints=incremental.fingerprints,
+                                             source=incremental.source, overwrite=True)
+            output_path = output.allocate_output_path(pdf_path, page_range_str)
+            return output.MarkdownWriter(output_path, page_numbers, pathlib.Path(pdf_path).stem,
+                                         page_range_str, index=self.conversion_options['page_index'])
+        except Exception as e:
+            raise Exception(f"{self.lang_manager.get_text('file_save_error')}: {str(e)}")
+    
+    def close_markdown_writer(self, writer):
+        """Finish the Markdown output file / Markdown出力ファイルを完成させる"""
+        try:
+            writer.close()
+            return str(writer.output_path)
         except Exception as e:
             raise Exception(f"{self.lang_manager.get_text('file_save_error')}: {str(e)}")
     
@@ -710,48 +1477,55 @@ class PDFToMarkdownConverter:
         """Reset UI state / UI状態のリセット"""
         self.is_converting = False
         self.convert_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
         self.progress_var.set(0)
     
     def parse_page_range(self, page_range_str, total_pages):
         """Parse page range string and return list of page numbers / ページ範囲文字列を解析してページ番号のリストを返す"""
-        if not page_range_str.strip():
-            # Return all pages if empty / 空の場合は全ページを返す
-            return list(range(1, total_pages + 1))
+        import conversion
         
-        pages = []
         try:
-            # Split by comma / カンマで分割
-            parts = page_range_str.split(',')
-            
-            for part in parts:
-                part = part.strip()
-                if '-' in part:
-                    # Range specification like "1-5" / "1-5"のような範囲指定
-                    start, end = part.split('-', 1)
-                    start = int(start.strip())
-                    end = int(end.strip())
-                    
-                    if start < 1 or end > total_pages or start > end:
-                        raise ValueError(f"Invalid range: {part}")
-                    
-                    pages.extend(range(start, end + 1))
-                else:
-                    # Single page number / 単一ページ番号
-                    page_num = int(part)
-                    if page_num < 1 or page_num > total_pages:
-                        raise ValueError(f"Page {page_num} out of range")
-                    pages.append(page_num)
-            
-            # Remove duplicates and sort / 重複を削除してソート
-            pages = sorted(list(set(pages)))
-            return pages
-            
+            return conversion.parse_page_range(page_range_str, total_pages)
+        
         except ValueError as e:
             raise Exception(f"{self.lang_manager.get_text('page_range_error')}: {str(e)}")
         except Exception as e:
             raise Exception(f"{self.lang_manager.get_text('invalid_page_range')}: {str(e)}")
 
 
+class _PipeEvents:
+    """Event queue of a job process that sends events to the GUI / GUIにイベントを送るジョブプロセスのイベントキュー"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def put(self, event):
+        self.conn.send(event)
+
+
+def _run_job_process(conn, job, conversion_options, language, cancel_event):
+    """Convert one queued file in a job process (see run_conversion_process) / ジョブプロセスでキュー内のファイルを1つ変換（run_conversion_process参照）"""
+    from conversion import ConversionCancelled
+    
+    app = PDFToMarkdownConverter.headless(conversion_options, language, _PipeEvents(conn), cancel_event)
+    app.job_context.job = job
+    cache = app.get_page_cache() if conversion_options['cache'] else None
+    conversion_options['cache'] = cache
+    try:
+        result = ('done', app.convert_job(job))
+    except ConversionCancelled:
+        result = ('cancelled',)
+    except Exception as e:
+        result = ('failed', str(e))
+    if cache is not None:
+        conn.send(('cache', (cache.hits, cache.misses)))
+        cache.close()
+    if app.document_pool is not None:
+        app.document_pool.close()
+    conn.send((result[0], result[1:]))
+    conn.close()
+
+
 def main():
     """Main function / メイン関数"""
     try:
@@ -768,4 +1542,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for worker processes in frozen executables / 実行ファイル化した場合のワーカープロセスに必要
+    multiprocessing.freeze_support()
     main()
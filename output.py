@@ -0,0 +1,532 @@
+"""
+Markdown output writers / Markdown出力ライター
+Write converted pages to disk as soon as they are ready
+変換されたページを準備でき次第ディスクに書き出す
+"""
+
+import gzip
+import json
+import os
+import pathlib
+import queue
+import re
+import shutil
+import threading
+from collections import OrderedDict, deque
+
+from pageindex import page_hash, write_index
+
+# Bytes buffered before the file is flushed / ファイルをフラッシュするまでにバッファするバイト数
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Writes queued for the I/O thread before the converter waits / 変換側が待つまでにI/Oスレッドに積めるデータ数
+MAX_PENDING_WRITES = 64
+
+# Output compression / 出力の圧縮
+GZIP = "gzip"
+ZSTD = "zstd"
+COMPRESSIONS = (GZIP, ZSTD)
+COMPRESSION_SUFFIXES = {GZIP: ".gz", ZSTD: ".zst"}
+
+MANIFEST_NAME = "manifest.json"
+
+# Suffix of an output being written to replace an existing one / 既存の出力を置き換えるために書き込み中の出力の接尾辞
+PARTIAL_SUFFIX = ".partial"
+
+# Output directories whose listings are kept; the least recently used are dropped beyond this
+# 一覧を保持する出力ディレクトリ数。これを超えると最も長く使われていないものから破棄する
+MAX_LISTED_DIRS = 64
+
+# Start of a Markdown heading line, where oversized pages may be split / 大きすぎるページを分割できる見出し行の先頭
+HEADING_BOUNDARY = re.compile(r"^(?=#)", re.MULTILINE)
+
+
+class OutputNames:
+    """
+    Free output names without a stat call per candidate / 候補毎の stat 呼び出しなしで空いている出力名を決める
+
+    Each directory is listed once and kept with the names handed out since, so
+    concurrent jobs never get the same name and the next number for a name is found
+    in constant time. At most max_dirs listings are kept, and reset() forgets them all,
+    e.g. at the start and end of a batch, so a long-running process neither grows
+    without bound nor keeps listings of files deleted since.
+    各ディレクトリは一度だけ一覧を取得し、その後に割り当てた名前と共に保持するため、並行する
+    ジョブが同じ名前を得ることはなく、次の番号は定数時間で見つかる。保持する一覧は最大
+    max_dirs 個で、reset() ですべて破棄する（一括変換の開始時と終了時など）。これにより
+    長時間動くプロセスでも際限なく増えたり、その後に削除されたファイルの一覧を保持したり
+    しない。
+    """
+
+    def __init__(self, max_dirs=MAX_LISTED_DIRS):
+        self.max_dirs = max_dirs
+        self._lock = threading.Lock()
+        self._listings = OrderedDict()
+        self._next = {}
+        self._keys = {}
+
+    def _listing(self, parent_dir):
+        names = self._listings.get(parent_dir)
+        if names is not None:
+            self._listings.move_to_end(parent_dir)
+            return names
+        try:
+            names = set(os.listdir(parent_dir))
+        except OSError:
+            names = set()
+        self._listings[parent_dir] = names
+        while len(self._listings) > self.max_dirs:
+            self._forget(self._listings.popitem(last=False)[0])
+        return names
+
+    def _forget(self, parent_dir):
+        """Drop the counters of a directory; it is listed again when next used / ディレクトリのカウンターを破棄（次回使用時に再度一覧を取得）"""
+        self._next = {key: counter for key, counter in self._next.items() if key[0] != parent_dir}
+
+    def allocate(self, parent_dir, base_name, suffix):
+        """Reserve base_name + suffix, or base_name_N + suffix if taken / base_name + suffix（使用中なら base_name_N + suffix）を予約"""
+        key = (pathlib.Path(parent_dir), base_name, suffix)
+        with self._lock:
+            names = self._listing(key[0])
+            counter = self._next.get(key, 0)
+            while True:
+                name = f"{base_name}{suffix}" if counter == 0 else f"{base_name}_{counter}{suffix}"
+                if name not in names and name + PARTIAL_SUFFIX not in names:
+                    break
+                counter += 1
+            names.add(name)
+            self._next[key] = counter + 1
+            path = key[0] / name
+            self._keys[path] = key
+            return path
+
+    def reallocate(self, path):
+        """Another name for an allocated path found taken, or None / 使用中と分かった割り当て済みのパスの別の名前（なければ None）"""
+        with self._lock:
+            key = self._keys.pop(pathlib.Path(path), None)
+            if key is None:
+                return None
+            self._listing(key[0]).add(pathlib.Path(path).name)
+        return self.allocate(*key)
+
+    def release(self, path):
+        """Forget an allocated path once its file has its final name / ファイルが最終的な名前を得たら割り当て済みのパスを破棄"""
+        with self._lock:
+            self._keys.pop(pathlib.Path(path), None)
+
+    def reset(self):
+        with self._lock:
+            self._listings.clear()
+            self._next.clear()
+            self._keys.clear()
+
+
+_output_names = OutputNames()
+
+
+def reset_output_names():
+    """Re-read output directories on the next allocation (start and end of a batch) / 次回の割り当てで出力ディレクトリを読み直す（一括変換の開始時と終了時）"""
+    _output_names.reset()
+
+
+def output_suffix(compression=None):
+    """Suffix of a Markdown output / Markdown出力の接尾辞"""
+    return ".md" + (COMPRESSION_SUFFIXES[compression] if compression else "")
+
+
+def allocate_output_path(pdf_path, page_range_str="", output_dir=None, suffix=".md", unique=True):
+    """
+    Determine a free output filename (safe filename generation) / 空いている出力ファイル名を決定（安全なファイル名生成）
+    With unique=False the base name is returned even if it exists / unique=False の場合は存在していても基本の名前を返す
+    """
+    pdf_name = pathlib.Path(pdf_path).stem
+    parent_dir = pathlib.Path(output_dir) if output_dir else pathlib.Path(pdf_path).parent
+
+    # Add page range info to filename if specific pages were converted / 特定ページが変換された場合はページ範囲情報をファイル名に追加
+    if page_range_str:
+        # Sanitize page range string for filename / ファイル名用にページ範囲文字列をサニタイズ
+        safe_range = page_range_str.replace(',', '_').replace('-', 'to').replace(' ', '')
+        base_name = f"{pdf_name}_pages_{safe_range}"
+    else:
+        base_name = pdf_name
+    if not unique:
+        return parent_dir / f"{base_name}{suffix}"
+
+    # Add number if existing file exists / 既存ファイルがある場合は番号を付ける
+    return _output_names.allocate(parent_dir, base_name, suffix)
+
+
+def open_output(path, compression=None, buffer_size=DEFAULT_BUFFER_SIZE, name=""):
+    """
+    Open a file for binary writing on a background thread, compressed if requested
+    バックグラウンドスレッドで書き込むバイナリファイルを開く（指定があれば圧縮）
+    name is stored in the gzip header / name は gzip のヘッダーに格納する
+    """
+    if compression not in (None,) + COMPRESSIONS:
+        raise ValueError(f"unknown compression: {compression} (choose from {', '.join(COMPRESSIONS)})")
+    if compression == ZSTD:
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires zstandard (pip install zstandard)") from None
+    raw = open(path, 'wb', buffering=buffer_size)
+    if compression == GZIP:
+        # mtime=0 keeps identical conversions byte-identical / mtime=0 で同じ変換をバイト単位で同一に保つ
+        return BackgroundFile(gzip.GzipFile(filename=name, mode='wb', fileobj=raw, mtime=0), raw)
+    if compression == ZSTD:
+        return BackgroundFile(zstandard.ZstdCompressor().stream_writer(raw, closefd=False), raw)
+    return BackgroundFile(raw)
+
+
+class BackgroundFile:
+    """
+    File whose writes and compression run on an I/O thread / 書き込みと圧縮をI/Oスレッドで行うファイル
+
+    write() only queues the data; an error on the thread is raised by the next
+    write() or by close(), which waits for everything to reach the file.
+    write() はデータを積むだけで、スレッドでのエラーは次の write() または、全データが
+    ファイルに届くのを待つ close() で発生する。
+    """
+
+    def __init__(self, file, raw=None, max_pending=MAX_PENDING_WRITES):
+        self._files = [file] if raw is None else [file, raw]
+        self._queue = queue.Queue(max_pending)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self._error is None:
+                try:
+                    self._files[0].write(data)
+                except Exception as e:
+                    self._error = e
+        for file in self._files:
+            try:
+                file.close()
+            except Exception as e:
+                self._error = self._error or e
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(data)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def document_header(title, page_range_str=""):
+    """Text placed before the first page / 最初のページの前に置くテキスト"""
+    header = f"# {title}\n\n*PDF to Markdown converted file*\n\n"
+    if page_range_str:
+        header += f"*Converted pages: {page_range_str}*\n\n"
+    return header + "---\n\n"
+
+
+class ResultCollector:
+    """Collect page results in memory / ページ結果をメモリに収集"""
+
+    def __init__(self):
+        self._results = {}
+
+    @property
+    def pages_written(self):
+        return len(self._results)
+
+    @property
+    def results(self):
+        """Page results in page order / ページ順のページ結果"""
+        return [{'page_num': page_num, 'content': self._results[page_num]}
+                for page_num in sorted(self._results)]
+
+    def write_page(self, page_num, content):
+        self._results[page_num] = content
+
+    def skip_page(self, page_num):
+        pass
+
+    def close(self):
+        pass
+
+
+class MarkdownWriter:
+    """
+    Streaming Markdown writer / ストリーミングMarkdownライター
+
+    Pages are written in the order of page_numbers even when they arrive out of order;
+    only pages waiting for an earlier page are held in memory.
+    ページが順不同で届いても page_numbers の順に書き出す。メモリに保持するのは
+    先行ページを待っているページのみ。
+    With index, a sidecar page index (see pageindex.py) is written on close, including
+    source page fingerprints and source details when given.
+    index を指定すると、閉じる時にサイドカーのページインデックス（pageindex.py参照）を
+    書き出す。fingerprints と source があれば元ページのフィンガープリントと生成情報も含める。
+    Writes (and compression, see open_output) run on a background thread into a partial
+    file that only takes the output name once complete. With overwrite it replaces an
+    existing output_path; otherwise a name taken in the meantime is never replaced and
+    the next free name is used instead (output_path is updated).
+    書き込み（と圧縮、open_output参照）はバックグラウンドスレッドで一時ファイルに行い、
+    完成してから出力名にする。overwrite を指定すると既存の output_path を置き換え、それ以外では
+    その間に使われた名前を置き換えずに次の空いている名前を使う（output_path を更新する）。
+    """
+
+    def __init__(self, output_path, page_numbers, title, page_range_str="",
+                 buffer_size=DEFAULT_BUFFER_SIZE, index=False, fingerprints=None, source=None,
+                 overwrite=False, compression=None):
+        if index and compression:
+            raise ValueError("a page index cannot be written for compressed output")
+        self.output_path = pathlib.Path(output_path)
+        self.compression = compression
+        self.pages_written = 0
+        self._expected = deque(page_numbers)
+        self._pending = {}
+        self._closed = False
+        self._offset = 0
+        self._index_entries = [] if index else None
+        self._fingerprints = fingerprints if fingerprints is not None else {}
+        self._source = source
+        self._overwrite = overwrite
+        self._write_path = self.output_path.with_name(self.output_path.name + PARTIAL_SUFFIX)
+        self._open(buffer_size)
+        self._write_header(document_header(title, page_range_str))
+
+    def _open(self, buffer_size):
+        # Binary, so offsets are exact and newlines are the same on every platform
+        # オフセットを正確にし、改行を全プラットフォームで同じにするためバイナリで開く
+        name = self.output_path.stem if self.compression else ""
+        self._file = open_output(self._write_path, self.compression, buffer_size, name)
+
+    def _write_header(self, header):
+        data = header.encode('utf-8')
+        self._file.write(data)
+        self._offset += len(data)
+
+    def _emit(self, page_num, content):
+        """Write one page in order / ページを1つ順番どおりに書き出す"""
+        data = content.encode('utf-8')
+        self._file.write(data)
+        if self._index_entries is not None:
+            self._index_entries.append((page_num, self._offset, len(data), page_hash(data)))
+        self._offset += len(data)
+
+    def write_page(self, page_num, content):
+        """Write a page, or hold it until earlier pages arrive / ページを書き出す（先行ページ待ちの場合は保持）"""
+        self._pending[page_num] = content
+        self._write_ready()
+
+    def skip_page(self, page_num):
+        """Mark a page that produced no output / 出力のないページを記録"""
+        self._pending[page_num] = None
+        self._write_ready()
+
+    def _write_ready(self):
+        """Write pages whose predecessors are done / 先行ページが完了したページを書き出す"""
+        while self._expected and self._expected[0] in self._pending:
+            page_num = self._expected.popleft()
+            content = self._pending.pop(page_num)
+            if content is not None:
+                self._emit(page_num, content)
+                self.pages_written += 1
+
+    def close(self):
+        """Write held pages and close the file / 保持中のページを書き出してファイルを閉じる"""
+        if self._closed:
+            return
+        self._closed = True
+        for page_num in sorted(self._pending, key=self._position):
+            content = self._pending[page_num]
+            if content is not None:
+                self._emit(page_num, content)
+                self.pages_written += 1
+        self._pending.clear()
+        self._finish()
+
+    def _finish(self):
+        self._file.close()
+        if self._overwrite:
+            os.replace(self._write_path, self.output_path)
+        else:
+            self._publish()
+            _output_names.release(self.output_path)
+        if self._index_entries is not None:
+            entries = [entry + (self._fingerprints[entry[0]],) if entry[0] in self._fingerprints else entry
+                       for entry in self._index_entries]
+            write_index(self.output_path, entries, self._offset, self._source)
+
+    def _publish(self):
+        """Give the finished file its name without replacing another file / 他のファイルを置き換えずに完成したファイルに名前を付ける"""
+        while True:
+            try:
+                # A hard link fails instead of replacing / ハードリンクは置き換えずに失敗する
+                os.link(self._write_path, self.output_path)
+            except FileExistsError:
+                pass
+            except OSError:
+                # No hard links on this file system / このファイルシステムではハードリンクを使えない
+                if not self.output_path.exists():
+                    os.replace(self._write_path, self.output_path)
+                    return
+            else:
+                os.remove(self._write_path)
+                return
+            next_path = _output_names.reallocate(self.output_path)
+            if next_path is None:
+                # A name chosen by the caller is replaced as before / 呼び出し側が決めた名前は従来どおり置き換える
+                os.replace(self._write_path, self.output_path)
+                return
+            self.output_path = next_path
+
+    def _position(self, page_num):
+        try:
+            return self._expected.index(page_num)
+        except ValueError:
+            return len(self._expected)
+
+    def discard(self):
+        """Close and delete the incomplete output / 不完全な出力を閉じて削除"""
+        self._pending.clear()
+        self._closed = True
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            os.remove(self._write_path)
+        except OSError:
+            pass
+
+
+def split_at_headings(content, max_bytes):
+    """
+    Split text at heading lines into UTF-8 pieces of at most max_bytes where possible
+    テキストを見出し行で分割し、可能な限り max_bytes 以下のUTF-8の断片にする
+    A section longer than max_bytes is kept whole / max_bytes より長いセクションは分割しない
+    """
+    pieces = []
+    current = b""
+    for section in HEADING_BOUNDARY.split(content):
+        data = section.encode('utf-8')
+        # Keep headings with the text that follows them / 見出しは後に続く本文と一緒にする
+        has_body = any(line.strip() and not line.startswith(b"#") for line in current.splitlines())
+        if has_body and len(current) + len(data) > max_bytes:
+            pieces.append(current)
+            current = b""
+        current += data
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class ShardedMarkdownWriter(MarkdownWriter):
+    """
+    Streaming Markdown writer that splits the output into shards / 出力をシャードに分割するストリーミングMarkdownライター
+
+    output_path is a directory of part-0001.md, part-0002.md, ... and a manifest.json
+    listing each shard's file, source page range and byte count. A new shard starts at
+    a page boundary once max_bytes or max_pages would be exceeded; a page larger than
+    max_bytes is split at its heading lines. The shards joined in order are identical
+    to the single-file output.
+    output_path は part-0001.md、part-0002.md … と、各シャードのファイル・元のページ範囲・
+    バイト数を記載した manifest.json を含むディレクトリ。max_bytes または max_pages を
+    超える場合はページ境界で新しいシャードを始め、max_bytes より大きいページは見出し行で
+    分割する。シャードを順に連結すると単一ファイルの出力と同一になる。
+    """
+
+    def __init__(self, output_path, page_numbers, title, page_range_str="",
+                 max_bytes=None, max_pages=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        if not max_bytes and not max_pages:
+            raise ValueError("a shard size or page count is required")
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.title = title
+        self.page_range_str = page_range_str
+        self.shards = []
+        self._header = b""
+        self._buffer_size = buffer_size
+        super().__init__(output_path, page_numbers, title, page_range_str, buffer_size)
+
+    @property
+    def manifest_path(self):
+        return self.output_path / MANIFEST_NAME
+
+    def _open(self, buffer_size):
+        self.output_path.mkdir(parents=True)
+        self._file = None
+
+    def _write_header(self, header):
+        # Goes at the start of the first shard / 最初のシャードの先頭に置く
+        self._header = header.encode('utf-8')
+
+    def _emit(self, page_num, content):
+        pieces = [content.encode('utf-8')]
+        if self.max_bytes and len(pieces[0]) > self.max_bytes:
+            pieces = split_at_headings(content, self.max_bytes)
+        for index, piece in enumerate(pieces):
+            if self._file is not None and self._shard_full(len(piece), index == 0):
+                self._close_shard()
+            if self._file is None:
+                self._open_shard(page_num)
+            shard = self.shards[-1]
+            if index == 0:
+                shard['pages'] += 1
+            shard['last_page'] = page_num
+            shard['bytes'] += len(piece)
+            self._file.write(piece)
+
+    def _shard_full(self, size, new_page):
+        shard = self.shards[-1]
+        if self.max_bytes and shard['bytes'] + size > self.max_bytes:
+            return True
+        return bool(new_page and self.max_pages and shard['pages'] >= self.max_pages)
+
+    def _open_shard(self, page_num):
+        name = f"part-{len(self.shards) + 1:04d}.md"
+        self._file = open_output(self.output_path / (name + PARTIAL_SUFFIX), buffer_size=self._buffer_size)
+        shard = {'file': name, 'first_page': page_num, 'last_page': page_num, 'pages': 0, 'bytes': 0}
+        self.shards.append(shard)
+        if len(self.shards) == 1:
+            self._file.write(self._header)
+            shard['bytes'] += len(self._header)
+
+    def _close_shard(self):
+        self._file.close()
+        self._file = None
+        # Shards appear under their name only once complete / シャードは完成してから名前を付ける
+        shard_path = self.output_path / self.shards[-1]['file']
+        os.replace(shard_path.with_name(shard_path.name + PARTIAL_SUFFIX), shard_path)
+
+    def _finish(self):
+        if self._file is not None:
+            self._close_shard()
+        manifest = {'title': self.title, 'page_range': self.page_range_str or None,
+                    'max_bytes': self.max_bytes, 'max_pages': self.max_pages,
+                    'pages_written': self.pages_written,
+                    'total_bytes': sum(shard['bytes'] for shard in self.shards),
+                    'shards': self.shards}
+        # Written last, so a manifest means the shards are complete / 最後に書き込むため、マニフェストがあればシャードは完成している
+        partial_path = self.manifest_path.with_name(MANIFEST_NAME + PARTIAL_SUFFIX)
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(partial_path, self.manifest_path)
+
+    def discard(self):
+        """Close and delete the incomplete shards / 不完全なシャードを閉じて削除"""
+        self._pending.clear()
+        self._closed = True
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        shutil.rmtree(self.output_path, ignore_errors=True)
@@ -0,0 +1,127 @@
+"""
+Sidecar page index for Markdown output / Markdown出力のサイドカーページインデックス
+Maps each page to its byte range in the .md file so pages can be read without scanning it
+各ページを .md ファイル内のバイト範囲に対応付け、ファイルを走査せずにページを読めるようにする
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+
+def index_path_for(output_path):
+    """Sidecar index path of a Markdown file / Markdownファイルのサイドカーインデックスのパス"""
+    output_path = pathlib.Path(output_path)
+    return output_path.with_name(output_path.name + INDEX_SUFFIX)
+
+
+def page_hash(data):
+    """Content hash of a page's bytes / ページのバイト列のハッシュ"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_index(output_path, entries, total_bytes, source=None):
+    """
+    Write the index of a finished Markdown file / 完成したMarkdownファイルのインデックスを書き出す
+
+    entries are (page_num, offset, length, hash) in file order, optionally followed by
+    the source page fingerprint; source describes how the pages were produced.
+    entries はファイル順の(ページ番号, オフセット, 長さ, ハッシュ)で、元ページの
+    フィンガープリントを続けてもよい。source はページの生成方法を記述する。
+    """
+    index = {'version': INDEX_VERSION, 'output': pathlib.Path(output_path).name,
+             'bytes': total_bytes, 'pages': [list(entry) for entry in entries]}
+    if source is not None:
+        index['source'] = source
+    # Replaced in one step so readers never see a partial index / 読み手が途中のインデックスを見ないよう一度に置き換える
+    index_path = index_path_for(output_path)
+    partial_path = index_path.with_name(index_path.name + ".partial")
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(partial_path, index_path)
+
+
+class PageReader:
+    """
+    Random access to pages of a Markdown file through its index / インデックスを使ったMarkdownファイルのページへのランダムアクセス
+
+    Only the requested bytes are read (or mapped with use_mmap). ValueError is
+    raised when the file size no longer matches the index.
+    要求されたバイトのみを読み込む（use_mmap ではマップする）。ファイルサイズが
+    インデックスと一致しなくなった場合は ValueError を発生させる。
+    """
+
+    def __init__(self, output_path, use_mmap=False):
+        self.output_path = pathlib.Path(output_path)
+        with open(index_path_for(self.output_path), encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f"unsupported page index version: {index.get('version')}")
+        self._entries = {row[0]: tuple(row[1:4]) for row in index['pages']}
+        self.fingerprints = {row[0]: row[4] for row in index['pages'] if len(row) > 4}
+        self.source = index.get('source') or {}
+        self._file = open(self.output_path, 'rb')
+        if os.fstat(self._file.fileno()).st_size != index['bytes']:
+            self._file.close()
+            raise ValueError(f"{self.output_path} has changed since it was indexed")
+        self._mmap = None
+        if use_mmap and index['bytes']:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def pages(self):
+        """Indexed page numbers in file order / ファイル順のインデックス済みページ番号"""
+        return list(self._entries)
+
+    def __contains__(self, page_num):
+        return page_num in self._entries
+
+    def _read(self, offset, length):
+        if self._mmap is not None:
+            return self._mmap[offset:offset + length]
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def read_bytes(self, page_num, verify=False):
+        """Raw bytes of a page / ページの生のバイト列"""
+        try:
+            offset, length, digest = self._entries[page_num]
+        except KeyError:
+            raise KeyError(f"page {page_num} is not in the index") from None
+        data = self._read(offset, length)
+        if verify and page_hash(data) != digest:
+            raise ValueError(f"page {page_num} does not match its hash")
+        return data
+
+    def read_page(self, page_num, verify=False):
+        """Markdown of a page / ページのMarkdown"""
+        return self.read_bytes(page_num, verify).decode('utf-8')
+
+    def read_range(self, first_page, last_page):
+        """
+        Markdown of the indexed pages from first_page to last_page in one read
+        first_page から last_page までのインデックス済みページのMarkdownを1回の読み込みで取得
+        """
+        selected = [entry for page_num, entry in self._entries.items() if first_page <= page_num <= last_page]
+        if not selected:
+            return ""
+        start = min(offset for offset, _length, _digest in selected)
+        end = max(offset + length for offset, length, _digest in selected)
+        return self._read(start, end - start).decode('utf-8')
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
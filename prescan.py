@@ -0,0 +1,202 @@
+"""
+Page pre-scan and lightweight extraction / ページの事前スキャンと軽量抽出
+Classifies pages from cheap PyMuPDF counts so only complex pages go through to_markdown
+安価なPyMuPDFの情報でページを分類し、複雑なページのみ to_markdown で変換する
+"""
+
+import collections
+import os
+import shutil
+
+# Page classes / ページの分類
+BLANK = "blank"
+IMAGE_ONLY = "image_only"
+SIMPLE = "simple"
+COMPLEX = "complex"
+CLASSES = (BLANK, IMAGE_ONLY, SIMPLE, COMPLEX)
+
+# Vector path items tolerated on a simple page (rules, underlines) / 単純なページで許容するベクターパスの要素数（罫線・下線）
+SIMPLE_MAX_DRAWING_ITEMS = 4
+
+# Text blocks above which a page is treated as complex / 複雑なページとみなすテキストブロック数の上限
+SIMPLE_MAX_BLOCKS = 200
+
+# Line starts that pymupdf4llm formats as lists / pymupdf4llm がリストとして整形する行頭
+LIST_MARKERS = ("•", "◦", "▪", "‣", "-", "*", "–")
+
+# Gap between spans, in font sizes, that separates columns / 列を区切るとみなすスパン間の空き（フォントサイズ単位）
+COLUMN_GAP_RATIO = 3
+
+# Span flags / スパンのフラグ
+FLAG_ITALIC = 2
+FLAG_MONOSPACE = 8
+FLAG_BOLD = 16
+
+# Size ratio to body text treated as a heading / 本文に対して見出しとみなすサイズ比
+HEADING_SIZE_RATIO = 1.15
+
+# Words in a short one-line block treated as a heading / 見出しとみなす1行の短いブロックの単語数
+HEADING_MAX_WORDS = 10
+
+
+def ocr_available():
+    """Whether to_markdown can OCR image-only pages / to_markdown が画像のみのページをOCRできるか"""
+    return shutil.which("tesseract") is not None or bool(os.environ.get("TESSDATA_PREFIX"))
+
+
+def _text_blocks(page):
+    """Text blocks with their lines / 行を含むテキストブロック"""
+    return [block for block in page.get_text("dict")["blocks"]
+            if block.get("type") == 0 and any(span["text"].strip()
+                                               for line in block["lines"] for span in line["spans"])]
+
+
+def _is_multi_column(blocks):
+    """Whether any two text lines sit side by side / 横に並んだテキスト行があるか"""
+    boxes = sorted((line["bbox"] for block in blocks for line in block["lines"]
+                    if any(span["text"].strip() for span in line["spans"])), key=lambda box: box[1])
+    for i, (ax0, ay0, ax1, ay1) in enumerate(boxes):
+        for bx0, by0, bx1, by1 in boxes[i + 1:]:
+            if by0 >= ay1:
+                break
+            overlap = min(ay1, by1) - by0
+            if overlap > 0.5 * min(ay1 - ay0, by1 - by0) and (ax1 <= bx0 or bx1 <= ax0):
+                return True
+    return False
+
+
+def _has_structure(blocks):
+    """Whether blocks contain lists, code or gapped columns / ブロックにリスト・コード・空白で区切った列が含まれるか"""
+    for block in blocks:
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            if spans[0]["text"].lstrip().startswith(LIST_MARKERS):
+                return True
+            if any(span["flags"] & FLAG_MONOSPACE for span in spans):
+                return True
+            for left, right in zip(spans, spans[1:]):
+                if right["bbox"][0] - left["bbox"][2] > COLUMN_GAP_RATIO * left["size"]:
+                    return True
+    return False
+
+
+def classify_page(page, use_ocr=None, text_only=False):
+    """
+    Classify a page / ページを分類
+    With text_only, every page with text is simple / text_only の場合、テキストのあるページはすべて単純
+    """
+    if use_ocr is None:
+        use_ocr = ocr_available()
+    blocks = _text_blocks(page)
+    images = page.get_images()
+    if text_only:
+        if blocks:
+            return SIMPLE
+        return IMAGE_ONLY if images else BLANK
+    drawings = page.get_cdrawings() if hasattr(page, "get_cdrawings") else page.get_drawings()
+    # One path can hold thousands of lines / 1つのパスに数千本の線が含まれることがある
+    drawing_items = sum(len(path.get("items", ())) for path in drawings)
+
+    if not blocks:
+        if images:
+            # Without OCR, to_markdown finds no text either / OCRなしでは to_markdown もテキストを得られない
+            return COMPLEX if use_ocr else IMAGE_ONLY
+        return BLANK if not drawings else COMPLEX
+    if images or drawing_items > SIMPLE_MAX_DRAWING_ITEMS or len(blocks) > SIMPLE_MAX_BLOCKS:
+        return COMPLEX
+    if _is_multi_column(blocks) or _has_structure(blocks):
+        return COMPLEX
+    return SIMPLE
+
+
+def classify_pages(doc, page_numbers, text_only=False):
+    """Classify 1-based pages / 1始まりのページを分類"""
+    use_ocr = ocr_available() and not text_only
+    return {page_num: classify_page(doc[page_num - 1], use_ocr, text_only) for page_num in page_numbers}
+
+
+def summary_text(plan):
+    """Format the split for the log / ログ用に分類結果を整形"""
+    counts = collections.Counter(plan.values())
+    return ", ".join(f"{counts[page_class]} {page_class}" for page_class in CLASSES)
+
+
+def _format_span(span):
+    text = span["text"]
+    stripped = text.strip()
+    if not stripped:
+        return text
+    if span["flags"] & FLAG_BOLD:
+        stripped = f"**{stripped}**"
+    elif span["flags"] & FLAG_ITALIC:
+        stripped = f"_{stripped}_"
+    # Keep surrounding spaces outside the markers / 前後の空白はマーカーの外に残す
+    return text[:len(text) - len(text.lstrip())] + stripped + text[len(text.rstrip()):]
+
+
+def _heading_prefix(span, heading_levels, hdr_info, page):
+    if hdr_info is not None:
+        try:
+            return hdr_info.get_header_id(span, page=page)
+        except Exception:
+            pass
+    # Same rounding as the sizes the levels were built from / レベルの元になったサイズと同じ丸め
+    level = heading_levels.get(round(span["size"], 1))
+    return "#" * level + " " if level else ""
+
+
+def _looks_like_heading(lines):
+    text = lines[0].strip("*_ ")
+    if len(lines) != 1 or not 0 < len(text.split()) <= HEADING_MAX_WORDS:
+        return False
+    return (text[0].isupper() or text[0].isdigit()) and not text.endswith((".", ",", ";", ":"))
+
+
+def extract_simple(page, page_class, hdr_info=None):
+    """
+    Lightweight Markdown for a page that is not complex / 複雑でないページの軽量なMarkdown
+
+    Blocks become paragraphs, larger text becomes headings and bold or italic spans
+    are marked; blank and image-only pages give no text.
+    ブロックは段落に、大きな文字は見出しになり、太字・斜体のスパンは強調される。
+    空白ページと画像のみのページはテキストなし。
+    """
+    if page_class in (BLANK, IMAGE_ONLY):
+        return ""
+
+    blocks = _text_blocks(page)
+    if not blocks:
+        return ""
+    sizes = collections.Counter()
+    for block in blocks:
+        for line in block["lines"]:
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    body_size = sizes.most_common(1)[0][0]
+    heading_sizes = sorted((size for size in sizes if size >= body_size * HEADING_SIZE_RATIO), reverse=True)
+    heading_levels = {size: min(index + 1, 6) for index, size in enumerate(heading_sizes)}
+
+    paragraphs = []
+    for index, block in enumerate(blocks):
+        lines = []
+        prefix = None
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"]]
+            if not spans:
+                continue
+            if prefix is None:
+                prefix = _heading_prefix(spans[0], heading_levels, hdr_info, page)
+            text = "".join(_format_span(span) for span in spans).strip()
+            if text:
+                lines.append(text)
+        if not lines:
+            continue
+        text = " ".join(lines)
+        if not prefix and index < len(blocks) - 1 and _looks_like_heading(lines):
+            # Short title line at body size, as the layout model tags it / レイアウトモデルと同様に本文サイズの短い表題行
+            prefix = "#" * min(len(heading_sizes) + 1, 6) + " "
+        # Same paragraph ending as to_markdown / to_markdown と同じ段落の終わり方
+        paragraphs.append((prefix or "") + text + " \n\n")
+    return "".join(paragraphs)
@@ -0,0 +1,34 @@
+"""
+Conversion presets / 変換プリセット
+Named trade-offs between throughput and fidelity, shared by the GUI, CLI and service
+GUI・CLI・サービスで共有する、処理速度と忠実度のトレードオフに付けた名前
+"""
+
+# Presets / プリセット
+FAST_TEXT = "fast_text"
+BALANCED = "balanced"
+FULL_FIDELITY = "full_fidelity"
+PRESETS = (FAST_TEXT, BALANCED, FULL_FIDELITY)
+DEFAULT_PRESET = BALANCED
+
+# How pages are routed / ページの振り分け方
+ROUTE_TEXT = "text"        # Every page through the lightweight extractor, no OCR / 全ページを軽量抽出で変換（OCRなし）
+ROUTE_PRESCAN = "prescan"  # Only complex pages through to_markdown / 複雑なページのみ to_markdown で変換
+ROUTE_FULL = "full"        # Every page through to_markdown / 全ページを to_markdown で変換
+
+# fast_text skips table detection, layout analysis, graphics and OCR entirely; balanced
+# runs them only on pages that need them; full_fidelity runs them on every page.
+# fast_text は表検出・レイアウト解析・図形・OCRをすべて省略し、balanced は必要なページ
+# のみで実行し、full_fidelity は全ページで実行する。
+ROUTES = {FAST_TEXT: ROUTE_TEXT, BALANCED: ROUTE_PRESCAN, FULL_FIDELITY: ROUTE_FULL}
+
+
+def preset_route(preset):
+    """
+    Page routing of a preset / プリセットのページの振り分け方
+    Raises ValueError for an unknown preset / 不明なプリセットには ValueError を発生させる
+    """
+    try:
+        return ROUTES[preset]
+    except KeyError:
+        raise ValueError(f"unknown preset: {preset} (choose from {', '.join(PRESETS)})") from None
@@ -0,0 +1,207 @@
+"""
+Conversion timing and profiling / 変換の計測とプロファイリング
+Records per-page and per-document stage timings and exports them as JSON Lines or CSV
+ページ毎・文書毎の段階別時間を記録し、JSON LinesまたはCSVで出力する
+"""
+
+import contextlib
+import cProfile
+import csv
+import json
+import pathlib
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows / Windowsでは利用不可
+    resource = None
+
+# Columns shared by page and document records / ページと文書のレコードで共通の列
+FIELDS = ('type', 'file', 'page', 'open_s', 'to_markdown_s', 'write_s', 'elapsed_s',
+          'bytes_out', 'peak_rss')
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+def peak_rss():
+    """Get peak resident set size of this process in bytes, or None / このプロセスの最大常駐メモリ（バイト、取得できなければNone）"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes / Linuxはキロバイト、macOSはバイトで返す
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss)
+
+
+class DocumentProfile:
+    """
+    Stage timings of one document conversion / 1文書の変換の段階別時間
+
+    to_markdown time is measured per call and split evenly across the pages of the
+    batch, so pages converted together share their cost. Peak RSS is that of the
+    converting process; worker processes are not included.
+    to_markdown の時間は呼び出し毎に計測してバッチ内のページに均等に配分するため、
+    一緒に変換されたページはコストを共有する。最大RSSは変換を行うプロセスのもので、
+    ワーカープロセスは含まない。
+    """
+
+    def __init__(self, pdf_path):
+        self.pdf_path = str(pdf_path)
+        self.pages = {}
+        self.open_s = 0.0
+        self.elapsed_s = None
+        self._start = time.perf_counter()
+
+    def _page(self, page_num):
+        record = self.pages.get(page_num)
+        if record is None:
+            record = {'type': 'page', 'file': self.pdf_path, 'page': page_num,
+                      'to_markdown_s': 0.0, 'write_s': 0.0}
+            self.pages[page_num] = record
+        return record
+
+    @contextlib.contextmanager
+    def opening(self):
+        """Time opening the PDF / PDFを開く時間を計測"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.open_s += time.perf_counter() - start
+
+    def record_batch(self, page_numbers, seconds):
+        """Record one to_markdown call / to_markdown 1回の呼び出しを記録"""
+        page_numbers = list(page_numbers)
+        for page_num in page_numbers:
+            self._page(page_num)['to_markdown_s'] += seconds / len(page_numbers)
+
+    def record_write(self, page_num, content, seconds):
+        """Record writing a page to the output / ページの出力への書き込みを記録"""
+        record = self._page(page_num)
+        record['write_s'] += seconds
+        record['bytes_out'] = len(content.encode('utf-8'))
+        record['elapsed_s'] = time.perf_counter() - self._start
+        record['peak_rss'] = peak_rss()
+
+    def wrap(self, sink):
+        """Wrap a sink to time its writes / 書き込みを計測するよう sink をラップ"""
+        return ProfilingSink(sink, self)
+
+    def finish(self):
+        """Stop the document clock / 文書の計測を終了"""
+        self.elapsed_s = time.perf_counter() - self._start
+
+    def document_record(self):
+        """Totals for the document / 文書全体の合計"""
+        pages = self.pages.values()
+        return {'type': 'document', 'file': self.pdf_path, 'page': len(self.pages),
+                'open_s': self.open_s,
+                'to_markdown_s': sum(record['to_markdown_s'] for record in pages),
+                'write_s': sum(record['write_s'] for record in pages),
+                'elapsed_s': self.elapsed_s if self.elapsed_s is not None else time.perf_counter() - self._start,
+                'bytes_out': sum(record.get('bytes_out', 0) for record in pages),
+                'peak_rss': peak_rss()}
+
+    def records(self):
+        """Page records in page order followed by the document record / ページ順のページレコードと文書レコード"""
+        return [self.pages[page_num] for page_num in sorted(self.pages)] + [self.document_record()]
+
+    def slowest_pages(self, count=3):
+        """Pages with the longest conversion time / 変換時間が最も長いページ"""
+        return sorted(self.pages.values(), key=lambda record: record['to_markdown_s'], reverse=True)[:count]
+
+    def summary_text(self):
+        """Format totals for the log / ログ用に合計を整形"""
+        totals = self.document_record()
+        text = (f"open {totals['open_s']:.2f}s, to_markdown {totals['to_markdown_s']:.2f}s, "
+                f"write {totals['write_s']:.2f}s, total {totals['elapsed_s']:.2f}s, "
+                f"{totals['bytes_out'] / 1024:.0f} KB")
+        if totals['peak_rss']:
+            text += f", peak RSS {totals['peak_rss'] / 1048576:.0f} MB"
+        slowest = [f"{record['page']} ({record['to_markdown_s']:.2f}s)" for record in self.slowest_pages()
+                   if record['to_markdown_s'] > 0]
+        if slowest:
+            text += f"; slowest pages: {', '.join(slowest)}"
+        return text
+
+
+class ProfilingSink:
+    """Forward pages to a sink and time the writes / ページを sink に渡して書き込み時間を計測"""
+
+    def __init__(self, sink, profile):
+        self.sink = sink
+        self.profile = profile
+
+    @property
+    def pages_written(self):
+        return self.sink.pages_written
+
+    def write_page(self, page_num, content):
+        start = time.perf_counter()
+        self.sink.write_page(page_num, content)
+        self.profile.record_write(page_num, content, time.perf_counter() - start)
+
+    def skip_page(self, page_num):
+        self.sink.skip_page(page_num)
+
+    def close(self):
+        self.sink.close()
+
+
+def export_profiles(profiles, output_path):
+    """
+    Write records of documents as CSV (.csv) or JSON Lines (anything else)
+    文書のレコードをCSV（.csv）またはJSON Lines（それ以外）で書き出す
+    """
+    records = [record for profile in profiles for record in profile.records()]
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        if pathlib.Path(output_path).suffix.lower() == '.csv':
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+@contextlib.contextmanager
+def profiler_hook(kind, output_path):
+    """
+    Run the enclosed code under cProfile or pyinstrument and save the result
+    囲んだコードを cProfile または pyinstrument で実行して結果を保存
+
+    cProfile writes pstats data; pyinstrument (optional dependency) writes HTML.
+    cProfile は pstats 形式、pyinstrument（任意の依存関係）はHTMLを書き出す。
+    """
+    if kind is None:
+        yield
+        return
+    if kind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output_path)
+    elif kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("pyinstrument is not installed (pip install pyinstrument)")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+    else:
+        raise ValueError(f"Unknown profiler: {kind}")
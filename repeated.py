@@ -0,0 +1,214 @@
+"""
+Repeated header and footer removal / 繰り返されるヘッダー・フッターの除去
+Finds running headers, footers and page numbers once per document from a sample of
+pages and strips them from each converted page without converting it again
+ページのサンプルから文書毎に一度だけ柱・フッター・ページ番号を見つけ、変換済みの
+各ページから再変換せずに除去する
+"""
+
+import collections
+import hashlib
+import re
+
+from conversion import page_header
+
+# Pages sampled, spread evenly over the document / 文書全体から均等に抽出するページ数
+SAMPLE_PAGES = 30
+
+# Share of the page height at the top and bottom searched for headers and footers
+# ヘッダー・フッターを探すページ上端・下端の高さの割合
+EDGE_BAND = 0.12
+
+# Vertical position buckets per page; a region must recur at the same position
+# ページ毎の縦位置の区分数。領域は同じ位置で繰り返される必要がある
+POSITION_BUCKETS = 40
+
+# Share of the sampled pages (and at least MIN_PAGES) a region must appear on
+# 領域が現れる必要のあるサンプルページの割合（かつ MIN_PAGES 以上）
+MIN_SHARE = 0.4
+MIN_PAGES = 3
+
+# Lines examined at each end of a page's Markdown / ページのMarkdownの両端で調べる行数
+MAX_EDGE_LINES = 4
+
+# Header and footer bands / ヘッダー・フッターの帯
+TOP = "top"
+BOTTOM = "bottom"
+
+# Markdown markup ignored when comparing / 比較時に無視するMarkdownの記法
+MARKUP = re.compile(r"[#*_`>|\\]")
+DIGITS = re.compile(r"\d+")
+
+# Page numbers, whose digits are ignored when comparing as they differ on every page:
+# "Page 3", "p. 3", "3 of 40", "3 / 40", "3ページ", "第3頁", or a line that is only a number.
+# Other numbers, such as in "Section 3", are compared as they are.
+# ページ毎に異なるため比較時に数字を無視するページ番号。"Page 3"、"p. 3"、"3 of 40"、"3 / 40"、
+# "3ページ"、"第3頁"、または数字のみの行。"Section 3" などのその他の数字はそのまま比較する。
+PAGE_NUMBER = re.compile(r"\b(?:page|pg|p)\.?\s*\d+|\d+\s*(?:of|/|／)\s*\d+|第?\s*\d+\s*(?:ページ|頁)",
+                         re.IGNORECASE)
+LONE_NUMBER = re.compile(r"^[\W_]*\d+[\W_]*$")
+
+
+def _fold_page_numbers(text):
+    """Text with the digits of page numbers replaced by 0 / ページ番号の数字を0に置き換えたテキスト"""
+    if LONE_NUMBER.match(text):
+        return DIGITS.sub("0", text)
+    return PAGE_NUMBER.sub(lambda match: DIGITS.sub("0", match.group()), text)
+
+
+def text_key(text):
+    """Hash of text with markup, page numbers, case and spacing normalised / 記法・ページ番号・大文字小文字・空白を正規化したテキストのハッシュ"""
+    text = _fold_page_numbers(" ".join(MARKUP.sub(" ", text).split()))
+    text = text.lower()
+    if not text:
+        return None
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _sample(total_pages, count=SAMPLE_PAGES):
+    """0-based pages spread evenly over the document / 文書全体に均等に散らばった0始まりのページ"""
+    if total_pages <= count:
+        return list(range(total_pages))
+    return sorted({round(i * (total_pages - 1) / (count - 1)) for i in range(count)})
+
+
+def _edge_regions(page):
+    """(band, position, text key) of the text blocks near the top and bottom / 上端・下端付近のテキストブロックの(帯, 位置, テキストのキー)"""
+    height = page.rect.height or 1
+    regions = set()
+    for x0, y0, x1, y1, text, _block_no, block_type in page.get_text("blocks"):
+        if block_type != 0:
+            continue
+        if y1 <= height * EDGE_BAND:
+            band = TOP
+        elif y0 >= height * (1 - EDGE_BAND):
+            band = BOTTOM
+        else:
+            continue
+        position = int(y0 / height * POSITION_BUCKETS)
+        lines = [line for line in text.splitlines() if line.strip()]
+        # The whole block and each line, as converters join lines differently / 変換器により行の結合が異なるためブロック全体と各行
+        for candidate in [" ".join(lines)] + lines:
+            key = text_key(candidate)
+            if key:
+                regions.add((band, position, key))
+    return regions
+
+
+class RepeatedRegions:
+    """
+    Index of recurring header and footer text of a document / 文書の繰り返されるヘッダー・フッターのテキストの索引
+
+    A text block near the top or bottom of a page is a header or footer when the same
+    text (ignoring the digits of page numbers) sits at the same position on enough of
+    the sampled pages. A line of a page's Markdown is removed only when that page has
+    the recurring text at the recurring position (see page_keys), and only from the
+    first and last lines, so body text is never touched.
+    ページの上端・下端付近のテキストブロックは、同じテキスト（ページ番号の数字は無視）が十分な
+    数のサンプルページの同じ位置にあればヘッダー・フッターとみなす。ページのMarkdownの行は、
+    そのページの繰り返される位置に繰り返されるテキストがある場合にのみ（page_keys参照）、
+    先頭と末尾の行からのみ除去し、本文には触れない。
+    """
+
+    def __init__(self):
+        self.sampled = 0
+        self.regions = 0
+        self.lines_removed = 0
+        self.pages_changed = 0
+        self._recurring = set()
+
+    def detect(self, doc):
+        """Build the index from a sample of the document's pages / 文書のページのサンプルから索引を作成"""
+        counts = collections.Counter()
+        pages = _sample(len(doc))
+        for page_index in pages:
+            counts.update(_edge_regions(doc[page_index]))
+        self.sampled = len(pages)
+        needed = max(MIN_PAGES, MIN_SHARE * self.sampled)
+        self._recurring = {region for region, count in counts.items() if count >= needed}
+        self.regions = len({(band, key) for band, _position, key in self._recurring})
+
+    def page_keys(self, page):
+        """
+        Text keys of the recurring regions present on a page, by band
+        ページにある繰り返される領域のテキストのキー（帯毎）
+        A neighbouring position bucket also matches, for text sitting on a bucket edge.
+        区分の境界にあるテキストのため、隣の位置の区分も一致とみなす。
+        """
+        keys = {TOP: set(), BOTTOM: set()}
+        if not self._recurring:
+            return keys
+        for band, position, key in _edge_regions(page):
+            if any((band, near, key) in self._recurring for near in (position - 1, position, position + 1)):
+                keys[band].add(key)
+        return keys
+
+    def _strip_edge(self, lines, keys):
+        """Remove lines with the given keys from the start of lines / lines の先頭から指定したキーの行を除去"""
+        removed = 0
+        while lines and removed < MAX_EDGE_LINES:
+            if not lines[0].strip():
+                lines.pop(0)
+                continue
+            if text_key(lines[0]) not in keys:
+                break
+            lines.pop(0)
+            removed += 1
+        return removed
+
+    def strip(self, text, keys):
+        """
+        Text without its recurring header and footer lines / 繰り返されるヘッダー・フッター行を除いたテキスト
+        keys are the page's keys from page_keys / keys は page_keys で得たページのキー
+        """
+        if not (keys[TOP] or keys[BOTTOM]) or not text.strip():
+            return text
+        lines = text.split("\n")
+        removed = self._strip_edge(lines, keys[TOP])
+        lines.reverse()
+        removed += self._strip_edge(lines, keys[BOTTOM])
+        lines.reverse()
+        if not removed:
+            return text
+        self.lines_removed += removed
+        self.pages_changed += 1
+        text = "\n".join(lines)
+        return text + "\n\n" if text else ""
+
+    def wrap(self, sink, doc, add_page_headers=True, separator="\n\n"):
+        """Wrap a sink to strip each page of doc before writing it / 書き込む前に doc の各ページを除去処理するよう sink をラップ"""
+        return RepeatedRegionSink(sink, self, doc, add_page_headers, separator)
+
+    def summary_text(self):
+        """Format the removal counts for the log / ログ用に除去した数を整形"""
+        return (f"{self.regions} recurring header/footer texts in {self.sampled} sampled pages, "
+                f"{self.lines_removed} lines removed from {self.pages_changed} pages")
+
+
+class RepeatedRegionSink:
+    """Forward pages to a sink with headers and footers removed / ヘッダー・フッターを除去してページを sink に渡す"""
+
+    def __init__(self, sink, regions, doc, add_page_headers, separator):
+        self.sink = sink
+        self.regions = regions
+        self.doc = doc
+        self.add_page_headers = add_page_headers
+        self.separator = separator
+
+    @property
+    def pages_written(self):
+        return self.sink.pages_written
+
+    def write_page(self, page_num, content):
+        # The page header is ours, not the document's / ページヘッダーは文書のものではない
+        header = page_header(page_num, self.add_page_headers, self.separator)
+        if self.regions.regions and content.startswith(header):
+            keys = self.regions.page_keys(self.doc[page_num - 1])
+            content = header + self.regions.strip(content[len(header):], keys)
+        self.sink.write_page(page_num, content)
+
+    def skip_page(self, page_num):
+        self.sink.skip_page(page_num)
+
+    def close(self):
+        self.sink.close()
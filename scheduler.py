@@ -0,0 +1,200 @@
+"""
+Document job queue and scheduler / 文書ジョブキューとスケジューラー
+Runs queued PDF conversions with a bounded number of concurrent documents
+同時に処理する文書数を制限してキュー内のPDF変換を実行する
+"""
+
+import itertools
+import threading
+
+# Scheduling policies / スケジューリングポリシー
+POLICY_FIFO = "fifo"
+POLICY_LARGEST_FIRST = "largest_first"
+POLICY_SHORTEST_FIRST = "shortest_first"
+POLICIES = (POLICY_FIFO, POLICY_LARGEST_FIRST, POLICY_SHORTEST_FIRST)
+
+# Job states / ジョブの状態
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def count_pages(pdf_path):
+    """Count pages, or None if the PDF cannot be opened / ページ数を数える（開けない場合はNone）"""
+    # Imported here so the GUI can create a scheduler before the engine is loaded
+    # エンジンの読み込み前にGUIがスケジューラーを作成できるようここでインポート
+    import pymupdf
+
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            return len(doc)
+    except Exception:
+        return None
+
+
+class Job:
+    """A single document conversion / 1文書の変換"""
+
+    def __init__(self, job_id, pdf_path, page_count):
+        self.job_id = job_id
+        self.pdf_path = pdf_path
+        self.page_count = page_count
+        # Whether page_count is known or was tried / page_count が判明済みか、数えようとしたか
+        self.counted = page_count is not None
+        self.state = QUEUED
+        self.progress = 0.0
+        self.output_path = None
+        self.error = None
+
+
+class JobScheduler:
+    """
+    Run queued jobs on threads, picking the next job by policy
+    ポリシーに従って次のジョブを選び、キュー内のジョブをスレッドで実行
+
+    run_job(job) returns the output path or raises; on_change(job) is called on every
+    state change and on_idle() when the queue has drained. count_job(job) returns the
+    page count of a queued job (default: count_pages); a policy other than FIFO calls it
+    for uncounted jobs before picking, only while no job is running, so it never opens
+    a document alongside a conversion. All callbacks run on scheduler threads.
+    run_job(job) は出力パスを返すか例外を発生させる。on_change(job) は状態変化毎に、
+    on_idle() はキューが空になった時に呼ばれる。count_job(job) は待機中のジョブのページ数を
+    返す（既定: count_pages）。FIFO 以外のポリシーは選択前に未計数のジョブについて、
+    実行中のジョブがない時にのみ呼び出すため、変換と同時に文書を開くことはない。
+    コールバックはすべてスケジューラーのスレッドで実行される。
+    """
+
+    def __init__(self, run_job, max_concurrent=1, policy=POLICY_FIFO, on_change=None, on_idle=None,
+                 count_job=None):
+        self.run_job = run_job
+        self.max_concurrent = max_concurrent
+        self.policy = policy
+        self.on_change = on_change
+        self.on_idle = on_idle
+        self.count_job = count_job or (lambda job: count_pages(job.pdf_path))
+        self.jobs = []
+        self.active = False
+        self._counting = False
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def add(self, pdf_path, page_count=None):
+        """Queue a PDF without opening it / PDFを開かずにキューに追加"""
+        with self._lock:
+            job = Job(next(self._ids), pdf_path, page_count)
+            self.jobs.append(job)
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def queued_paths(self):
+        """Paths of jobs still waiting / 待機中のジョブのパス"""
+        with self._lock:
+            return {job.pdf_path for job in self.jobs if job.state == QUEUED}
+
+    def has_queued(self):
+        with self._lock:
+            return any(job.state == QUEUED for job in self.jobs)
+
+    def start(self, max_concurrent=None, policy=None):
+        """Start running queued jobs / キュー内のジョブの実行を開始"""
+        with self._lock:
+            if max_concurrent is not None:
+                self.max_concurrent = max(1, max_concurrent)
+            if policy is not None:
+                self.policy = policy
+            self.active = True
+        self._dispatch()
+
+    def cancel(self):
+        """Cancel jobs still waiting in the queue / キューで待機中のジョブをキャンセル"""
+        with self._lock:
+            cancelled = [job for job in self.jobs if job.state == QUEUED]
+            for job in cancelled:
+                job.state = CANCELLED
+        for job in cancelled:
+            self._notify(job)
+        self._dispatch()
+
+    def remove_finished(self):
+        """Forget jobs that are no longer queued or running / 待機中・実行中でないジョブを削除"""
+        with self._lock:
+            removed = [job for job in self.jobs if job.state not in (QUEUED, RUNNING)]
+            self.jobs = [job for job in self.jobs if job.state in (QUEUED, RUNNING)]
+        return removed
+
+    def _next_job(self):
+        """Pick the next queued job by policy / ポリシーに従って次の待機ジョブを選択"""
+        queued = [job for job in self.jobs if job.state == QUEUED]
+        if not queued:
+            return None
+        if self.policy == POLICY_LARGEST_FIRST:
+            return max(queued, key=lambda job: job.page_count or 0)
+        if self.policy == POLICY_SHORTEST_FIRST:
+            return min(queued, key=lambda job: job.page_count or 0)
+        return queued[0]
+
+    def _dispatch(self):
+        """Start jobs while slots are free / 空きがある限りジョブを開始"""
+        started = []
+        idle = False
+        with self._lock:
+            if not self.active or self._counting:
+                return
+            running = sum(1 for job in self.jobs if job.state == RUNNING)
+            if (running == 0 and self.policy != POLICY_FIFO
+                    and any(job.state == QUEUED and not job.counted for job in self.jobs)):
+                self._counting = True
+                threading.Thread(target=self._count, daemon=True).start()
+                return
+            while running < self.max_concurrent:
+                job = self._next_job()
+                if job is None:
+                    break
+                job.state = RUNNING
+                running += 1
+                started.append(job)
+            if running == 0:
+                self.active = False
+                idle = True
+
+        for job in started:
+            self._notify(job)
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        if idle and self.on_idle:
+            self.on_idle()
+
+    def _count(self):
+        """Count queued jobs so the policy can compare them / ポリシーで比較できるよう待機中のジョブを数える"""
+        try:
+            with self._lock:
+                uncounted = [job for job in self.jobs if job.state == QUEUED and not job.counted]
+            for job in uncounted:
+                job.page_count = self.count_job(job)
+                job.counted = True
+                self._notify(job)
+        finally:
+            with self._lock:
+                self._counting = False
+        self._dispatch()
+
+    def _run(self, job):
+        """Run a job on its own thread / ジョブを専用スレッドで実行"""
+        from conversion import ConversionCancelled
+
+        try:
+            job.output_path = self.run_job(job)
+            job.state = DONE
+        except ConversionCancelled:
+            job.state = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.state = FAILED
+        self._notify(job)
+        self._dispatch()
+
+    def _notify(self, job):
+        if self.on_change:
+            self.on_change(job)
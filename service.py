@@ -0,0 +1,445 @@
+"""
+PDF to Markdown conversion service / PDFからMarkdownへの変換サービス
+Long-running local HTTP server that converts PDFs on a warm pool of worker processes
+常駐するワーカープロセスのプールでPDFを変換する、ローカルで動き続けるHTTPサーバー
+
+Usage / 使い方: python service.py [--port 8765] [--workers N]
+
+    curl --data-binary @doc.pdf "http://127.0.0.1:8765/convert?pages=1-5&page_headers=0&preset=fast_text&strip_repeated=1"
+    curl -d '{"path": "/abs/doc.pdf"}' -H "Content-Type: application/json" http://127.0.0.1:8765/convert
+
+Each page is streamed back as a JSON line in page order, followed by a status line.
+各ページをページ順にJSONの1行として返し、最後に状態の行を返す。
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from presets import DEFAULT_PRESET, FULL_FIDELITY, preset_route
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests waiting for a worker before new ones are refused / 新しいリクエストを拒否するまでにワーカーを待てるリクエスト数
+DEFAULT_QUEUE_SIZE = 8
+
+# Largest accepted upload / 受け付けるアップロードの上限
+DEFAULT_MAX_UPLOAD_MB = 256
+
+# Seconds clients are asked to wait when the queue is full / キューが満杯の時にクライアントに待機を求める秒数
+RETRY_AFTER = 1
+
+EXIT_OK = 0
+EXIT_USAGE = 2
+
+
+class ServiceBusy(Exception):
+    """Raised when every worker is busy and the queue is full / 全ワーカーが使用中でキューも満杯の時に発生"""
+
+
+class WorkerFailed(Exception):
+    """Raised when a worker process dies during a request / リクエスト中にワーカープロセスが終了した時に発生"""
+
+
+class PipeSink:
+    """Send converted pages to the service process / 変換済みページをサービスプロセスに送る"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pages_written = 0
+
+    def write_page(self, page_num, content):
+        self.conn.send(('page', page_num, content))
+        self.pages_written += 1
+
+    def skip_page(self, page_num):
+        pass
+
+    def close(self):
+        pass
+
+
+def _run_job(conn, job):
+    """Convert one request in a worker / ワーカーで1つのリクエストを変換"""
+    import conversion
+    from session import DocumentSession
+
+    try:
+        session = DocumentSession(job['path'])
+    except Exception as e:
+        conn.send(('invalid', f"cannot open PDF: {e}"))
+        return
+    with session:
+        try:
+            if session.page_count == 0:
+                raise ValueError("the PDF contains no pages")
+            page_numbers = conversion.parse_page_range(job['pages'], session.page_count)
+            preset_route(job['preset'])
+        except ValueError as e:
+            conn.send(('invalid', str(e)))
+            return
+        conn.send(('start', len(page_numbers)))
+        sink = PipeSink(conn)
+        repeated = None
+        if job['strip_repeated']:
+            from repeated import RepeatedRegions
+            repeated = RepeatedRegions()
+        try:
+            conversion.convert_file(job['path'], page_numbers, add_page_headers=job['add_page_headers'],
+                                    on_error=lambda page_num, error: conn.send(('error', page_num, str(error))),
+                                    sink=sink, session=session, preset=job['preset'], repeated=repeated)
+        except Exception as e:
+            conn.send(('failed', str(e)))
+            return
+        conn.send(('done', sink.pages_written))
+
+
+def _worker_main(conn):
+    """Import the conversion engine once, then serve requests / 変換エンジンを一度だけインポートしてリクエストを処理"""
+    import conversion  # noqa: F401  (warm import / 事前インポート)
+
+    conn.send(('ready',))
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        _run_job(conn, job)
+
+
+class _Worker:
+    """One warm worker process / 常駐ワーカープロセス1つ"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self):
+        self.receive()
+
+    def receive(self):
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            raise WorkerFailed("worker process terminated unexpectedly")
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Warm worker processes with a bounded wait queue / 待機キューに上限のある常駐ワーカープロセス
+
+    Each worker imports the conversion engine once and converts one request at a
+    time. A request first takes a place with reserve(), which raises ServiceBusy
+    when queue_size requests already wait for a free worker, and only then reads its
+    upload and waits in worker(). A worker that fails or whose client goes away
+    mid-request is killed and replaced, which also stops the abandoned conversion;
+    if the replacement cannot start, its slot stays empty until a later request
+    starts one.
+    各ワーカーは変換エンジンを一度だけインポートし、一度に1つのリクエストを変換する。
+    リクエストはまず reserve() で枠を確保し（空きワーカーを待つリクエストが既に
+    queue_size 件あれば ServiceBusy を発生させる）、その後でアップロードを読み込んで
+    worker() で待つ。失敗した、またはリクエスト途中でクライアントが切断したワーカーは
+    強制終了して置き換え、放棄された変換も止める。置き換えを起動できなければ、その枠は
+    後のリクエストが起動するまで空のままにする。
+    """
+
+    def __init__(self, size, queue_size=DEFAULT_QUEUE_SIZE):
+        # Spawn keeps workers independent of the server threads / spawnでワーカーをサーバーのスレッドから独立させる
+        self._context = multiprocessing.get_context("spawn")
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size + queue_size)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self.active = 0
+        workers = [_Worker(self._context) for _ in range(size)]
+        for worker in workers:
+            worker.wait_ready()
+            self._idle.put(worker)
+
+    def _replace(self):
+        worker = _Worker(self._context)
+        worker.wait_ready()
+        return worker
+
+    @contextlib.contextmanager
+    def reserve(self):
+        """Take a place among running and waiting requests / 実行中・待機中のリクエストの枠を確保"""
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy()
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def worker(self):
+        """Wait for a free worker, within reserve() / 空きワーカーを待つ（reserve() の中で使用）"""
+        # None is a slot whose worker could not be replaced / None は置き換えられなかったワーカーの枠
+        worker = self._idle.get()
+        if worker is None:
+            try:
+                worker = self._replace()
+            except Exception as e:
+                self._idle.put(None)
+                raise WorkerFailed(f"cannot start a worker process: {e}") from e
+        try:
+            yield worker
+        except BaseException:
+            worker.kill()
+            try:
+                worker = self._replace()
+            except Exception:
+                worker = None
+            raise
+        finally:
+            # Only a live worker goes back / 戻すのは動作中のワーカーのみ
+            self._idle.put(worker)
+
+    def status(self):
+        """Busy and queued request counts / 処理中・待機中のリクエスト数"""
+        with self._lock:
+            active = self.active
+        busy = min(active, self.size)
+        return {'workers': self.size, 'busy': busy, 'queued': active - busy}
+
+    def close(self):
+        """Stop idle workers / アイドル状態のワーカーを停止"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.stop()
+
+
+def _flag(value, default):
+    """Parse a boolean option / 真偽値のオプションを解析"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "off", "")
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    """HTTP endpoints of the service / サービスのHTTPエンドポイント"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "pdf-markdown"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_line(self, record):
+        """Write one JSON line as an HTTP chunk / JSONの1行をHTTPチャンクとして書き込む"""
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path == "/health":
+            self.send_json(200, dict(self.server.pool.status(), status="ok"))
+        else:
+            self.send_json(404, {'error': "not found"})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/convert":
+            self.send_json(404, {'error': "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_json(411, {'error': "Content-Length required"})
+            return
+        if length > self.server.max_upload:
+            self.send_json(413, {'error': "upload too large"})
+            self.close_connection = True
+            return
+        try:
+            # A place is taken before the upload is read or stored / アップロードを読み込み・保存する前に枠を確保
+            with self.server.pool.reserve():
+                self.convert(url, length)
+        except ServiceBusy:
+            self.send_json(503, {'error': "all workers are busy"}, {"Retry-After": str(RETRY_AFTER)})
+            # The unread body would be taken for the next request / 読んでいない本文が次のリクエストとみなされる
+            self.close_connection = True
+
+    def convert(self, url, length):
+        """Read a conversion request and stream its result / 変換リクエストを読み込み、結果をストリーミング"""
+        body = self.rfile.read(length)
+
+        options = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        upload = None
+        if self.headers.get("Content-Type", "").split(";")[0].strip() == "application/json":
+            try:
+                options.update(json.loads(body))
+                path = str(options['path'])
+            except (ValueError, KeyError, TypeError):
+                self.send_json(400, {'error': "expected a JSON object with a path"})
+                return
+            if not os.path.isfile(path):
+                self.send_json(404, {'error': f"file not found: {path}"})
+                return
+        else:
+            # Uploaded PDF, handed to the worker as a temporary file / アップロードされたPDFは一時ファイルとしてワーカーに渡す
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                f.write(body)
+            path = upload = f.name
+
+        self.streaming = False
+        job = {'path': path, 'pages': str(options.get('pages') or ""),
+               'add_page_headers': _flag(options.get('page_headers'), True),
+               'preset': str(options.get('preset') or
+                             (FULL_FIDELITY if _flag(options.get('full'), False) else DEFAULT_PRESET)),
+               'strip_repeated': _flag(options.get('strip_repeated'), False)}
+        try:
+            with self.server.pool.worker() as worker:
+                self.stream(worker, job)
+        except WorkerFailed as e:
+            if not self.streaming:
+                self.send_json(500, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the worker has been replaced / クライアントが切断した（ワーカーは置き換え済み）
+            self.close_connection = True
+        finally:
+            if upload:
+                os.remove(upload)
+
+    def stream(self, worker, job):
+        """Relay a conversion from a worker to the client / ワーカーの変換をクライアントに中継"""
+        worker.conn.send(job)
+        message = worker.receive()
+        if message[0] == 'invalid':
+            self.send_json(400, {'error': message[1]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.streaming = True
+        errors = 0
+        try:
+            while True:
+                message = worker.receive()
+                kind = message[0]
+                if kind == 'page':
+                    self.write_line({'page': message[1], 'markdown': message[2]})
+                elif kind == 'error':
+                    errors += 1
+                    self.write_line({'page': message[1], 'error': message[2]})
+                elif kind == 'done':
+                    self.write_line({'status': "done", 'pages_written': message[1], 'errors': errors})
+                    break
+                else:
+                    self.write_line({'status': "failed", 'error': message[1]})
+                    break
+        except WorkerFailed as e:
+            self.write_line({'status': "failed", 'error': str(e)})
+            self.wfile.write(b"0\r\n\r\n")
+            raise
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class ConversionServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the worker pool / ワーカープールを保持するスレッド型HTTPサーバー"""
+
+    daemon_threads = True
+
+    def __init__(self, address, pool, max_upload=DEFAULT_MAX_UPLOAD_MB * 1024 * 1024, quiet=False):
+        super().__init__(address, ConversionHandler)
+        self.pool = pool
+        self.max_upload = max_upload
+        self.quiet = quiet
+
+
+def build_parser():
+    """Build command-line parser / コマンドラインパーサーを構築"""
+    parser = argparse.ArgumentParser(
+        prog="pdf-markdown-service",
+        description="Serve PDF to Markdown conversion over local HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on, 0 for any free port (default: {DEFAULT_PORT})")
+    parser.add_argument("-w", "--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="warm worker processes (default: min(4, CPUs))")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"requests that may wait for a worker before 503 is returned "
+                             f"(default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--max-upload", type=int, default=DEFAULT_MAX_UPLOAD_MB, metavar="MB",
+                        help=f"largest accepted upload in MB (default: {DEFAULT_MAX_UPLOAD_MB})")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="do not log requests")
+    return parser
+
+
+def main(argv=None):
+    """Main function / メイン関数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.queue_size < 0:
+        parser.error("--queue-size must not be negative")
+
+    pool = WorkerPool(args.workers, args.queue_size)
+    server = ConversionServer((args.host, args.port), pool, args.max_upload * 1024 * 1024, args.quiet)
+    host, port = server.server_address[:2]
+    print(f"listening on http://{host}:{port} ({args.workers} workers)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
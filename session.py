@@ -0,0 +1,136 @@
+"""
+Document sessions / ドキュメントセッション
+Open each PDF once and share the handle across counting, conversion and checkpoints
+各PDFを一度だけ開き、ページ数の取得・変換・チェックポイントでハンドルを共有する
+"""
+
+import collections
+import hashlib
+import mmap
+import os
+import threading
+
+import pymupdf
+
+from checkpoint import source_hash
+
+# Idle documents kept open by a pool / プールが開いたまま保持するアイドル状態のドキュメント数
+DEFAULT_POOL_SIZE = 4
+
+
+class DocumentSession:
+    """
+    One open PDF document / 開いているPDFドキュメント1つ
+
+    With use_mmap the file is memory-mapped and opened from the mapping, so the
+    source hash is computed without reading the file again.
+    use_mmap を指定するとファイルをメモリマップして開くため、ソースのハッシュ計算で
+    ファイルを再度読み込まない。
+    """
+
+    def __init__(self, pdf_path, use_mmap=False):
+        self.pdf_path = str(pdf_path)
+        self._file = None
+        self._mmap = None
+        self._view = None
+        self._source_hash = None
+        stat = os.stat(self.pdf_path)
+        self.signature = (stat.st_size, stat.st_mtime_ns)
+
+        if use_mmap and stat.st_size:
+            self._file = open(self.pdf_path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+            self.doc = pymupdf.open(stream=self._view, filetype="pdf")
+        else:
+            self.doc = pymupdf.open(self.pdf_path)
+
+    @property
+    def page_count(self):
+        return len(self.doc)
+
+    def source_hash(self):
+        """Hash of the source file, computed once / ソースファイルのハッシュ（一度だけ計算）"""
+        if self._source_hash is None:
+            if self._view is not None:
+                self._source_hash = hashlib.sha256(self._view).hexdigest()
+            else:
+                self._source_hash = source_hash(self.pdf_path)
+        return self._source_hash
+
+    def is_current(self):
+        """Whether the file is unchanged since it was opened / 開いた後にファイルが変更されていないか"""
+        try:
+            stat = os.stat(self.pdf_path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == self.signature
+
+    def close(self):
+        """Close the document and release the mapping / ドキュメントを閉じてマッピングを解放"""
+        if not self.doc.is_closed:
+            self.doc.close()
+        if self._view is not None:
+            self._view.release()
+            self._mmap.close()
+            self._file.close()
+            self._view = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DocumentPool:
+    """
+    LRU pool of open documents for batch and repeated conversions
+    一括変換・再変換のための開いたドキュメントのLRUプール
+
+    acquire() hands a session to one job at a time; release() returns it for reuse.
+    Idle sessions beyond max_idle are closed, least recently used first, and
+    sessions whose file has changed are reopened.
+    acquire() はセッションを一度に1つのジョブにのみ渡し、release() で再利用のために
+    戻す。max_idle を超えたアイドル状態のセッションは最も長く使われていないものから
+    閉じ、ファイルが変更されたセッションは開き直す。
+    """
+
+    def __init__(self, max_idle=DEFAULT_POOL_SIZE, use_mmap=False):
+        self.max_idle = max_idle
+        self.use_mmap = use_mmap
+        self._idle = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, pdf_path):
+        """Get an open session for a PDF / PDFの開いたセッションを取得"""
+        key = os.path.abspath(pdf_path)
+        with self._lock:
+            session = self._idle.pop(key, None)
+        if session is not None:
+            if session.is_current():
+                return session
+            session.close()
+        return DocumentSession(pdf_path, use_mmap=self.use_mmap)
+
+    def release(self, session):
+        """Return a session for reuse / セッションを再利用のために戻す"""
+        key = os.path.abspath(session.pdf_path)
+        evicted = []
+        with self._lock:
+            previous = self._idle.pop(key, None)
+            if previous is not None:
+                evicted.append(previous)
+            self._idle[key] = session
+            while len(self._idle) > self.max_idle:
+                evicted.append(self._idle.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+
+    def close(self):
+        """Close all idle sessions / アイドル状態の全セッションを閉じる"""
+        with self._lock:
+            sessions = list(self._idle.values())
+            self._idle.clear()
+        for session in sessions:
+            session.close()
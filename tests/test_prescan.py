@@ -0,0 +1,54 @@
+"""
+Tests for the lightweight extractor / 軽量抽出のテスト
+Run with / 実行方法: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prescan import HEADING_SIZE_RATIO, SIMPLE, extract_simple  # noqa: E402
+
+BODY_SIZE = 10.1
+
+
+def make_page(title_size):
+    """Page with a title line above body paragraphs / 本文の段落の上に表題行があるページ"""
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Quarterly Results", fontsize=title_size)
+    for i in range(8):
+        page.insert_text((72, 120 + i * 40), f"Body paragraph number {i} with ordinary sentence text.",
+                         fontsize=BODY_SIZE)
+    return doc
+
+
+class ExtractSimpleTest(unittest.TestCase):
+
+    def extract(self, title_size):
+        doc = make_page(title_size)
+        try:
+            return extract_simple(doc[0], SIMPLE)
+        finally:
+            doc.close()
+
+    def test_size_just_above_heading_ratio(self):
+        # Above the ratio unrounded, below it once rounded to 0.1 pt
+        # 丸める前は比率を超え、0.1ptに丸めると下回る
+        title_size = 11.62
+        self.assertGreaterEqual(title_size, BODY_SIZE * HEADING_SIZE_RATIO)
+        self.assertLess(round(title_size, 1), BODY_SIZE * HEADING_SIZE_RATIO)
+        text = self.extract(title_size)
+        self.assertIn("Quarterly Results", text)
+        self.assertIn("Body paragraph number 7", text)
+
+    def test_larger_text_becomes_heading(self):
+        self.assertTrue(self.extract(16).startswith("# Quarterly Results"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for repeated header and footer removal / 繰り返されるヘッダー・フッターの除去のテスト
+Run with / 実行方法: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversion import page_header  # noqa: E402
+from output import ResultCollector  # noqa: E402
+from repeated import RepeatedRegions, text_key  # noqa: E402
+
+PAGES = 8
+HEADER = "ACME Annual Report"
+
+# Page without the running header whose body starts with the header's text
+# 柱がなく、本文が柱と同じテキストで始まるページ
+BODY_TITLE_PAGE = 5
+
+
+def make_document():
+    """Pages with a running header, numbered section headings and a page number footer / 柱、番号付きの節見出し、ページ番号のフッターを持つページ"""
+    doc = pymupdf.open()
+    for page_num in range(1, PAGES + 1):
+        page = doc.new_page()
+        if page_num == BODY_TITLE_PAGE:
+            page.insert_text((72, 400), HEADER, fontsize=16)
+        else:
+            page.insert_text((72, 40), HEADER, fontsize=9)
+        # Same position on every page, inside the top band / 全ページの同じ位置（上端の帯の内側）
+        page.insert_text((72, 80), f"Section {page_num}", fontsize=14)
+        page.insert_text((72, 300), f"Body text of page {page_num}.", fontsize=11)
+        page.insert_text((280, 770), f"Page {page_num} of {PAGES}", fontsize=9)
+    return doc
+
+
+def markdown(page_num):
+    """Markdown of a page as a converter would produce it / 変換器が生成するページのMarkdown"""
+    if page_num == BODY_TITLE_PAGE:
+        return f"# {HEADER}\n\n## Section {page_num}\n\nBody text of page {page_num}.\n\nPage {page_num} of {PAGES}\n\n"
+    return (f"{HEADER}\n\n## Section {page_num}\n\nBody text of page {page_num}.\n\n"
+            f"Page {page_num} of {PAGES}\n\n")
+
+
+class RepeatedRegionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = make_document()
+        self.regions = RepeatedRegions()
+        self.regions.detect(self.doc)
+        collector = ResultCollector()
+        sink = self.regions.wrap(collector, self.doc)
+        for page_num in range(1, PAGES + 1):
+            sink.write_page(page_num, page_header(page_num, True, "\n\n") + markdown(page_num))
+        self.pages = {result['page_num']: result['content'] for result in collector.results}
+
+    def tearDown(self):
+        self.doc.close()
+
+    def test_numbered_section_headings_survive(self):
+        for page_num, content in self.pages.items():
+            self.assertIn(f"## Section {page_num}", content)
+            self.assertIn(f"Body text of page {page_num}.", content)
+
+    def test_header_and_page_number_are_removed(self):
+        for page_num, content in self.pages.items():
+            self.assertNotIn(f"Page {page_num} of {PAGES}", content)
+            if page_num != BODY_TITLE_PAGE:
+                self.assertNotIn(HEADER, content)
+
+    def test_header_text_elsewhere_on_the_page_is_kept(self):
+        self.assertIn(f"# {HEADER}", self.pages[BODY_TITLE_PAGE])
+
+    def test_only_page_numbers_are_folded(self):
+        self.assertEqual(text_key("Page 3 of 40"), text_key("Page 12 of 40"))
+        self.assertEqual(text_key("- 7 -"), text_key("- 8 -"))
+        self.assertNotEqual(text_key("Section 1"), text_key("Section 2"))
+
+
+if __name__ == "__main__":
+    unittest.main()